@@ -7,17 +7,12 @@ from typing import Dict, Any, Optional
 import io
 
 # Import backend modules
+# Only lightweight modules are imported here. Every Streamlit page (including
+# the login page) imports this module, so the RAG stack (faiss, torch, LLM SDKs,
+# OCR, nltk) and apscheduler are imported inside the functions that need them.
 from server.config import settings
-from server.ingest.indexer import DocumentIndexer
-from server.qa.retriever import DocumentRetriever
-from server.qa.llm import LLMClient
-from server.cv.checker import check_cv
 from server.teacher.pdf_manager import PDFManager
 from server.teacher.pdf_metadata import PDFMetadataManager
-from server.notification.deadline_parser import DeadlineParser
-from server.notification.student_parser import StudentEmailParser
-from server.notification.email_sender import EmailSender
-from server.notification.scheduler import NotificationScheduler
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
@@ -32,7 +27,16 @@ _retriever = None
 _llm_client = None
 _pdf_manager = None
 _pdf_metadata_manager = None
+_preview_service = None
+_folder_watcher = None
 _notification_scheduler = None
+_chat_flight = None
+_extractive_answerer = None
+_intent_router = None
+_chat_limiter = None
+_chat_scheduler = None
+_chat_sessions = None
+_question_log = None
 
 # User storage
 USERS_FILE = Path(__file__).parent / "data" / "users.json"
@@ -71,14 +75,34 @@ def get_indexer():
     """Get or initialize DocumentIndexer"""
     global _indexer
     if _indexer is None:
+        from server.ingest.indexer import DocumentIndexer
         _indexer = DocumentIndexer()
         logger.info("DocumentIndexer initialized")
+        # Streamlit has no /metrics route; serve the registry on a local port instead
+        if settings.METRICS_PORT:
+            from server.metrics import start_metrics_server
+            start_metrics_server(settings.METRICS_PORT)
+        if settings.WATCH_PDF_FOLDERS:
+            get_folder_watcher()
     return _indexer
 
+def get_folder_watcher():
+    """Get or start the PDF folder watcher (None if disabled or another process is watching)"""
+    global _folder_watcher
+    if _folder_watcher is None and settings.WATCH_PDF_FOLDERS:
+        from server.ingest.watcher import start_folder_watcher
+        pdf_manager = get_pdf_manager()
+        _folder_watcher = start_folder_watcher(get_indexer(), {
+            pdf_type: pdf_manager.get_directory(pdf_type)
+            for pdf_type in ("chatbot", "submission", "notification")
+        })
+    return _folder_watcher
+
 def get_retriever():
     """Get or initialize DocumentRetriever"""
     global _retriever
     if _retriever is None:
+        from server.qa.retriever import DocumentRetriever
         indexer = get_indexer()
         _retriever = DocumentRetriever(indexer)
         logger.info("DocumentRetriever initialized")
@@ -88,6 +112,7 @@ def get_llm_client():
     """Get or initialize LLMClient"""
     global _llm_client
     if _llm_client is None:
+        from server.qa.llm import LLMClient
         try:
             if settings.GROQ_API_KEY:
                 _llm_client = LLMClient(use_groq=True)
@@ -127,10 +152,19 @@ def get_pdf_metadata_manager():
         logger.info("PDFMetadataManager initialized")
     return _pdf_metadata_manager
 
+def get_preview_service():
+    """Get or initialize the PDF page preview service"""
+    global _preview_service
+    if _preview_service is None:
+        from server.teacher.previews import PreviewService
+        _preview_service = PreviewService(settings.PREVIEW_CACHE_DIR, settings.PREVIEW_CACHE_MAX_BYTES)
+    return _preview_service
+
 def get_notification_scheduler():
     """Get or initialize NotificationScheduler"""
     global _notification_scheduler
     if _notification_scheduler is None:
+        from server.notification.scheduler import NotificationScheduler
         _notification_scheduler = NotificationScheduler()
         _notification_scheduler.start()
         logger.info("NotificationScheduler initialized")
@@ -195,54 +229,182 @@ def backend_register(user_id: str, password: str) -> Dict[str, Any]:
         "user_type": "student"
     }
 
-def backend_chat(message: str) -> Dict[str, Any]:
+def backend_chat(message: str, user_id: Optional[str] = None, session_id: Optional[str] = None) -> Dict[str, Any]:
     """Chat function"""
+    from server import tracing
+    # Traced like an API request, so sampled chats are exported too
+    with tracing.trace("backend_chat"):
+        return _backend_chat(message, user_id, session_id)
+
+def _backend_chat(message: str, user_id: Optional[str], session_id: Optional[str]) -> Dict[str, Any]:
     text = (message or "").strip()
     lang = "en"
     
+    if not text:
+        return {"reply": "Hi! I'm your Industrial Training assistant. You can start asking questions anytime.", "language": lang}
+    
+    question_log = get_question_log()
+    if question_log:
+        question_log.record(text, session_id)
+    
+    # Greetings and farewells don't need the RAG pipeline
+    if settings.INTENT_ROUTER:
+        intent_router = get_intent_router()
+        intent = intent_router.route(text)
+        if intent != "in_domain":
+            return {"reply": intent_router.canned_reply(intent), "language": lang}
+    
     retriever = get_retriever()
     llm_client = get_llm_client()
     
     if not retriever or not llm_client:
         return {"reply": "System is still initializing. Please wait a moment and try again.", "language": lang}
     
-    if not text:
-        return {"reply": "Hi! I'm your Industrial Training assistant. You can start asking questions anytime.", "language": lang}
-    
-    # Check for farewell keywords
-    farewell_map = {"en": ["bye", "goodbye", "thank you", "thanks"]}
-    lowered = text.lower()
-    if any(k in lowered for k in farewell_map.get(lang, [])):
-        return {"reply": "Thanks for chatting! If you have more questions, just ask anytime.", "language": lang}
+    from server.qa.ratelimit import RateLimitExceeded, retry_after_header
+    user_key = user_id or "anonymous"
+    if settings.CHAT_RATE_LIMIT_PER_MINUTE > 0:
+        wait = get_chat_limiter().acquire(user_key)
+        if wait > 0:
+            retry_after = retry_after_header(wait)
+            return {"error": f"Too many questions in a short time. Please wait {retry_after} seconds and try again.", "retry_after": retry_after}
     
     try:
-        # Retrieve relevant chunks
-        chunks = retriever.retrieve_relevant_chunks(text, k=8)
-        
-        if not chunks:
-            return {"reply": "I couldn't find that in the Industrial Training documents. Please rephrase or ask another question.", "language": lang}
-        
-        # Format context
-        context = retriever.format_context(chunks)
-        
-        # Generate response using LLM
-        llm_result = llm_client.generate_response(text, context, lang)
-        reply = llm_result.get('response', 'Sorry, I could not generate a response.')
-        
-        # If confidence is low, add a clarification
-        confidence = llm_result.get('confidence', 0.0)
-        if confidence < 0.3:
-            reply += " Could you provide more specific details about what you're looking for?"
-        
+        from server.qa.singleflight import normalize_question
+        from server.qa.session import Turn, resolve_follow_up
+        generation = get_indexer().get_index_generation("chatbot")
+        # Follow-ups in a session carry the previous topic and reuse its chunks
+        chat_sessions = get_chat_sessions()
+        query, prior_chunks = resolve_follow_up(text, chat_sessions.last_turn(session_id), generation)
+        
+        if prior_chunks:
+            # The answer depends on this session's earlier context, so it can't be shared
+            reply, chunks = _answer_question(retriever, llm_client, query, lang, user_key, prior_chunks)
+        else:
+            # Identical questions asked at the same time share one retrieval + LLM call;
+            # keyed on the index generation so a re-index never serves a stale answer
+            key = (normalize_question(query), lang, generation)
+            reply, chunks = get_chat_flight().do(
+                key, lambda: _answer_question(retriever, llm_client, query, lang, user_key)
+            )
+        chat_sessions.record_turn(session_id, Turn(text, query, chunks, generation))
         return {"reply": reply, "language": lang}
         
+    except RateLimitExceeded as e:
+        return {"error": "The assistant is busy right now. Please try again shortly.", "retry_after": e.retry_after_header}
     except Exception as e:
         logger.error(f"Chat error: {str(e)}")
+        from server import metrics
+        metrics.ERRORS.labels(component='chat').inc()
         return {"reply": "Sorry, I encountered an error while processing your question. Please try again.", "language": lang}
 
+def get_chat_flight():
+    """Get or create the chat request coalescer"""
+    global _chat_flight
+    if _chat_flight is None:
+        from server.qa.singleflight import SingleFlight
+        from server.qa.ratelimit import RateLimitExceeded
+        # A scheduler rejection is the leader's own; followers retry instead of sharing it
+        _chat_flight = SingleFlight("chat_coalesced", unshared_errors=(RateLimitExceeded,))
+    return _chat_flight
+
+def get_extractive_answerer():
+    """Get or create the extractive fast-path answerer"""
+    global _extractive_answerer
+    if _extractive_answerer is None:
+        from server.qa.extractive import ExtractiveAnswerer
+        _extractive_answerer = ExtractiveAnswerer()
+    return _extractive_answerer
+
+def get_intent_router():
+    """Get or create the chat intent router"""
+    global _intent_router
+    if _intent_router is None:
+        from server.qa.intent import IntentRouter
+        _intent_router = IntentRouter()
+    return _intent_router
+
+def get_chat_limiter():
+    """Get or create the per-user chat rate limiter"""
+    global _chat_limiter
+    if _chat_limiter is None:
+        from server.qa.ratelimit import TokenBucketLimiter
+        _chat_limiter = TokenBucketLimiter(
+            settings.CHAT_RATE_LIMIT_PER_MINUTE, settings.CHAT_RATE_LIMIT_BURST, settings.RATE_LIMIT_DB_PATH or None
+        )
+    return _chat_limiter
+
+def get_chat_scheduler():
+    """Get or create the fair-share chat scheduler"""
+    global _chat_scheduler
+    if _chat_scheduler is None:
+        from server.qa.ratelimit import FairScheduler
+        _chat_scheduler = FairScheduler(
+            settings.CHAT_MAX_CONCURRENT, settings.CHAT_MAX_QUEUED_PER_USER, settings.CHAT_QUEUE_TIMEOUT_SECONDS
+        )
+    return _chat_scheduler
+
+def get_chat_sessions():
+    """Get or create the conversational session store"""
+    global _chat_sessions
+    if _chat_sessions is None:
+        from server.qa.session import SessionStore
+        _chat_sessions = SessionStore(settings.CHAT_SESSION_MAX, settings.CHAT_SESSION_TTL_SECONDS)
+    return _chat_sessions
+
+def get_question_log():
+    """Get the chat question log, or None when CHAT_LOG_PATH is not set"""
+    global _question_log
+    if _question_log is None and settings.CHAT_LOG_PATH:
+        from server.loadtest.questions import QuestionLog
+        _question_log = QuestionLog(settings.CHAT_LOG_PATH)
+    return _question_log
+
+def _answer_question(retriever, llm_client, text: str, lang: str, user_key: str, prior_chunks: list = None):
+    """Run the retrieval + LLM pipeline for one question
+    
+    Returns:
+        (reply, chunks the reply was based on)
+    """
+    # Pipeline slots are shared fairly between users
+    with get_chat_scheduler().slot(user_key):
+        return _run_pipeline(retriever, llm_client, text, lang, prior_chunks)
+
+def _run_pipeline(retriever, llm_client, text: str, lang: str, prior_chunks: list = None):
+    if prior_chunks:
+        # Follow-up: the previous turn's context plus a smaller fresh search
+        chunks = retriever.retrieve_relevant_chunks(text, k=settings.CHAT_FOLLOW_UP_K)
+        chunks = retriever.merge_chunks(chunks, prior_chunks, k=settings.CHAT_FOLLOW_UP_MAX_CHUNKS)
+    else:
+        # Retrieve relevant chunks
+        chunks = retriever.retrieve_relevant_chunks(text, k=8)
+    
+    if not chunks:
+        return "I couldn't find that in the Industrial Training documents. Please rephrase or ask another question.", []
+    
+    # Confident date/number answers come straight from the documents
+    if settings.EXTRACTIVE_ANSWERS:
+        extracted = get_extractive_answerer().answer(text, chunks)
+        if extracted:
+            return extracted['response'], chunks
+    
+    # Format context
+    context = retriever.format_context(chunks)
+    
+    # Generate response using LLM
+    llm_result = llm_client.generate_response(text, context, lang)
+    reply = llm_result.get('response', 'Sorry, I could not generate a response.')
+    
+    # If confidence is low, add a clarification
+    confidence = llm_result.get('confidence', 0.0)
+    if confidence < 0.3:
+        reply += " Could you provide more specific details about what you're looking for?"
+    
+    return reply, chunks
+
 def backend_cv_check(file_content: bytes, filename: str) -> Dict[str, Any]:
     """CV check function"""
     try:
+        from server.cv.checker import check_cv
         result = check_cv(file_content)
         return result
     except Exception as e:
@@ -277,6 +439,7 @@ def backend_student_submit_cv(file_content: bytes, filename: str, user_id: str)
             pdf_type="submission",
             file_size=result["file_size"],
             uploaded_by=user_id,
+            content_hash=result["content_hash"],
         )
         pdf_metadata_manager.update_pdf_status(
             filename=result["file_name"],
@@ -322,7 +485,8 @@ def backend_teacher_upload_pdf(file_content: bytes, filename: str, pdf_type: str
             filename=result["file_name"],
             pdf_type=pdf_type,
             file_size=result["file_size"],
-            uploaded_by=user_id
+            uploaded_by=user_id,
+            content_hash=result["content_hash"]
         )
         
         pdf_metadata_manager.update_pdf_status(
@@ -338,44 +502,40 @@ def backend_teacher_upload_pdf(file_content: bytes, filename: str, pdf_type: str
         logger.error(f"PDF upload error: {str(e)}")
         return {"error": f"Error uploading PDF: {str(e)}"}
 
-def backend_teacher_list_pdfs(pdf_type: str) -> Dict[str, Any]:
-    """Teacher list PDFs function"""
+def _query_catalog(pdf_type: str, page: int, page_size: int, sort: str, order: str, **filters) -> Dict[str, Any]:
+    """One page of the PDF catalog, as returned by the list functions"""
+    if order not in ("asc", "desc"):
+        return {"error": "Invalid order. Must be: asc or desc"}
+    pdf_manager = get_pdf_manager()
+    pdf_metadata_manager = get_pdf_metadata_manager()
+    
+    result = pdf_manager.query_pdfs(
+        pdf_type, pdf_metadata_manager.list_pdf_metadata(pdf_type),
+        page=page, page_size=page_size, sort=sort, descending=order == "desc", **filters
+    )
+    return {
+        "success": True,
+        "pdf_type": pdf_type,
+        "files": result["files"],
+        "count": len(result["files"]),
+        "total": result["total"],
+        "page": result["page"],
+        "page_size": result["page_size"]
+    }
+
+def backend_teacher_list_pdfs(pdf_type: str, page: int = 1, page_size: int = 50, sort: str = "modified_time",
+                              order: str = "desc", uploaded_by: Optional[str] = None, status: Optional[str] = None,
+                              since: Optional[str] = None, until: Optional[str] = None,
+                              search: Optional[str] = None) -> Dict[str, Any]:
+    """Teacher list PDFs function (paginated, sorted and filtered by the catalog)"""
     if pdf_type not in ["chatbot", "submission", "notification"]:
         return {"error": "Invalid pdf_type. Must be: chatbot, submission, or notification"}
     
     try:
-        pdf_manager = get_pdf_manager()
-        pdf_metadata_manager = get_pdf_metadata_manager()
-        
-        pdf_list = pdf_manager.list_pdfs(pdf_type)
-        metadata_list = pdf_metadata_manager.list_pdf_metadata(pdf_type)
-        metadata_dict = {item["file_name"]: item for item in metadata_list if "file_name" in item}
-        
-        # Merge file info with metadata
-        for pdf in pdf_list:
-            if pdf["file_name"] in metadata_dict:
-                pdf["upload_status"] = metadata_dict[pdf["file_name"]].get("upload_status")
-                pdf["rebuild_status"] = metadata_dict[pdf["file_name"]].get("rebuild_status")
-                pdf["delete_status"] = metadata_dict[pdf["file_name"]].get("delete_status")
-                pdf["status"] = pdf.get("delete_status") or pdf.get("rebuild_status") or pdf.get("upload_status") or "pending"
-                if pdf.get("delete_status"):
-                    pdf["last_action"] = "delete"
-                elif pdf.get("rebuild_status"):
-                    pdf["last_action"] = "rebuild"
-                elif pdf.get("upload_status"):
-                    pdf["last_action"] = "upload"
-                else:
-                    pdf["last_action"] = "none"
-            else:
-                pdf["status"] = "pending"
-                pdf["last_action"] = "none"
-        
-        return {
-            "success": True,
-            "pdf_type": pdf_type,
-            "files": pdf_list,
-            "count": len(pdf_list)
-        }
+        return _query_catalog(
+            pdf_type, page, page_size, sort, order, uploaded_by=uploaded_by, status=status,
+            uploaded_after=since, uploaded_before=until, name_contains=search
+        )
     except Exception as e:
         logger.error(f"List PDFs error: {str(e)}")
         return {"error": f"Error listing PDFs: {str(e)}"}
@@ -439,40 +599,46 @@ def backend_teacher_rebuild_faiss_index(pdf_type: str) -> Dict[str, Any]:
         logger.error(f"Rebuild FAISS index error: {str(e)}")
         return {"error": str(e)}
 
-def backend_teacher_list_student_submissions() -> Dict[str, Any]:
+def backend_teacher_list_student_submissions(page: int = 1, page_size: int = 50, sort: str = "upload_time",
+                                             order: str = "desc", uploaded_by: Optional[str] = None,
+                                             status: Optional[str] = None, since: Optional[str] = None,
+                                             until: Optional[str] = None, search: Optional[str] = None) -> Dict[str, Any]:
     """Teacher list student submissions function"""
     pdf_type = "submission"
     try:
-        pdf_manager = get_pdf_manager()
-        pdf_metadata_manager = get_pdf_metadata_manager()
-        
-        pdf_list = pdf_manager.list_pdfs(pdf_type)
-        metadata_list = pdf_metadata_manager.list_pdf_metadata(pdf_type)
-        metadata_dict = {item["file_name"]: item for item in metadata_list if "file_name" in item}
-        
-        student_files = []
-        for pdf in pdf_list:
-            meta = metadata_dict.get(pdf["file_name"])
-            if meta and meta.get("uploaded_by") != TEACHER_ID:
-                combined = pdf.copy()
-                combined["uploaded_by"] = meta.get("uploaded_by")
-                combined["upload_time"] = meta.get("upload_time", combined.get("upload_time"))
-                student_files.append(combined)
-        
-        return {
-            "success": True,
-            "pdf_type": pdf_type,
-            "files": student_files,
-            "count": len(student_files),
-        }
+        return _query_catalog(
+            pdf_type, page, page_size, sort, order, uploaded_by=uploaded_by, exclude_uploaded_by=TEACHER_ID,
+            status=status, uploaded_after=since, uploaded_before=until, name_contains=search
+        )
     except Exception as e:
         logger.error(f"List student submissions error: {str(e)}")
         return {"error": f"Error listing student submissions: {str(e)}"}
 
+def backend_teacher_pdf_preview(filename: str, pdf_type: str, page: int = 1, width: int = 200) -> Dict[str, Any]:
+    """Teacher PDF page preview function (JPEG bytes, rendered once and cached)"""
+    if pdf_type not in ["chatbot", "submission", "notification"]:
+        return {"error": "Invalid pdf_type. Must be: chatbot, submission, or notification"}
+    
+    try:
+        from server.teacher.previews import PreviewUnavailable
+        file_path = get_pdf_manager().get_directory(pdf_type) / os.path.basename(filename)
+        if not file_path.exists():
+            return {"error": "File not found"}
+        
+        try:
+            preview_path = get_preview_service().get_preview(file_path, int(page), int(width))
+        except PreviewUnavailable as e:
+            return {"error": str(e)}
+        return {"success": True, "image": preview_path.read_bytes(), "media_type": "image/jpeg"}
+    except Exception as e:
+        logger.error(f"PDF preview error: {str(e)}")
+        return {"error": f"Error rendering preview: {str(e)}"}
+
 # Notification functions (simplified)
 def backend_teacher_upload_emails(file_content: bytes, filename: str) -> Dict[str, Any]:
     """Teacher upload emails function"""
     try:
+        from server.notification.student_parser import StudentEmailParser
         student_parser = StudentEmailParser()
         result = student_parser.parse_email_file(file_content, filename, save_file=True)
         return result if result.get("success") else {"error": result.get("error", "Failed to parse email file")}
@@ -483,6 +649,7 @@ def backend_teacher_upload_emails(file_content: bytes, filename: str) -> Dict[st
 def backend_teacher_list_email_files() -> Dict[str, Any]:
     """Teacher list email files function"""
     try:
+        from server.notification.student_parser import StudentEmailParser
         student_parser = StudentEmailParser()
         files = student_parser.list_uploaded_files()
         return {
@@ -497,6 +664,7 @@ def backend_teacher_list_email_files() -> Dict[str, Any]:
 def backend_teacher_delete_email_file(filename: str) -> Dict[str, Any]:
     """Teacher delete email file function"""
     try:
+        from server.notification.student_parser import StudentEmailParser
         student_parser = StudentEmailParser()
         result = student_parser.delete_uploaded_file(filename)
         return result if result.get("success") else {"error": result.get("error", "File not found")}
@@ -507,6 +675,7 @@ def backend_teacher_delete_email_file(filename: str) -> Dict[str, Any]:
 def backend_teacher_parse_deadline_pdf() -> Dict[str, Any]:
     """Teacher parse deadline PDF function"""
     try:
+        from server.notification.deadline_parser import DeadlineParser
         deadline_parser = DeadlineParser()
         result = deadline_parser.parse_deadline_pdf()
         
@@ -1,4 +1,5 @@
 """Chatbot page - Interactive Q&A with RAG"""
+import uuid
 import streamlit as st
 from pathlib import Path
 from utils import require_login, api_call
@@ -18,6 +19,10 @@ if "messages" not in st.session_state:
         {"role": "assistant", "content": "Hi! I'm your Industrial Training assistant. Pick a topic or ask anything."}
     ]
 
+# Identifies this conversation so follow-up questions keep their context
+if "chat_session_id" not in st.session_state:
+    st.session_state.chat_session_id = uuid.uuid4().hex
+
 # Initialize categories
 if "categories" not in st.session_state:
     st.session_state.categories = [
@@ -172,7 +177,15 @@ if st.session_state.messages and st.session_state.messages[-1]["role"] == "user"
     
     with st.chat_message("assistant"):
         with st.spinner("Thinking..."):
-            result = api_call("/api/chat", method="POST", json_data={"message": user_message})
+            result = api_call(
+                "/api/chat",
+                method="POST",
+                json_data={
+                    "message": user_message,
+                    "user_id": st.session_state.get("user_id"),
+                    "session_id": st.session_state.chat_session_id
+                }
+            )
             
             if "error" in result:
                 response = f"⚠️ {result['error']}"
@@ -40,6 +40,34 @@ pdf_types = {
     "🔔 Notification PDFs": "notification"
 }
 
+STATUS_FILTERS = {"All": None, "Success": "success", "Failed": "failed", "Pending": "pending"}
+PAGE_SIZE = 25
+
+def list_controls(key: str, sort_options: dict) -> dict:
+    """Filter, sort and page inputs for a file list; returns the list endpoint's query params"""
+    col1, col2, col3, col4 = st.columns([2, 1, 1, 1])
+    with col1:
+        search = st.text_input("Search by name", key=f"search_{key}")
+    with col2:
+        status = st.selectbox("Status", list(STATUS_FILTERS), key=f"status_{key}")
+    with col3:
+        sort_label = st.selectbox("Sort by", list(sort_options), key=f"sort_{key}")
+    with col4:
+        page = st.number_input("Page", min_value=1, value=1, step=1, key=f"page_{key}")
+    
+    params = {"page": int(page), "page_size": PAGE_SIZE}
+    params["sort"], params["order"] = sort_options[sort_label]
+    if search:
+        params["search"] = search
+    if STATUS_FILTERS[status]:
+        params["status"] = STATUS_FILTERS[status]
+    return params
+
+def page_caption(result: dict):
+    total = result.get("total", 0)
+    pages = max(1, -(-total // result.get("page_size", PAGE_SIZE)))
+    st.caption(f"Page {result.get('page', 1)} of {pages}")
+
 def render_pdf_tab(pdf_type: str, tab_label: str):
     """Render PDF management tab"""
     st.markdown(f"### Upload {tab_label}")
@@ -82,12 +110,20 @@ def render_pdf_tab(pdf_type: str, tab_label: str):
     # File list
     st.markdown(f"### {tab_label} Files")
     
+    list_params = list_controls(pdf_type, {
+        "Newest": ("modified_time", "desc"),
+        "Oldest": ("modified_time", "asc"),
+        "Name": ("file_name", "asc"),
+        "Size": ("file_size", "desc"),
+    })
+    
     with st.spinner("Loading PDF list..."):
-        result = api_call("/api/teacher/list-pdfs", method="GET", params={"pdf_type": pdf_type})
+        result = api_call("/api/teacher/list-pdfs", method="GET", params={"pdf_type": pdf_type, **list_params})
         
         if result.get("success"):
             files = result.get("files", [])
-            st.metric("Total Files", len(files))
+            st.metric("Total Files", result.get("total", len(files)))
+            page_caption(result)
             
             if files:
                 # File list with status
@@ -134,12 +170,20 @@ def render_pdf_tab(pdf_type: str, tab_label: str):
         st.markdown("---")
         st.markdown("### Student Submission CV/Resume PDFs")
         
+        list_params = list_controls("student_submissions", {
+            "Newest": ("upload_time", "desc"),
+            "Oldest": ("upload_time", "asc"),
+            "Student": ("uploaded_by", "asc"),
+            "Name": ("file_name", "asc"),
+        })
+        
         with st.spinner("Loading student submissions..."):
-            result = api_call("/api/teacher/list-student-submissions", method="GET")
+            result = api_call("/api/teacher/list-student-submissions", method="GET", params=list_params)
             
             if result.get("success"):
                 files = result.get("files", [])
-                st.metric("Student Submissions", len(files))
+                st.metric("Student Submissions", result.get("total", len(files)))
+                page_caption(result)
                 
                 if files:
                     for file_info in files:
@@ -158,7 +202,16 @@ def render_pdf_tab(pdf_type: str, tab_label: str):
                             
                             with col2:
                                 if st.button(f"View", key=f"view_student_{file_info['file_name']}"):
-                                    st.info(f"Viewing: {file_info['file_name']}")
+                                    # A cached page-1 thumbnail instead of the whole PDF
+                                    preview = api_call(
+                                        "/api/teacher/pdf-preview",
+                                        method="GET",
+                                        params={"filename": file_info['file_name'], "pdf_type": "submission", "page": 1}
+                                    )
+                                    if preview.get("success"):
+                                        st.image(preview["image"], caption=f"Page 1 of {file_info['file_name']}")
+                                    else:
+                                        st.info(f"Viewing: {file_info['file_name']}")
                 else:
                     st.info("No student submissions yet.")
 
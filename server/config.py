@@ -34,6 +34,113 @@ class Settings:
     PORT: int = int(os.getenv("PORT", "8000"))
     DEFAULT_LANGUAGE: str = os.getenv("DEFAULT_LANGUAGE", "en")
     
+    # Local embedding backend: "torch" (sentence-transformers), "onnx" (onnxruntime, CPU)
+    # or "stub" (hashed bag-of-words, for load testing only)
+    EMBEDDING_BACKEND: str = os.getenv("EMBEDDING_BACKEND", "torch").lower()
+    ONNX_QUANTIZE: bool = os.getenv("ONNX_QUANTIZE", "true").lower() == "true"  # Use the int8 model
+    ONNX_MODEL_DIR: str = os.getenv("ONNX_MODEL_DIR", str(DATA_DIR / "models" / "onnx"))
+    
+    # OpenAI embedding request shaping
+    OPENAI_EMBEDDING_BATCH_TOKENS: int = int(os.getenv("OPENAI_EMBEDDING_BATCH_TOKENS", "100000"))  # Tokens per request
+    OPENAI_EMBEDDING_MAX_IN_FLIGHT: int = int(os.getenv("OPENAI_EMBEDDING_MAX_IN_FLIGHT", "4"))  # Concurrent requests
+    OPENAI_EMBEDDING_MAX_RETRIES: int = int(os.getenv("OPENAI_EMBEDDING_MAX_RETRIES", "6"))
+    
+    # Shared model server (python -m server.ingest.model_server); empty = load models in-process
+    MODEL_SERVER_ADDRESS: str = os.getenv("MODEL_SERVER_ADDRESS", "")  # Unix socket path or host:port
+    # Shared secret for the model server connection (payloads are pickled, so it must not be guessable).
+    # If unset, the server generates one into MODEL_SERVER_AUTHKEY_FILE (mode 0600) and clients read it from there.
+    MODEL_SERVER_AUTHKEY: str = os.getenv("MODEL_SERVER_AUTHKEY", "")
+    MODEL_SERVER_AUTHKEY_FILE: str = os.getenv("MODEL_SERVER_AUTHKEY_FILE", str(DATA_DIR / "model_server.key"))
+    
+    # LLM provider routing and circuit breaker
+    LLM_TIMEOUT_SECONDS: float = float(os.getenv("LLM_TIMEOUT_SECONDS", "20"))  # Per-request timeout
+    LLM_HEALTH_WINDOW_SECONDS: float = float(os.getenv("LLM_HEALTH_WINDOW_SECONDS", "300"))  # Rolling latency/error window
+    LLM_BREAKER_FAILURE_RATE: float = float(os.getenv("LLM_BREAKER_FAILURE_RATE", "0.5"))
+    LLM_BREAKER_MIN_REQUESTS: int = int(os.getenv("LLM_BREAKER_MIN_REQUESTS", "4"))
+    LLM_BREAKER_CONSECUTIVE_FAILURES: int = int(os.getenv("LLM_BREAKER_CONSECUTIVE_FAILURES", "3"))
+    LLM_BREAKER_OPEN_SECONDS: float = float(os.getenv("LLM_BREAKER_OPEN_SECONDS", "30"))  # Before a half-open probe
+    LLM_AUTH_FAILURE_OPEN_SECONDS: float = float(os.getenv("LLM_AUTH_FAILURE_OPEN_SECONDS", "3600"))
+    
+    # Hedged LLM requests: if the first provider is slower than its usual latency
+    # percentile, send the same prompt to the next provider and take the first answer
+    LLM_HEDGING: bool = os.getenv("LLM_HEDGING", "false").lower() == "true"
+    LLM_HEDGE_PERCENTILE: float = float(os.getenv("LLM_HEDGE_PERCENTILE", "95"))
+    LLM_HEDGE_DEFAULT_DELAY_SECONDS: float = float(os.getenv("LLM_HEDGE_DEFAULT_DELAY_SECONDS", "3"))  # Until enough samples
+    LLM_HEDGE_MAX_RATE: float = float(os.getenv("LLM_HEDGE_MAX_RATE", "0.1"))  # Max fraction of requests hedged
+    
+    # Extractive fast path: answer date/number/deadline questions from the
+    # retrieved chunks without calling the LLM when the match is confident
+    EXTRACTIVE_ANSWERS: bool = os.getenv("EXTRACTIVE_ANSWERS", "true").lower() == "true"
+    EXTRACTIVE_MIN_CONFIDENCE: float = float(os.getenv("EXTRACTIVE_MIN_CONFIDENCE", "0.6"))
+    
+    # Intent router: greetings and farewells get canned
+    # replies without retrieval or an LLM call
+    INTENT_ROUTER: bool = os.getenv("INTENT_ROUTER", "true").lower() == "true"
+    INTENT_MIN_CONFIDENCE: float = float(os.getenv("INTENT_MIN_CONFIDENCE", "0.2"))
+    
+    # Per-user chat rate limiting and fair queuing
+    CHAT_RATE_LIMIT_PER_MINUTE: float = float(os.getenv("CHAT_RATE_LIMIT_PER_MINUTE", "10"))  # 0 = unlimited
+    CHAT_RATE_LIMIT_BURST: int = int(os.getenv("CHAT_RATE_LIMIT_BURST", "5"))
+    CHAT_MAX_CONCURRENT: int = int(os.getenv("CHAT_MAX_CONCURRENT", "8"))  # RAG pipelines running at once
+    CHAT_MAX_QUEUED_PER_USER: int = int(os.getenv("CHAT_MAX_QUEUED_PER_USER", "2"))
+    CHAT_QUEUE_TIMEOUT_SECONDS: float = float(os.getenv("CHAT_QUEUE_TIMEOUT_SECONDS", "30"))
+    # SQLite file shared by worker processes; empty = per-process buckets
+    RATE_LIMIT_DB_PATH: str = os.getenv("RATE_LIMIT_DB_PATH", "")
+    
+    # Conversational sessions (ChatRequest.session_id)
+    CHAT_SESSION_MAX: int = int(os.getenv("CHAT_SESSION_MAX", "1000"))  # LRU bound
+    CHAT_SESSION_TTL_SECONDS: float = float(os.getenv("CHAT_SESSION_TTL_SECONDS", "1800"))
+    CHAT_FOLLOW_UP_K: int = int(os.getenv("CHAT_FOLLOW_UP_K", "4"))  # Fresh chunks searched for a follow-up
+    CHAT_FOLLOW_UP_MAX_CHUNKS: int = int(os.getenv("CHAT_FOLLOW_UP_MAX_CHUNKS", "6"))  # Fresh + reused chunks in the prompt
+    
+    # Stand-in providers for load testing (see server/loadtest/stubs.py for latency specs)
+    LLM_STUB: bool = os.getenv("LLM_STUB", "false").lower() == "true"
+    LLM_STUB_LATENCY: str = os.getenv("LLM_STUB_LATENCY", "lognormal:800,0.5")
+    LLM_STUB_ERROR_RATE: float = float(os.getenv("LLM_STUB_ERROR_RATE", "0"))
+    EMBEDDING_STUB_LATENCY: str = os.getenv("EMBEDDING_STUB_LATENCY", "fixed:5")
+    
+    # Append each chat question to this JSONL file for load-test replay; empty = off
+    CHAT_LOG_PATH: str = os.getenv("CHAT_LOG_PATH", "")
+    
+    # Pre-fork multi-worker deployment (gunicorn -c server/gunicorn_conf.py): one
+    # worker writes indexes, the rest hand writes to it through INDEX_JOBS_DIR
+    INDEX_WRITER_LOCK: str = os.getenv("INDEX_WRITER_LOCK", str(DATA_DIR / "index_writer.lock"))
+    INDEX_JOBS_DIR: str = os.getenv("INDEX_JOBS_DIR", str(DATA_DIR / "index_jobs"))
+    INDEX_WRITE_TIMEOUT_SECONDS: float = float(os.getenv("INDEX_WRITE_TIMEOUT_SECONDS", "1800"))
+    INDEX_RELOAD_INTERVAL_SECONDS: float = float(os.getenv("INDEX_RELOAD_INTERVAL_SECONDS", "2"))
+    
+    # Metrics: /metrics on the API server; in Streamlit mode a local endpoint on this port (0 = off)
+    METRICS_PORT: int = int(os.getenv("METRICS_PORT", "0"))
+    
+    # Tracing: Server-Timing headers on every response; a sampled fraction of traces
+    # is exported as OTLP/JSON to a file and/or an OTLP/HTTP collector (/v1/traces)
+    SERVER_TIMING: bool = os.getenv("SERVER_TIMING", "true").lower() == "true"
+    TRACE_SAMPLE_RATE: float = float(os.getenv("TRACE_SAMPLE_RATE", "0.0"))
+    TRACE_EXPORT_PATH: str = os.getenv("TRACE_EXPORT_PATH", "")
+    TRACE_EXPORT_URL: str = os.getenv("TRACE_EXPORT_URL", "")
+    
+    # Uploads are streamed to disk in chunks of this size and rejected above the size limit
+    MAX_UPLOAD_BYTES: int = int(float(os.getenv("MAX_UPLOAD_MB", "50")) * 1024 * 1024)
+    UPLOAD_CHUNK_BYTES: int = int(os.getenv("UPLOAD_CHUNK_BYTES", str(1024 * 1024)))
+    
+    # Rendered page previews (Teacher Dashboard), keyed by content hash, LRU-evicted above the size limit
+    PREVIEW_CACHE_DIR: str = os.getenv("PREVIEW_CACHE_DIR", str(DATA_DIR / "previews"))
+    PREVIEW_CACHE_MAX_BYTES: int = int(float(os.getenv("PREVIEW_CACHE_MAX_MB", "200")) * 1024 * 1024)
+    
+    # PDF catalog (SQLite; shared by the API server and Streamlit processes)
+    CATALOG_DB_PATH: str = os.getenv("CATALOG_DB_PATH", str(DATA_DIR / "pdf_catalog.db"))
+    # Minimum time between checks of a PDF folder for files changed outside the app
+    CATALOG_RECONCILE_INTERVAL_SECONDS: float = float(os.getenv("CATALOG_RECONCILE_INTERVAL_SECONDS", "30"))
+    
+    # Index PDFs dropped into (or removed from) the PDF folders without a rebuild.
+    # Uses watchdog (inotify) when installed, otherwise polls every WATCH_POLL_SECONDS.
+    WATCH_PDF_FOLDERS: bool = os.getenv("WATCH_PDF_FOLDERS", "true").lower() == "true"
+    # A file is indexed once it has had no new events for this long (uploads and copies arrive in bursts)
+    WATCH_DEBOUNCE_SECONDS: float = float(os.getenv("WATCH_DEBOUNCE_SECONDS", "2"))
+    WATCH_POLL_SECONDS: float = float(os.getenv("WATCH_POLL_SECONDS", "5"))
+    # Only the process holding this lock watches, so files are indexed once per deployment
+    WATCH_LOCK: str = os.getenv("WATCH_LOCK", str(DATA_DIR / "folder_watcher.lock"))
+    
     # Ensure directories exist
     def __post_init__(self):
         # Create data directory if it doesn't exist  
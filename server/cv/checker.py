@@ -1,9 +1,6 @@
 import os
 import tempfile
 import re
-import PyPDF2
-import pytesseract
-from pdf2image import convert_from_path
 from typing import Dict, List, Tuple, Any
 import logging
 
@@ -17,6 +14,7 @@ def check_tesseract_available() -> Tuple[bool, str]:
         r'C:\Program Files (x86)\Tesseract-OCR\tesseract.exe',
     ]
     
+    import pytesseract
     try:
         pytesseract.get_tesseract_version()
         return True, None
@@ -37,6 +35,9 @@ def check_tesseract_available() -> Tuple[bool, str]:
 
 def extract_text_with_ocr(pdf_path: str) -> str:
     """Extract text from PDF, using OCR if needed."""
+    # Imported here so the Streamlit pages don't pay for them until a CV is checked
+    import PyPDF2
+    
     full_text = ""
     
     try:
@@ -54,6 +55,9 @@ def extract_text_with_ocr(pdf_path: str) -> str:
                 return full_text
             
             try:
+                import pytesseract
+                from pdf2image import convert_from_path
+                
                 if tesseract_path:
                     pytesseract.pytesseract.tesseract_cmd = tesseract_path
                 
@@ -164,12 +168,13 @@ def check_cgpa(text: str) -> bool:
     return False
 
 
-def check_cv(pdf_content: bytes) -> Dict[str, Any]:
+def check_cv(pdf_content: bytes = None, pdf_path: str = None) -> Dict[str, Any]:
     """
     Check an uploaded CV for required sections.
     
     Args:
         pdf_content: PDF file content as bytes
+        pdf_path: Path of a PDF already on disk, instead of pdf_content
         
     Returns:
         Dictionary with check results
@@ -282,11 +287,13 @@ def check_cv(pdf_content: bytes) -> Dict[str, Any]:
     
     tmp_file_path = None
     try:
-        with tempfile.NamedTemporaryFile(delete=False, suffix=".pdf") as tmp_file:
-            tmp_file.write(pdf_content)
-            tmp_file_path = tmp_file.name
+        if pdf_path is None:
+            with tempfile.NamedTemporaryFile(delete=False, suffix=".pdf") as tmp_file:
+                tmp_file.write(pdf_content)
+                tmp_file_path = tmp_file.name
+            pdf_path = tmp_file_path
         
-        full_text = extract_text_with_ocr(tmp_file_path)
+        full_text = extract_text_with_ocr(pdf_path)
         text_length = len(full_text.strip())
         
         if text_length == 0:
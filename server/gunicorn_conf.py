@@ -0,0 +1,35 @@
+"""
+gunicorn settings for the pre-fork multi-worker deployment (Linux/macOS).
+
+    gunicorn -c server/gunicorn_conf.py server.main:app
+
+The master imports the app and loads the embedding model and indexes once
+(server.main.preload_components); workers are forked from it and share
+those pages copy-on-write. After forking, one worker becomes the index
+writer and the others attach read-only (server.main.attach_worker).
+
+With the torch embedding backend, keep OMP_NUM_THREADS=1 (or use
+EMBEDDING_BACKEND=onnx): OpenMP thread pools started in the master do not
+survive fork and can hang the workers.
+"""
+
+import os
+
+bind = os.getenv("BIND", "127.0.0.1:8000")
+workers = int(os.getenv("WEB_CONCURRENCY", "4"))
+worker_class = "uvicorn.workers.UvicornWorker"
+# Import the app in the master so the preloaded state is inherited by workers
+preload_app = True
+# Indexing large PDFs in the writer can take a while
+timeout = int(os.getenv("GUNICORN_TIMEOUT", "300"))
+
+
+def when_ready(server):
+    # Runs in the master once, before the first worker is forked
+    from server.main import preload_components
+    preload_components()
+
+
+def post_fork(server, worker):
+    from server.main import attach_worker
+    attach_worker()
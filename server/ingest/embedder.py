@@ -1,13 +1,54 @@
-import openai
-import google.generativeai as genai
-from sentence_transformers import SentenceTransformer
 import numpy as np
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Optional, Tuple
+import functools
 import logging
 import os
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
 
 logger = logging.getLogger(__name__)
 
+LOCAL_MODEL_NAME = 'all-MiniLM-L6-v2'
+OPENAI_MODEL_NAME = 'text-embedding-ada-002'
+OPENAI_MAX_INPUT_TOKENS = 8191  # Per-input limit of text-embedding-ada-002
+OPENAI_MAX_BATCH_INPUTS = 2048  # Per-request input count limit
+
+
+@functools.lru_cache(maxsize=None)
+def _token_encoder():
+    """The tiktoken encoding for OpenAI embedding models, or None without tiktoken (resolved once)"""
+    try:
+        import tiktoken
+        return tiktoken.get_encoding("cl100k_base")
+    except Exception as e:
+        logger.info(f"tiktoken unavailable ({str(e)}); estimating tokens from text length")
+        return None
+
+
+def estimate_tokens(text: str) -> int:
+    """Count tokens with tiktoken if installed, else estimate at ~4 characters per token"""
+    encoder = _token_encoder()
+    if encoder is None:
+        return len(text) // 4 + 1
+    return len(encoder.encode(text))
+
+
+def _retry_after_seconds(error: Exception) -> Optional[float]:
+    """Read the server's requested delay from a rate-limit response, if any"""
+    response = getattr(error, 'response', None)
+    headers = getattr(response, 'headers', None) or {}
+    try:
+        if headers.get('retry-after-ms'):
+            return float(headers['retry-after-ms']) / 1000
+        if headers.get('retry-after'):
+            return float(headers['retry-after'])
+    except (TypeError, ValueError):
+        pass
+    return None
+
+
 class EmbeddingGenerator:
     def __init__(self, api_key: str = None, use_local: bool = False, use_google: bool = False):
         self.api_key = api_key
@@ -16,7 +57,7 @@ class EmbeddingGenerator:
         
         if use_local:
             # Use local sentence transformer model
-            self.model = SentenceTransformer('all-MiniLM-L6-v2')
+            self.model = self._load_local_model()
             self.embedding_dim = 384
         elif use_google:
             # Use Google AI embeddings
@@ -24,27 +65,69 @@ class EmbeddingGenerator:
             # But we need to check if API key is valid first
             if api_key and api_key.strip() and api_key != "your_google_gemini_api_key_here":
                 try:
+                    import google.generativeai as genai
                     genai.configure(api_key=api_key)
                     # Google AI doesn't have embedding API, so fallback to local
                     self.use_local = True
-                    self.model = SentenceTransformer('all-MiniLM-L6-v2')
+                    self.model = self._load_local_model()
                     self.embedding_dim = 384
                     logger.info("Google API key provided but using local embeddings (Google doesn't have embedding API)")
                 except Exception as e:
                     logger.warning(f"Failed to configure Google API, using local embeddings: {str(e)}")
                     self.use_local = True
-                    self.model = SentenceTransformer('all-MiniLM-L6-v2')
+                    self.model = self._load_local_model()
                     self.embedding_dim = 384
             else:
                 # No valid API key, use local model
                 self.use_local = True
-                self.model = SentenceTransformer('all-MiniLM-L6-v2')
+                self.model = self._load_local_model()
                 self.embedding_dim = 384
         else:
             # Use OpenAI embeddings
             if api_key:
+                import openai
                 openai.api_key = api_key
             self.embedding_dim = 1536  # text-embedding-ada-002 dimension
+            self._openai_client = None
+            # Set when a 429 asks us to back off; every in-flight batch waits for it
+            self._rate_limited_until = 0.0
+            self._rate_limit_lock = threading.Lock()
+        
+        # Name of the model that actually produces the vectors (indexes are versioned by it)
+        if self.use_local:
+            self.model_name = getattr(self.model, 'index_model_name', LOCAL_MODEL_NAME)
+        else:
+            self.model_name = OPENAI_MODEL_NAME
+    
+    def _load_local_model(self):
+        """Load the local embedding model with the configured backend (torch, onnx or stub)"""
+        from ..config import settings
+        if settings.EMBEDDING_BACKEND == "stub":
+            from ..loadtest.stubs import StubEncoder
+            logger.warning("Using stub embeddings (load testing only)")
+            return StubEncoder(latency=settings.EMBEDDING_STUB_LATENCY)
+        if settings.EMBEDDING_BACKEND == "onnx":
+            try:
+                from .onnx_embedder import OnnxSentenceEncoder
+                return OnnxSentenceEncoder.load_or_export(
+                    LOCAL_MODEL_NAME,
+                    cache_dir=settings.ONNX_MODEL_DIR,
+                    quantize=settings.ONNX_QUANTIZE
+                )
+            except Exception as e:
+                logger.warning(f"ONNX embedding backend unavailable, using PyTorch: {str(e)}")
+        from sentence_transformers import SentenceTransformer
+        return SentenceTransformer(LOCAL_MODEL_NAME)
+    
+    @classmethod
+    def for_model(cls, model_name: str) -> Optional['EmbeddingGenerator']:
+        """Create a generator for a specific model, or None if it can't be configured"""
+        from ..config import settings
+        if model_name == LOCAL_MODEL_NAME:
+            return cls(use_local=True)
+        if model_name == OPENAI_MODEL_NAME and settings.OPENAI_API_KEY:
+            return cls(api_key=settings.OPENAI_API_KEY, use_local=False)
+        return None
     
     def generate_embeddings(self, texts: List[str]) -> List[List[float]]:
         """Generate embeddings for a list of texts"""
@@ -59,14 +142,10 @@ class EmbeddingGenerator:
             else:
                 return self._generate_openai_embeddings(texts)
         except Exception as e:
+            # No fallback to another model here: its vectors have a different
+            # dimension and would corrupt the index being built. Callers treat
+            # an empty result as a failure.
             logger.error(f"Error generating embeddings: {str(e)}")
-            # Fallback to local model if OpenAI fails
-            if not self.use_local:
-                logger.info("Falling back to local embeddings")
-                self.use_local = True
-                self.model = SentenceTransformer('all-MiniLM-L6-v2')
-                self.embedding_dim = 384
-                return self._generate_local_embeddings(texts)
             return []
     
     def _generate_google_embeddings(self, texts: List[str]) -> List[List[float]]:
@@ -76,17 +155,99 @@ class EmbeddingGenerator:
         return self._generate_local_embeddings(texts)
     
     def _generate_openai_embeddings(self, texts: List[str]) -> List[List[float]]:
-        """Generate embeddings using OpenAI API"""
+        """Generate embeddings using OpenAI API
+        
+        Texts are packed into requests by token count and up to
+        OPENAI_EMBEDDING_MAX_IN_FLIGHT requests run concurrently. Rate limits
+        and transient errors are retried with backoff; any batch that still
+        fails fails the whole call.
+        """
+        from ..config import settings
         try:
-            response = openai.embeddings.create(
-                model="text-embedding-ada-002",
-                input=texts
-            )
-            return [data.embedding for data in response.data]
+            batches = self._plan_openai_batches(texts)
+            if len(batches) == 1:
+                return self._embed_openai_batch(batches[0][1])
+            
+            embeddings = [None] * len(texts)
+            max_workers = min(settings.OPENAI_EMBEDDING_MAX_IN_FLIGHT, len(batches))
+            with ThreadPoolExecutor(max_workers=max_workers) as pool:
+                futures = {pool.submit(self._embed_openai_batch, batch): start for start, batch in batches}
+                try:
+                    for future in as_completed(futures):
+                        start = futures[future]
+                        vectors = future.result()
+                        embeddings[start:start + len(vectors)] = vectors
+                except Exception:
+                    pool.shutdown(wait=False, cancel_futures=True)
+                    raise
+            return embeddings
         except Exception as e:
             logger.error(f"OpenAI embedding error: {str(e)}")
             raise e
     
+    def _get_openai_client(self):
+        if self._openai_client is None:
+            import openai
+            # Retries are handled here so they can honour Retry-After across batches
+            self._openai_client = openai.OpenAI(api_key=self.api_key or None, max_retries=0)
+        return self._openai_client
+    
+    def _plan_openai_batches(self, texts: List[str]) -> List[Tuple[int, List[str]]]:
+        """Split texts into (start offset, texts) batches within the per-request token budget"""
+        from ..config import settings
+        batches = []
+        current, current_tokens, start = [], 0, 0
+        for i, text in enumerate(texts):
+            tokens = estimate_tokens(text)
+            if tokens > OPENAI_MAX_INPUT_TOKENS:
+                # Keep the head of the text; the tail is dropped rather than failing the request
+                text = text[:int(len(text) * OPENAI_MAX_INPUT_TOKENS / tokens)]
+                tokens = OPENAI_MAX_INPUT_TOKENS
+            if current and (current_tokens + tokens > settings.OPENAI_EMBEDDING_BATCH_TOKENS
+                            or len(current) >= OPENAI_MAX_BATCH_INPUTS):
+                batches.append((start, current))
+                current, current_tokens, start = [], 0, i
+            current.append(text)
+            current_tokens += tokens
+        if current:
+            batches.append((start, current))
+        return batches
+    
+    def _embed_openai_batch(self, texts: List[str]) -> List[List[float]]:
+        """Embed one batch, backing off on rate limits and splitting on oversized requests"""
+        import openai
+        from ..config import settings
+        
+        for attempt in range(settings.OPENAI_EMBEDDING_MAX_RETRIES + 1):
+            # Honour a Retry-After received by any batch
+            delay = self._rate_limited_until - time.monotonic()
+            if delay > 0:
+                time.sleep(delay)
+            
+            try:
+                response = self._get_openai_client().embeddings.create(
+                    model=OPENAI_MODEL_NAME,
+                    input=texts
+                )
+                return [data.embedding for data in sorted(response.data, key=lambda d: d.index)]
+            except openai.BadRequestError:
+                # Usually a token limit: halve the batch rather than give up
+                if len(texts) == 1:
+                    raise
+                middle = len(texts) // 2
+                logger.warning(f"OpenAI rejected a batch of {len(texts)} texts, splitting it")
+                return self._embed_openai_batch(texts[:middle]) + self._embed_openai_batch(texts[middle:])
+            except (openai.RateLimitError, openai.APIConnectionError, openai.InternalServerError) as e:
+                if attempt == settings.OPENAI_EMBEDDING_MAX_RETRIES:
+                    raise
+                retry_after = _retry_after_seconds(e)
+                backoff = retry_after if retry_after is not None else min(60.0, 2 ** attempt) * (0.5 + random.random())
+                if isinstance(e, openai.RateLimitError):
+                    with self._rate_limit_lock:
+                        self._rate_limited_until = max(self._rate_limited_until, time.monotonic() + backoff)
+                logger.warning(f"OpenAI embedding attempt {attempt + 1} failed ({type(e).__name__}), retrying in {backoff:.1f}s")
+                time.sleep(backoff)
+    
     def _generate_local_embeddings(self, texts: List[str]) -> List[List[float]]:
         """Generate embeddings using local sentence transformer"""
         try:
@@ -99,3 +260,7 @@ class EmbeddingGenerator:
     def get_embedding_dimension(self) -> int:
         """Get the dimension of embeddings"""
         return self.embedding_dim
+    
+    def get_model_name(self) -> str:
+        """Get the name of the model producing the embeddings"""
+        return self.model_name
@@ -1,23 +1,76 @@
 import os
 import glob
-from typing import List, Dict, Any
+import shutil
+import tempfile
+import threading
+import time
+import functools
+from datetime import datetime
+from typing import List, Dict, Any, Optional
 import logging
 from .pdf_parser import PDFParser
 from .ocr import OCRProcessor
 from .chunker import TextChunker
 from .embedder import EmbeddingGenerator
-from .vectorstore import FAISSVectorStore
+from .vectorstore import FAISSVectorStore, find_index_versions, retire_index
+from .migration import EmbeddingMigration
 from ..config import settings
+from .. import metrics, tracing
 
 logger = logging.getLogger(__name__)
 
+
+def _forward_to_model_server(method):
+    """Run the method on the shared model server when this indexer is a client"""
+    @functools.wraps(method)
+    def wrapper(self, *args, **kwargs):
+        if self._remote is not None:
+            return self._remote.call(method.__name__, *args, **kwargs)
+        return method(self, *args, **kwargs)
+    return wrapper
+
+
+def _forward_to_writer(method):
+    """Hand index writes to the writer process when this indexer is read-only"""
+    @functools.wraps(method)
+    def wrapper(self, *args, **kwargs):
+        if getattr(self, '_writer_queue', None) is not None:
+            return self._writer_queue.submit(method.__name__, args, kwargs, timeout=settings.INDEX_WRITE_TIMEOUT_SECONDS)
+        return method(self, *args, **kwargs)
+    return wrapper
+
+
 class DocumentIndexer:
-    def __init__(self):
+    def __init__(self, use_model_server: bool = True):
+        """
+        Args:
+            use_model_server: If True and MODEL_SERVER_ADDRESS is set, act as a thin
+                client of the shared model server instead of loading the embedding
+                model and indexes in this process
+        """
+        self._remote = None
+        if use_model_server and settings.MODEL_SERVER_ADDRESS:
+            from .model_server import ModelServerClient, ModelServerError
+            try:
+                client = ModelServerClient(settings.MODEL_SERVER_ADDRESS)
+            except ModelServerError as e:
+                # Never connect without a secret: the connection unpickles payloads
+                logger.error(f"Not using the model server: {str(e)}")
+                client = None
+            if client and client.ping():
+                self._remote = client
+                logger.info(f"DocumentIndexer using model server at {settings.MODEL_SERVER_ADDRESS}")
+                return
+            logger.warning("Model server unavailable, loading embedding model in-process")
+        
         self.pdf_parser = PDFParser()
         self.ocr_processor = OCRProcessor()
         self.chunker = TextChunker(chunk_size=500, overlap=50)
         # Try Google AI first, then OpenAI, then local
-        if (settings.GOOGLE_API_KEY and 
+        if settings.EMBEDDING_BACKEND == "stub":
+            # Load testing: never call a remote embedding API
+            self.embedder = EmbeddingGenerator(use_local=True)
+        elif (settings.GOOGLE_API_KEY and 
             settings.GOOGLE_API_KEY.strip() and 
             settings.GOOGLE_API_KEY != "PUT_YOUR_GOOGLE_API_KEY_HERE" and
             settings.GOOGLE_API_KEY != "your_google_gemini_api_key_here"):
@@ -36,24 +89,223 @@ class DocumentIndexer:
             )
         # Store vector stores for different PDF types
         self.vector_stores = {}
+        self._vector_stores_lock = threading.RLock()
         self._dimension = self.embedder.get_embedding_dimension()
+        self._model_name = self.embedder.get_model_name()
+        # While a store is being re-embedded for the current model, searches are
+        # served from the previous model's store: pdf_type -> (store, embedder)
+        self._serving_stores = {}
+        self._migrations = {}
+        # Set in read-only workers of a multi-process deployment (see attach_read_only)
+        self._writer_queue = None
+        self._last_reload_check = {}
+        # pdf_type -> progress of the latest index_directory run
+        self._progress = {}
+        # pdf_type -> staging store of a rebuild in progress. Live writes go to it
+        # too, under _rebuild_lock, so the swap doesn't discard them.
+        self._rebuilds = {}
+        self._rebuild_lock = threading.Lock()
     
     def _get_vector_store(self, pdf_type: str = "chatbot") -> FAISSVectorStore:
         """Get or create vector store for a specific PDF type"""
-        if pdf_type not in self.vector_stores:
-            self.vector_stores[pdf_type] = FAISSVectorStore(
-                dimension=self._dimension,
-                pdf_type=pdf_type
+        with self._vector_stores_lock:
+            if pdf_type not in self.vector_stores:
+                vector_store = FAISSVectorStore(
+                    dimension=self._dimension,
+                    pdf_type=pdf_type,
+                    model_name=self._model_name
+                )
+                self.vector_stores[pdf_type] = vector_store
+                self._record_index_size(pdf_type)
+                # Migrating writes the index, which only the writer process may do
+                if self._writer_queue is None:
+                    self._maybe_start_migration(pdf_type, vector_store)
+            return self.vector_stores[pdf_type]
+    
+    def attach_read_only(self, writer_queue):
+        """
+        Make this indexer read-only
+        
+        Write methods are handed to the writer process through writer_queue,
+        and searches pick up the writer's saved changes from disk.
+        """
+        self._writer_queue = writer_queue
+    
+    def _refresh_from_writer(self, pdf_type: str):
+        """In a read-only indexer, reload the store if the writer saved it (throttled)"""
+        if self._writer_queue is None:
+            return
+        now = time.monotonic()
+        if now - self._last_reload_check.get(pdf_type, 0.0) < settings.INDEX_RELOAD_INTERVAL_SECONDS:
+            return
+        self._last_reload_check[pdf_type] = now
+        if self._get_vector_store(pdf_type).reload_if_changed():
+            self._record_index_size(pdf_type)
+    
+    def _record_index_size(self, pdf_type: str):
+        """Update the rag_index_vectors gauge for a live store"""
+        vector_store = self.vector_stores.get(pdf_type)
+        if vector_store is not None:
+            metrics.INDEX_VECTORS.labels(pdf_type=pdf_type).set(vector_store.get_stats()['total_vectors'])
+    
+    def _maybe_start_migration(self, pdf_type: str, vector_store: FAISSVectorStore):
+        """Re-embed an index built by another model if the current model has none"""
+        if vector_store.get_stats()['total_vectors'] > 0 and not vector_store.is_migrating():
+            return
+        
+        for version in find_index_versions(pdf_type):
+            if version['index_path'] == vector_store.index_path or version['model_name'] == self._model_name:
+                continue
+            if version['retired']:
+                # Already migrated, abandoned, or superseded by a clear or rebuild
+                continue
+            source = FAISSVectorStore(
+                dimension=version['dimension'],
+                index_path=version['index_path'],
+                pdf_type=pdf_type,
+                model_name=version['model_name']
             )
-        return self.vector_stores[pdf_type]
+            if source.get_stats()['total_vectors'] == 0:
+                continue
+            
+            # Keep answering from the old index if its model can still embed queries
+            source_embedder = EmbeddingGenerator.for_model(version['model_name']) if version['model_name'] else None
+            if source_embedder:
+                self._serving_stores[pdf_type] = (source, source_embedder)
+            else:
+                logger.warning(f"Cannot embed queries for {version['model_name']}; {pdf_type} search is empty until migration completes")
+            
+            migration = EmbeddingMigration(source, vector_store, self.embedder, on_complete=self._finish_migration,
+                                           on_failed=self._abandon_migration)
+            self._migrations[pdf_type] = migration
+            migration.start()
+            return
+    
+    def _finish_migration(self, migration: EmbeddingMigration):
+        """Cut searches over to the re-embedded store"""
+        pdf_type = migration.target.pdf_type
+        with self._vector_stores_lock:
+            if self._migrations.get(pdf_type) is migration:
+                self._serving_stores.pop(pdf_type, None)
+                del self._migrations[pdf_type]
+        retire_index(migration.source.index_path, f"migrated to {self._model_name}")
+        self._record_index_size(pdf_type)
+        logger.info(f"{pdf_type} searches now use the {self._model_name} index")
+    
+    def _abandon_migration(self, migration: EmbeddingMigration):
+        """Stop serving from the old index after a failed migration, and don't retry it on restart"""
+        pdf_type = migration.target.pdf_type
+        with self._vector_stores_lock:
+            if self._migrations.get(pdf_type) is migration:
+                self._serving_stores.pop(pdf_type, None)
+                del self._migrations[pdf_type]
+        retire_index(migration.source.index_path, f"migration to {self._model_name} failed: {migration.error}")
+        migration.target.save()
+        migration.target.set_migrating(False)
+        self._record_index_size(pdf_type)
+        logger.error(f"{pdf_type} searches now use the partial {self._model_name} index; rebuild it from the PDFs")
+    
+    def _retire_other_versions(self, pdf_type: str, reason: str):
+        """Retire every other model's index for a PDF type, so a later empty store doesn't migrate from it"""
+        current_path = self._get_vector_store(pdf_type).index_path
+        for version in find_index_versions(pdf_type):
+            if version['index_path'] != current_path and not version['retired']:
+                retire_index(version['index_path'], reason)
+    
+    def _supersede_in_migration(self, pdf_type: str, file_name: str):
+        """A live change to a file wins over its chunks still to be migrated"""
+        with self._vector_stores_lock:
+            migration = self._migrations.get(pdf_type)
+        if migration:
+            migration.supersede_file(file_name)
     
-    def index_directory(self, directory_path: str, incremental: bool = False, pdf_type: str = "chatbot") -> Dict[str, Any]:
+    def _cancel_migration(self, pdf_type: str):
+        """Abandon an in-progress migration, e.g. because the index is being rebuilt"""
+        with self._vector_stores_lock:
+            migration = self._migrations.pop(pdf_type, None)
+            self._serving_stores.pop(pdf_type, None)
+        if migration:
+            migration.cancel()
+    
+    def _get_search_target(self, pdf_type: str):
+        """Get the (vector store, embedder) pair that should answer searches"""
+        self._refresh_from_writer(pdf_type)
+        vector_store = self._get_vector_store(pdf_type)
+        with self._vector_stores_lock:
+            return self._serving_stores.get(pdf_type, (vector_store, self.embedder))
+    
+    @_forward_to_model_server
+    def get_migration_status(self, pdf_type: str = "chatbot") -> Dict[str, Any]:
+        """Get embedding migration progress for a PDF type, or None if none is running"""
+        with self._vector_stores_lock:
+            migration = self._migrations.get(pdf_type)
+        return migration.get_status() if migration else None
+    
+    def _set_progress(self, pdf_type: str, **fields):
+        with self._vector_stores_lock:
+            progress = self._progress.setdefault(pdf_type, {})
+            progress.update(fields)
+            total = progress.get('files_total') or 0
+            if total:
+                progress['percent'] = round(100.0 * progress.get('files_done', 0) / total, 1)
+            else:
+                progress['percent'] = 100.0 if progress.get('state') == 'complete' else 0.0
+    
+    @_forward_to_model_server
+    def get_indexing_progress(self, pdf_type: str = "chatbot") -> Optional[Dict[str, Any]]:
+        """Get progress of the latest index_directory run for a PDF type, or None if there was none
+        
+        Keys: state (running, complete), phase (parsing, ocr, embedding,
+        saving), files_done, files_total, current_file, percent
+        """
+        with self._vector_stores_lock:
+            progress = self._progress.get(pdf_type)
+            return dict(progress) if progress else None
+    
+    def _new_staging_store(self, pdf_type: str) -> FAISSVectorStore:
+        """An empty store in a temporary directory, for rebuilding an index off to the side"""
+        return FAISSVectorStore(
+            dimension=self._dimension,
+            index_path=os.path.join(tempfile.mkdtemp(prefix=f"staging_{pdf_type}_"), "index"),
+            pdf_type=pdf_type,
+            model_name=self._model_name
+        )
+    
+    @_forward_to_model_server
+    def get_index_generation(self, pdf_type: str = "chatbot") -> str:
+        """Identify the current contents of the index that answers searches
+        
+        The value changes whenever chunks are added, the index is cleared or
+        searches cut over to a migrated index.
+        """
+        vector_store, _ = self._get_search_target(pdf_type)
+        return f"{vector_store.index_path}#{vector_store.generation}"
+    
+    def _build_chunk_metadata(self, chunks: List[Dict[str, Any]], file_path: str) -> List[Dict[str, Any]]:
+        """Build the per-vector metadata stored alongside each chunk"""
+        # File modification time stands in for the upload date in search filters
+        modified_time = datetime.fromtimestamp(os.path.getmtime(file_path)).isoformat()
+        metadata = []
+        for chunk in chunks:
+            chunk_metadata = chunk['metadata'].copy()
+            chunk_metadata['text'] = chunk['text']  # Add text to metadata
+            chunk_metadata['file_modified_time'] = modified_time
+            metadata.append(chunk_metadata)
+        return metadata
+    
+    @_forward_to_model_server
+    @_forward_to_writer
+    def index_directory(self, directory_path: str, incremental: bool = False, pdf_type: str = "chatbot",
+                        rebuild: bool = False) -> Dict[str, Any]:
         """
         Index all PDF files in a directory
         
         Args:
             directory_path: Path to directory containing PDFs
             incremental: If True, only index files that haven't been indexed yet
+            rebuild: If True, build a fresh index off to the side and swap it in
+                when done, instead of appending to the current one. Searches
+                keep using the current index until the swap.
         """
         if not os.path.exists(directory_path):
             logger.error(f"Directory not found: {directory_path}")
@@ -65,6 +317,15 @@ class DocumentIndexer:
         
         # Get vector store for this PDF type
         vector_store = self._get_vector_store(pdf_type)
+        target_store = vector_store
+        if rebuild:
+            # The rebuilt index supersedes any re-embedding in progress
+            self._cancel_migration(pdf_type)
+            target_store = self._new_staging_store(pdf_type)
+            with self._rebuild_lock:
+                self._rebuilds[pdf_type] = target_store
+        self._set_progress(pdf_type, state='running', phase='parsing', files_done=0,
+                           files_total=len(pdf_files), current_file=None)
         
         # If incremental, check which files are already indexed
         indexed_files = set()
@@ -86,6 +347,8 @@ class DocumentIndexer:
                     continue
                 
                 logger.info(f"Processing: {os.path.basename(pdf_file)}")
+                file_started = time.monotonic()
+                self._set_progress(pdf_type, phase='parsing', current_file=os.path.basename(pdf_file))
                 
                 # Parse PDF
                 pdf_data = self.pdf_parser.extract_text_from_pdf(pdf_file)
@@ -96,6 +359,7 @@ class DocumentIndexer:
                 # Apply OCR if needed
                 if pdf_data.get('needs_ocr', False):
                     logger.info(f"Applying OCR to {os.path.basename(pdf_file)}")
+                    self._set_progress(pdf_type, phase='ocr')
                     pdf_data = self.ocr_processor.extract_text_with_ocr(pdf_data)
                 
                 # Create chunks
@@ -105,6 +369,7 @@ class DocumentIndexer:
                     continue
                 
                 # Generate embeddings
+                self._set_progress(pdf_type, phase='embedding')
                 texts = [chunk['text'] for chunk in chunks]
                 embeddings = self.embedder.generate_embeddings(texts)
                 
@@ -112,22 +377,51 @@ class DocumentIndexer:
                     logger.error(f"Failed to generate embeddings for {os.path.basename(pdf_file)}")
                     continue
                 
-                # Add to vector store
-                metadata = []
-                for chunk in chunks:
-                    chunk_metadata = chunk['metadata'].copy()
-                    chunk_metadata['text'] = chunk['text']  # Add text to metadata
-                    metadata.append(chunk_metadata)
-                vector_store.add_vectors(embeddings, metadata)
+                # Add to vector store (a staging store is saved once, at the swap)
+                metadata = self._build_chunk_metadata(chunks, pdf_file)
+                if rebuild:
+                    # The file may have been indexed live meanwhile; keep one copy
+                    target_store.replace_file(os.path.basename(pdf_file), embeddings, metadata, persist=False)
+                else:
+                    target_store.add_vectors(embeddings, metadata)
                 
                 processed_files += 1
                 total_chunks += len(chunks)
+                metrics.observe_file_indexed(pdf_type, pdf_data, len(chunks), time.monotonic() - file_started)
                 logger.info(f"Successfully processed {os.path.basename(pdf_file)}: {len(chunks)} chunks")
                 
             except Exception as e:
                 error_msg = f"{pdf_file}: {str(e)}"
                 logger.error(error_msg)
                 errors.append(error_msg)
+                metrics.ERRORS.labels(component='indexing').inc()
+            finally:
+                with self._vector_stores_lock:
+                    files_done = self._progress[pdf_type].get('files_done', 0) + 1
+                self._set_progress(pdf_type, files_done=files_done)
+        
+        if rebuild:
+            self._set_progress(pdf_type, phase='saving', current_file=None)
+            with self._rebuild_lock:
+                del self._rebuilds[pdf_type]
+                # Keep the current index if nothing could be rebuilt (e.g. the embedder is down)
+                if processed_files > 0 or not pdf_files:
+                    # Files deleted while the rebuild was parsing them
+                    for file_name in target_store.get_indexed_files():
+                        if not os.path.exists(os.path.join(directory_path, file_name)):
+                            target_store.remove_file(file_name, persist=False)
+                    vector_store.replace_with(target_store)
+                    vector_store.set_migrating(False)
+                    swapped = True
+                else:
+                    swapped = False
+            if swapped:
+                self._retire_other_versions(pdf_type, "superseded by a rebuild")
+            else:
+                logger.warning(f"Rebuild of {pdf_type} index produced nothing; keeping the current index")
+            shutil.rmtree(os.path.dirname(target_store.index_path), ignore_errors=True)
+        self._set_progress(pdf_type, state='complete', current_file=None)
+        self._record_index_size(pdf_type)
         
         return {
             'processed_files': processed_files,
@@ -136,13 +430,18 @@ class DocumentIndexer:
             'vector_store_stats': vector_store.get_stats()
         }
     
-    def index_single_file(self, file_path: str, pdf_type: str = "chatbot") -> Dict[str, Any]:
+    @_forward_to_model_server
+    @_forward_to_writer
+    def index_single_file(self, file_path: str, pdf_type: str = "chatbot", replace: bool = False) -> Dict[str, Any]:
         """
         Index a single PDF file
         
         Args:
             file_path: Path to PDF file
             pdf_type: Type of PDF (chatbot, submission, notification)
+            replace: If True, swap the file's existing vectors for the new
+                ones (the file was modified). The old ones stay searchable
+                until the new embeddings are ready.
             
         Returns:
             Dictionary with indexing result
@@ -153,6 +452,7 @@ class DocumentIndexer:
         try:
             vector_store = self._get_vector_store(pdf_type)
             logger.info(f"Indexing single file: {os.path.basename(file_path)}")
+            file_started = time.monotonic()
             
             # Parse PDF
             pdf_data = self.pdf_parser.extract_text_from_pdf(file_path)
@@ -177,12 +477,20 @@ class DocumentIndexer:
                 return {'error': 'Failed to generate embeddings', 'processed': False}
             
             # Add to vector store
-            metadata = []
-            for chunk in chunks:
-                chunk_metadata = chunk['metadata'].copy()
-                chunk_metadata['text'] = chunk['text']
-                metadata.append(chunk_metadata)
-            vector_store.add_vectors(embeddings, metadata)
+            metadata = self._build_chunk_metadata(chunks, file_path)
+            file_name = os.path.basename(file_path)
+            self._supersede_in_migration(pdf_type, file_name)
+            with self._rebuild_lock:
+                if replace:
+                    vector_store.replace_file(file_name, embeddings, metadata)
+                else:
+                    vector_store.add_vectors(embeddings, metadata)
+                staging = self._rebuilds.get(pdf_type)
+                if staging is not None:
+                    # Otherwise the rebuild in progress would drop this file at its swap
+                    staging.replace_file(file_name, embeddings, metadata, persist=False)
+            metrics.observe_file_indexed(pdf_type, pdf_data, len(chunks), time.monotonic() - file_started)
+            self._record_index_size(pdf_type)
             
             logger.info(f"Successfully indexed {os.path.basename(file_path)}: {len(chunks)} chunks")
             
@@ -195,47 +503,134 @@ class DocumentIndexer:
             
         except Exception as e:
             logger.error(f"Error indexing file {file_path}: {str(e)}")
+            metrics.ERRORS.labels(component='indexing').inc()
             return {'error': str(e), 'processed': False}
     
-    def search_documents(self, query: str, k: int = 5, pdf_type: str = "chatbot") -> List[Dict[str, Any]]:
+    @_forward_to_model_server
+    @_forward_to_writer
+    def remove_file(self, file_name: str, pdf_type: str = "chatbot") -> Dict[str, Any]:
+        """
+        Remove a deleted file's vectors from the index
+        
+        Args:
+            file_name: Base name of the PDF
+            pdf_type: Type of PDF (chatbot, submission, notification)
+            
+        Returns:
+            Dictionary with the number of vectors removed
+        """
+        vector_store = self._get_vector_store(pdf_type)
+        self._supersede_in_migration(pdf_type, file_name)
+        with self._rebuild_lock:
+            removed = vector_store.remove_file(file_name)
+            staging = self._rebuilds.get(pdf_type)
+            if staging is not None:
+                staging.remove_file(file_name, persist=False)
+        with self._vector_stores_lock:
+            serving = self._serving_stores.get(pdf_type)
+        if serving:
+            # Also hide it from the previous model's index while a migration is serving from it
+            serving[0].remove_file(file_name, persist=False)
+        self._record_index_size(pdf_type)
+        return {'file_name': file_name, 'removed_vectors': removed,
+                'vector_store_stats': vector_store.get_stats()}
+    
+    @_forward_to_model_server
+    def get_indexed_files(self, pdf_type: str = "chatbot") -> Dict[str, Optional[str]]:
+        """File name -> modification time (ISO) of the version that is indexed"""
+        self._refresh_from_writer(pdf_type)
+        return self._get_vector_store(pdf_type).get_indexed_files()
+    
+    @_forward_to_model_server
+    def search_documents(self, query: str, k: int = 5, pdf_type: str = "chatbot",
+                         filters: Optional[Dict[str, Any]] = None) -> List[Dict[str, Any]]:
         """Search for relevant document chunks"""
         if not query.strip():
             return []
         
+        with tracing.span('search', k=k, pdf_type=pdf_type):
+            return self.search_batch([query], k=k, pdf_type=pdf_type, filters=filters)[0]
+    
+    @_forward_to_model_server
+    def search_batch(self, queries: List[str], k: int = 5, pdf_type: str = "chatbot",
+                     filters: Optional[Dict[str, Any]] = None) -> List[List[Dict[str, Any]]]:
+        """
+        Search for relevant document chunks for many queries at once
+        
+        All queries are embedded in one call and searched with a single
+        FAISS call, which is much cheaper than calling search_documents
+        in a loop.
+        
+        Args:
+            queries: Query strings
+            k: Number of results per query
+            pdf_type: Type of PDF (chatbot, submission, notification)
+            filters: Optional metadata filter applied inside FAISS, e.g.
+                {'file_name': 'Briefing.pdf', 'page_min': 1, 'page_max': 5}
+                (see FAISSVectorStore._select_ids for all keys)
+            
+        Returns:
+            One list of formatted results per query, in the same order
+        """
+        batch_results = [[] for _ in queries]
+        # Blank queries get no results; only embed the rest
+        positions = [i for i, query in enumerate(queries) if query and query.strip()]
+        if not positions:
+            return batch_results
+        
         try:
-            vector_store = self._get_vector_store(pdf_type)
-            # Generate query embedding
-            query_embeddings = self.embedder.generate_embeddings([query])
-            if not query_embeddings:
-                return []
+            vector_store, embedder = self._get_search_target(pdf_type)
+            # Generate query embeddings
+            with tracing.span('query_embedding'), metrics.time_stage('query_embedding'):
+                query_embeddings = embedder.generate_embeddings([queries[i] for i in positions])
+            if len(query_embeddings) != len(positions):
+                return batch_results
             
             # Search vector store
-            results = vector_store.search(query_embeddings[0], k=k)
+            with tracing.span('faiss_search'), metrics.time_stage('faiss_search'):
+                results_per_query = vector_store.search_batch(query_embeddings, k=k, filters=filters)
             
             # Format results
-            formatted_results = []
-            for metadata, score in results:
-                formatted_results.append({
-                    'text': metadata.get('text', ''),
-                    'file_name': metadata.get('file_name', ''),
-                    'page_number': metadata.get('page_number', 0),
-                    'score': score,
-                    'metadata': metadata
-                })
-            
-            return formatted_results
+            for position, results in zip(positions, results_per_query):
+                batch_results[position] = [
+                    {
+                        'text': metadata.get('text', ''),
+                        'file_name': metadata.get('file_name', ''),
+                        'page_number': metadata.get('page_number', 0),
+                        'score': score,
+                        'metadata': metadata
+                    }
+                    for metadata, score in results
+                ]
+            
+            return batch_results
             
         except Exception as e:
             logger.error(f"Search error: {str(e)}")
-            return []
+            metrics.ERRORS.labels(component='search').inc()
+            return [[] for _ in queries]
     
+    @_forward_to_model_server
     def get_stats(self, pdf_type: str = "chatbot") -> Dict[str, Any]:
         """Get indexing statistics for a specific PDF type"""
+        self._refresh_from_writer(pdf_type)
         vector_store = self._get_vector_store(pdf_type)
-        return vector_store.get_stats()
+        stats = vector_store.get_stats()
+        migration = self.get_migration_status(pdf_type)
+        if migration:
+            stats['migration'] = migration
+        return stats
     
+    @_forward_to_model_server
+    @_forward_to_writer
     def clear_index(self, pdf_type: str = "chatbot"):
         """Clear all indexed documents for a specific PDF type"""
         vector_store = self._get_vector_store(pdf_type)
+        # A rebuild from the PDFs supersedes any re-embedding in progress
+        self._cancel_migration(pdf_type)
         vector_store.clear()
+        vector_store.set_migrating(False)
+        # Otherwise the next start would re-embed the old model's index into the empty store
+        self._retire_other_versions(pdf_type, "superseded by clearing the index")
+        self._record_index_size(pdf_type)
         logger.info(f"Cleared document index for {pdf_type}")
@@ -0,0 +1,125 @@
+import threading
+import logging
+from typing import Callable, Dict, Any, Optional, Set
+from .embedder import EmbeddingGenerator
+from .vectorstore import FAISSVectorStore
+
+logger = logging.getLogger(__name__)
+
+class EmbeddingMigration:
+    """
+    Re-embed the chunks of one vector store into another in the background.
+
+    Chunk texts are read from the source store's metadata, so no PDF is
+    re-parsed or re-OCR'd. The target store is flagged as migrating on disk
+    until every chunk has been embedded, so a restart mid-migration starts
+    over instead of serving a partial index.
+
+    Files indexed or removed live while the migration runs are superseded:
+    their chunks from the source are skipped, so an old version or a
+    deleted document doesn't reappear in the target.
+    """
+
+    def __init__(self, source: FAISSVectorStore, target: FAISSVectorStore,
+                 embedder: EmbeddingGenerator,
+                 on_complete: Optional[Callable[['EmbeddingMigration'], None]] = None,
+                 on_failed: Optional[Callable[['EmbeddingMigration'], None]] = None,
+                 batch_size: int = 64):
+        self.source = source
+        self.target = target
+        self.embedder = embedder
+        self.on_complete = on_complete
+        self.on_failed = on_failed
+        self.batch_size = batch_size
+        self.state = "pending"
+        self.migrated = 0
+        self.total = 0
+        self.error = None
+        self._cancelled = threading.Event()
+        self._thread = None
+        self._superseded: Set[str] = set()
+        # Held while a batch is filtered and added, so supersede_file() never races an add
+        self._add_lock = threading.Lock()
+
+    def start(self):
+        """Start migrating on a daemon thread"""
+        # Reset the target before returning so chunks indexed live while the
+        # migration runs are not wiped by it
+        self.target.set_migrating(True)
+        self.target.clear()
+        self._thread = threading.Thread(
+            target=self._run,
+            name=f"embedding-migration-{self.target.pdf_type}",
+            daemon=True
+        )
+        self._thread.start()
+
+    def cancel(self, wait: bool = True):
+        """Stop the migration; the target store is left flagged as incomplete"""
+        self._cancelled.set()
+        if wait and self._thread and self._thread is not threading.current_thread():
+            self._thread.join()
+
+    def supersede_file(self, file_name: str):
+        """Skip a file's source chunks from now on; once this returns, none are added to the target"""
+        with self._add_lock:
+            self._superseded.add(file_name)
+
+    def is_running(self) -> bool:
+        return self.state in ("pending", "running")
+
+    def _run(self):
+        self.state = "running"
+        try:
+            logger.info(f"Migrating {self.target.pdf_type} index from {self.source.model_name} to {self.target.model_name}")
+
+            # Chunks without text can't be re-embedded; they are dropped
+            chunks = [meta for meta in self.source.get_metadata_snapshot() if meta.get('text')]
+            self.total = len(chunks)
+
+            for start in range(0, len(chunks), self.batch_size):
+                if self._cancelled.is_set():
+                    self.state = "cancelled"
+                    logger.info(f"Migration of {self.target.pdf_type} index cancelled at {self.migrated}/{self.total}")
+                    return
+
+                batch = chunks[start:start + self.batch_size]
+                embeddings = self.embedder.generate_embeddings([meta['text'] for meta in batch])
+                if len(embeddings) != len(batch):
+                    raise RuntimeError(f"Embedder returned {len(embeddings)} vectors for {len(batch)} chunks")
+
+                with self._add_lock:
+                    kept = [i for i, meta in enumerate(batch) if meta.get('file_name') not in self._superseded]
+                    self.target.add_vectors([embeddings[i] for i in kept], [dict(batch[i]) for i in kept], persist=False)
+                self.migrated += len(batch)
+
+            if self._cancelled.is_set():
+                self.state = "cancelled"
+                return
+
+            self.target.save()
+            self.target.set_migrating(False)
+            self.state = "complete"
+            logger.info(f"Migration of {self.target.pdf_type} index complete: {self.migrated} chunks")
+
+        except Exception as e:
+            self.state = "failed"
+            self.error = str(e)
+            logger.error(f"Migration of {self.target.pdf_type} index failed: {str(e)}")
+            if self.on_failed:
+                self.on_failed(self)
+            return
+
+        if self.on_complete:
+            self.on_complete(self)
+
+    def get_status(self) -> Dict[str, Any]:
+        """Get migration progress"""
+        return {
+            'state': self.state,
+            'source_model': self.source.model_name,
+            'target_model': self.target.model_name,
+            'migrated': self.migrated,
+            'total': self.total,
+            'error': self.error
+        }
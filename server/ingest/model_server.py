@@ -0,0 +1,229 @@
+"""
+Local model server that owns the embedding model and the FAISS indexes.
+
+Every uvicorn worker and Streamlit process normally builds its own
+DocumentIndexer, which loads its own copy of the embedding model and of each
+index. When MODEL_SERVER_ADDRESS is set, DocumentIndexer instead forwards its
+calls to this process, so the model is loaded once per host no matter how
+many workers there are.
+
+Run it with:
+
+    python -m server.ingest.model_server
+
+The address is a Unix socket path (e.g. /tmp/itp-model.sock) or, where Unix
+sockets are unavailable, host:port on the loopback interface.
+
+multiprocessing.connection unpickles what it receives, so a client that
+knows the secret can run code in the server. The secret is
+MODEL_SERVER_AUTHKEY, or else a random one the server writes to
+MODEL_SERVER_AUTHKEY_FILE (mode 0600, so only the deployment's user can
+read it); without either, the server won't start and clients won't
+connect. The Unix socket is created with mode 0600 as well.
+"""
+
+import logging
+import os
+import secrets
+import stat
+import threading
+from multiprocessing.connection import Listener, Client
+from typing import Any, Optional
+
+from ..config import settings
+
+logger = logging.getLogger(__name__)
+
+# DocumentIndexer methods that clients may call
+EXPOSED_METHODS = {
+    'search_documents',
+    'search_batch',
+    'index_directory',
+    'index_single_file',
+    'remove_file',
+    'get_indexed_files',
+    'get_stats',
+    'clear_index',
+    'get_migration_status',
+    'get_index_generation',
+    'get_indexing_progress',
+}
+
+
+def _parse_address(address: str):
+    """Turn 'host:port' into a TCP address tuple; anything else is a Unix socket path"""
+    host, sep, port = address.rpartition(':')
+    if sep and port.isdigit() and '/' not in address:
+        return (host or '127.0.0.1', int(port))
+    return address
+
+
+def _family(address) -> str:
+    return 'AF_INET' if isinstance(address, tuple) else 'AF_UNIX'
+
+
+class ModelServerError(Exception):
+    """Raised on the client when the model server reports an error"""
+
+
+def resolve_authkey(create: bool = False) -> bytes:
+    """
+    The model server secret: MODEL_SERVER_AUTHKEY, or the contents of MODEL_SERVER_AUTHKEY_FILE
+
+    Args:
+        create: Generate the key file if it doesn't exist (server side only)
+
+    Raises:
+        ModelServerError: If no secret is configured, or the key file is readable by other users
+    """
+    if settings.MODEL_SERVER_AUTHKEY:
+        return settings.MODEL_SERVER_AUTHKEY.encode()
+
+    path = settings.MODEL_SERVER_AUTHKEY_FILE
+    if create and not os.path.exists(path):
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        try:
+            fd = os.open(path, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o600)
+        except FileExistsError:
+            pass  # Another server process created it first
+        else:
+            with os.fdopen(fd, 'w', encoding='utf-8') as f:
+                f.write(secrets.token_hex(32))
+            logger.info(f"Generated model server secret in {path}")
+
+    try:
+        mode = os.stat(path).st_mode
+        with open(path, 'r', encoding='utf-8') as f:
+            key = f.read().strip()
+    except FileNotFoundError:
+        raise ModelServerError(
+            f"No model server secret: set MODEL_SERVER_AUTHKEY or start the model server to create {path}"
+        )
+    if mode & (stat.S_IRWXG | stat.S_IRWXO):
+        raise ModelServerError(f"{path} is accessible by other users; chmod 600 it")
+    if not key:
+        raise ModelServerError(f"{path} is empty")
+    return key.encode()
+
+
+class ModelServerClient:
+    """Thin RPC client for the model server, one connection per thread"""
+
+    def __init__(self, address: str, authkey: Optional[bytes] = None):
+        self.address = _parse_address(address)
+        self.authkey = authkey if authkey is not None else resolve_authkey()
+        self._local = threading.local()
+
+    def _connection(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = Client(self.address, family=_family(self.address), authkey=self.authkey)
+            self._local.conn = conn
+        return conn
+
+    def _reset(self):
+        conn = getattr(self._local, 'conn', None)
+        self._local.conn = None
+        if conn is not None:
+            try:
+                conn.close()
+            except Exception:
+                pass
+
+    def ping(self) -> bool:
+        """Check that the server is reachable"""
+        try:
+            return self.call('ping') == 'pong'
+        except Exception as e:
+            logger.warning(f"Model server at {self.address} is not reachable: {str(e)}")
+            return False
+
+    def call(self, method: str, *args, **kwargs) -> Any:
+        """Call a DocumentIndexer method on the server, reconnecting once if the connection dropped"""
+        try:
+            conn = self._connection()
+            conn.send((method, args, kwargs))
+        except (EOFError, ConnectionError, OSError):
+            # Stale connection (e.g. the server restarted); nothing was sent, so retrying is safe
+            self._reset()
+            conn = self._connection()
+            conn.send((method, args, kwargs))
+
+        try:
+            status, payload = conn.recv()
+        except (EOFError, ConnectionError, OSError):
+            self._reset()
+            raise
+        if status == 'error':
+            raise ModelServerError(payload)
+        return payload
+
+
+class ModelServer:
+    """Serve one in-process DocumentIndexer to many client processes"""
+
+    def __init__(self, address: str, authkey: Optional[bytes] = None):
+        from .indexer import DocumentIndexer
+        self.address = _parse_address(address)
+        # Before loading anything: refuse to start without a secret
+        self.authkey = authkey if authkey is not None else resolve_authkey(create=True)
+        # The server is the one process that really loads the model and indexes
+        self.indexer = DocumentIndexer(use_model_server=False)
+        self._listener = None
+
+    def serve_forever(self):
+        """Accept connections and handle each on its own thread"""
+        if _family(self.address) == 'AF_UNIX' and os.path.exists(self.address):
+            # Left behind by a previous server that didn't shut down cleanly
+            os.unlink(self.address)
+        # Create the socket file as 0600, so other local users can't even attempt the handshake
+        previous_umask = os.umask(0o177)
+        try:
+            self._listener = Listener(self.address, family=_family(self.address), authkey=self.authkey)
+        finally:
+            os.umask(previous_umask)
+        logger.info(f"Model server listening on {self.address}")
+        try:
+            while True:
+                try:
+                    conn = self._listener.accept()
+                except Exception as e:
+                    # Failed handshakes (e.g. wrong authkey) must not stop the server
+                    logger.warning(f"Model server rejected a connection: {str(e)}")
+                    continue
+                threading.Thread(target=self._handle, args=(conn,), daemon=True).start()
+        finally:
+            self._listener.close()
+
+    def _handle(self, conn):
+        with conn:
+            while True:
+                try:
+                    method, args, kwargs = conn.recv()
+                except (EOFError, OSError):
+                    return
+
+                if method == 'ping':
+                    conn.send(('ok', 'pong'))
+                    continue
+                if method not in EXPOSED_METHODS:
+                    conn.send(('error', f"Method not allowed: {method}"))
+                    continue
+
+                try:
+                    result = getattr(self.indexer, method)(*args, **kwargs)
+                    conn.send(('ok', result))
+                except Exception as e:
+                    logger.error(f"Model server error in {method}: {str(e)}")
+                    conn.send(('error', str(e)))
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    if not settings.MODEL_SERVER_ADDRESS:
+        raise SystemExit("Set MODEL_SERVER_ADDRESS to a socket path or host:port")
+    try:
+        server = ModelServer(settings.MODEL_SERVER_ADDRESS)
+    except ModelServerError as e:
+        raise SystemExit(str(e))
+    server.serve_forever()
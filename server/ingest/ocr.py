@@ -1,6 +1,3 @@
-import pytesseract
-from PIL import Image
-from pdf2image import convert_from_path
 import logging
 from typing import Dict, Any
 import os
@@ -10,11 +7,23 @@ logger = logging.getLogger(__name__)
 
 class OCRProcessor:
     def __init__(self):
+        # Tesseract is located on first use; probing it spawns a process
+        self._ocr_available = None
+    
+    @property
+    def ocr_available(self) -> bool:
+        if self._ocr_available is None:
+            self._ocr_available = self._find_tesseract()
+        return self._ocr_available
+    
+    def _find_tesseract(self) -> bool:
+        """Check whether Tesseract is installed, trying common Windows paths"""
+        import pytesseract
         # Try to find tesseract executable
-        self.ocr_available = False
+        available = False
         try:
             pytesseract.get_tesseract_version()
-            self.ocr_available = True
+            available = True
             logger.info("Tesseract OCR is available")
         except Exception:
             # Common Windows paths
@@ -28,14 +37,16 @@ class OCRProcessor:
                     pytesseract.pytesseract.tesseract_cmd = path
                     try:
                         pytesseract.get_tesseract_version()
-                        self.ocr_available = True
+                        available = True
                         logger.info(f"Tesseract OCR found at: {path}")
                         break
                     except:
                         continue
             
-            if not self.ocr_available:
+            if not available:
                 logger.warning("Tesseract OCR not found. OCR functionality will be disabled.")
+        
+        return available
     
     def extract_text_with_ocr(self, pdf_data: Dict[str, Any]) -> Dict[str, Any]:
         """Apply OCR to pages that need it"""
@@ -51,6 +62,9 @@ class OCRProcessor:
             }
         
         try:
+            import pytesseract
+            from pdf2image import convert_from_path
+            
             enhanced_pages = []
             
             for page_data in pdf_data['pages']:
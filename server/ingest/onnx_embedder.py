@@ -0,0 +1,158 @@
+import json
+import logging
+from pathlib import Path
+from typing import List, Dict, Any
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+# Sentences used to check the exported model against the PyTorch one
+PARITY_SENTENCES = [
+    "What is the submission deadline for Form A?",
+    "Students must complete the industrial training programme before graduation.",
+    "Weekly logs are emailed to the faculty supervisor.",
+    "hello",
+]
+
+# Minimum cosine similarity between ONNX and PyTorch vectors on PARITY_SENTENCES
+MIN_PARITY_COSINE = 0.99
+
+
+class OnnxSentenceEncoder:
+    """
+    CPU sentence encoder running an ONNX export of a sentence-transformers model.
+
+    Reproduces the all-MiniLM-L6-v2 pipeline (tokenize, transformer, mean
+    pooling, L2 normalisation) with onnxruntime and the `tokenizers` library
+    only, so encoding does not import torch. Exposes the subset of
+    SentenceTransformer.encode used by EmbeddingGenerator.
+    """
+
+    def __init__(self, model_dir: str, quantized: bool = True, max_seq_length: int = 256):
+        import onnxruntime
+        from tokenizers import Tokenizer
+
+        model_dir = Path(model_dir)
+        model_file = model_dir / ("model_int8.onnx" if quantized else "model.onnx")
+
+        options = onnxruntime.SessionOptions()
+        options.graph_optimization_level = onnxruntime.GraphOptimizationLevel.ORT_ENABLE_ALL
+        self.session = onnxruntime.InferenceSession(
+            str(model_file), sess_options=options, providers=["CPUExecutionProvider"]
+        )
+        self.input_names = {i.name for i in self.session.get_inputs()}
+
+        self.tokenizer = Tokenizer.from_file(str(model_dir / "tokenizer.json"))
+        self.tokenizer.enable_truncation(max_length=max_seq_length)
+        self.tokenizer.enable_padding(pad_id=0, pad_token="[PAD]")
+
+    @classmethod
+    def load_or_export(cls, model_name: str, cache_dir: str, quantize: bool = True) -> 'OnnxSentenceEncoder':
+        """Load a cached ONNX export of model_name, exporting (and parity-checking) it first if needed"""
+        model_dir = Path(cache_dir) / model_name
+        manifest_path = model_dir / "export.json"
+        model_file = model_dir / ("model_int8.onnx" if quantize else "model.onnx")
+
+        if not (manifest_path.exists() and model_file.exists()):
+            export_model(model_name, str(model_dir), quantize=quantize)
+
+        with open(manifest_path, 'r', encoding='utf-8') as f:
+            manifest = json.load(f)
+        parity = manifest.get("parity", {}).get("int8" if quantize else "fp32")
+        if parity is not None and parity < MIN_PARITY_COSINE:
+            raise RuntimeError(f"ONNX export of {model_name} failed parity check (cosine {parity:.4f})")
+
+        logger.info(f"Loaded ONNX embedding model from {model_file}")
+        return cls(str(model_dir), quantized=quantize)
+
+    def encode(self, texts: List[str], batch_size: int = 32, convert_to_tensor: bool = False, **kwargs) -> np.ndarray:
+        """Encode texts into L2-normalised sentence embeddings"""
+        if isinstance(texts, str):
+            texts = [texts]
+
+        batches = []
+        for start in range(0, len(texts), batch_size):
+            encodings = self.tokenizer.encode_batch(texts[start:start + batch_size])
+            input_ids = np.array([e.ids for e in encodings], dtype=np.int64)
+            attention_mask = np.array([e.attention_mask for e in encodings], dtype=np.int64)
+
+            feeds = {"input_ids": input_ids, "attention_mask": attention_mask}
+            if "token_type_ids" in self.input_names:
+                feeds["token_type_ids"] = np.array([e.type_ids for e in encodings], dtype=np.int64)
+
+            token_embeddings = self.session.run(None, feeds)[0]
+            batches.append(_mean_pool_and_normalize(token_embeddings, attention_mask))
+
+        if not batches:
+            return np.zeros((0, 0), dtype=np.float32)
+        return np.concatenate(batches).astype(np.float32)
+
+
+def _mean_pool_and_normalize(token_embeddings: np.ndarray, attention_mask: np.ndarray) -> np.ndarray:
+    mask = attention_mask[:, :, None].astype(np.float32)
+    summed = (token_embeddings * mask).sum(axis=1)
+    counts = np.clip(mask.sum(axis=1), 1e-9, None)
+    pooled = summed / counts
+    norms = np.clip(np.linalg.norm(pooled, axis=1, keepdims=True), 1e-12, None)
+    return pooled / norms
+
+
+def export_model(model_name: str, model_dir: str, quantize: bool = True) -> Dict[str, Any]:
+    """
+    Export a sentence-transformers model to ONNX (and optionally int8)
+
+    This is the only step that needs torch. The exported vectors are compared
+    with the PyTorch model on PARITY_SENTENCES and the cosine similarities
+    are recorded in export.json next to the model.
+
+    Returns:
+        The export manifest
+    """
+    import torch
+    from sentence_transformers import SentenceTransformer
+
+    model_dir = Path(model_dir)
+    model_dir.mkdir(parents=True, exist_ok=True)
+    logger.info(f"Exporting {model_name} to ONNX in {model_dir}")
+
+    st_model = SentenceTransformer(model_name)
+    transformer = st_model[0].auto_model.eval()
+    hf_tokenizer = st_model.tokenizer
+    hf_tokenizer.save_pretrained(str(model_dir))
+
+    sample = hf_tokenizer(["export sample"], return_tensors="pt")
+    input_names = [name for name in ("input_ids", "attention_mask", "token_type_ids") if name in sample]
+    dynamic_axes = {name: {0: "batch", 1: "sequence"} for name in input_names}
+    dynamic_axes["last_hidden_state"] = {0: "batch", 1: "sequence"}
+
+    fp32_path = model_dir / "model.onnx"
+    with torch.no_grad():
+        torch.onnx.export(
+            transformer,
+            tuple(sample[name] for name in input_names),
+            str(fp32_path),
+            input_names=input_names,
+            output_names=["last_hidden_state"],
+            dynamic_axes=dynamic_axes,
+            opset_version=14,
+        )
+
+    if quantize:
+        from onnxruntime.quantization import quantize_dynamic, QuantType
+        quantize_dynamic(str(fp32_path), str(model_dir / "model_int8.onnx"), weight_type=QuantType.QInt8)
+
+    # Parity check against the PyTorch path
+    reference = st_model.encode(PARITY_SENTENCES, convert_to_tensor=False)
+    reference = reference / np.linalg.norm(reference, axis=1, keepdims=True)
+    parity = {}
+    for variant, quantized in (("fp32", False), ("int8", True)):
+        if quantized and not quantize:
+            continue
+        vectors = OnnxSentenceEncoder(str(model_dir), quantized=quantized).encode(PARITY_SENTENCES)
+        parity[variant] = float(np.min(np.sum(vectors * reference, axis=1)))
+        logger.info(f"ONNX {variant} parity for {model_name}: min cosine {parity[variant]:.4f}")
+
+    manifest = {"model_name": model_name, "quantized": quantize, "parity": parity}
+    with open(model_dir / "export.json", 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, indent=2)
+    return manifest
@@ -2,21 +2,175 @@ import faiss
 import numpy as np
 import pickle
 import os
-from typing import List, Dict, Any, Tuple
+import re
+import glob
+import json
+import threading
+from contextlib import contextmanager
+from datetime import datetime
+from typing import List, Dict, Any, Tuple, Optional
 import logging
 
 logger = logging.getLogger(__name__)
 
+# Embedding models keyed by output dimension. Used to tag index files that were
+# written before indexes were versioned by model.
+KNOWN_EMBEDDING_MODELS = {
+    384: "all-MiniLM-L6-v2",
+    1536: "text-embedding-ada-002",
+}
+
+
+# Keys accepted by FAISSVectorStore search filters
+FILTER_KEYS = {'file_name', 'page_min', 'page_max', 'modified_after', 'modified_before', 'ocr_applied'}
+
+
+def _to_timestamp(value: Any) -> float:
+    """Convert a datetime, ISO string or number to a POSIX timestamp (NaN if missing)"""
+    if value is None or value == '':
+        return float('nan')
+    if isinstance(value, datetime):
+        return value.timestamp()
+    if isinstance(value, str):
+        return datetime.fromisoformat(value).timestamp()
+    return float(value)
+
+
+def model_slug(model_name: str) -> str:
+    """Filesystem-safe tag for an embedding model name"""
+    return re.sub(r'[^a-z0-9]+', '-', model_name.lower()).strip('-')
+
+
+def default_index_base(pdf_type: str) -> str:
+    """Unversioned index base path for a PDF type (pre-versioning layout)"""
+    from ..config import settings
+    return os.path.join(settings.DATA_FOLDER, f"faiss_index_{pdf_type}")
+
+
+def versioned_index_base(pdf_type: str, model_name: str) -> str:
+    """Index base path for a PDF type embedded with a specific model"""
+    return f"{default_index_base(pdf_type)}__{model_slug(model_name)}"
+
+
+def _read_index_info(index_path: str) -> Optional[Dict[str, Any]]:
+    """Read model name and dimension of an index from its sidecar, or the index itself"""
+    info_path = f"{index_path}_info.json"
+    if os.path.exists(info_path):
+        try:
+            with open(info_path, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except Exception as e:
+            logger.warning(f"Failed to read index info {info_path}: {str(e)}")
+    try:
+        dimension = faiss.read_index(f"{index_path}.index").d
+    except Exception as e:
+        logger.warning(f"Failed to read index {index_path}: {str(e)}")
+        return None
+    return {'model_name': KNOWN_EMBEDDING_MODELS.get(dimension), 'dimension': dimension}
+
+
+def find_index_versions(pdf_type: str) -> List[Dict[str, Any]]:
+    """
+    List the on-disk indexes for a PDF type, newest first
+    
+    Returns:
+        List of dicts with index_path, model_name (None if unknown), dimension,
+        modified_time and retired (superseded, never to be migrated from)
+    """
+    base = default_index_base(pdf_type)
+    candidates = [base] + [path[:-len('.index')] for path in glob.glob(f"{glob.escape(base)}__*.index")]
+    
+    versions = []
+    for index_path in candidates:
+        if not os.path.exists(f"{index_path}.index"):
+            continue
+        info = _read_index_info(index_path)
+        if not info:
+            continue
+        versions.append({
+            'index_path': index_path,
+            'model_name': info.get('model_name'),
+            'dimension': info.get('dimension'),
+            'modified_time': os.path.getmtime(f"{index_path}.index"),
+            'retired': os.path.exists(f"{index_path}.retired")
+        })
+    
+    versions.sort(key=lambda v: v['modified_time'], reverse=True)
+    return versions
+
+
+def retire_index(index_path: str, reason: str):
+    """
+    Mark an on-disk index as superseded, so it is never migrated from again
+    
+    Its files are kept (e.g. for going back to the previous model by hand).
+    """
+    with open(f"{index_path}.retired", 'w', encoding='utf-8') as f:
+        f.write(reason)
+    logger.info(f"Retired index {index_path}: {reason}")
+
+
+class ReadWriteLock:
+    """Writer-preferring reader-writer lock.
+
+    Any number of readers may hold the lock at once; a writer waits for the
+    active readers to drain and blocks new readers while it is waiting, so a
+    steady stream of searches cannot starve an ingest.
+    """
+
+    def __init__(self):
+        self._cond = threading.Condition(threading.Lock())
+        self._readers = 0
+        self._writer = False
+        self._writers_waiting = 0
+
+    @contextmanager
+    def read_locked(self):
+        with self._cond:
+            while self._writer or self._writers_waiting:
+                self._cond.wait()
+            self._readers += 1
+        try:
+            yield
+        finally:
+            with self._cond:
+                self._readers -= 1
+                if self._readers == 0:
+                    self._cond.notify_all()
+
+    @contextmanager
+    def write_locked(self):
+        with self._cond:
+            self._writers_waiting += 1
+            try:
+                while self._writer or self._readers:
+                    self._cond.wait()
+            finally:
+                self._writers_waiting -= 1
+            self._writer = True
+        try:
+            yield
+        finally:
+            with self._cond:
+                self._writer = False
+                self._cond.notify_all()
+
+
 class FAISSVectorStore:
-    def __init__(self, dimension: int, index_path: str = None, pdf_type: str = "chatbot"):
+    def __init__(self, dimension: int, index_path: str = None, pdf_type: str = "chatbot", model_name: str = None):
         self.dimension = dimension
         self.pdf_type = pdf_type
+        self.model_name = model_name or KNOWN_EMBEDDING_MODELS.get(dimension)
         # Use relative path from project root if not specified
         if index_path is None:
-            from ..config import settings
             # Create separate index files for each PDF type
-            base_path = os.path.join(settings.DATA_FOLDER, f"faiss_index_{pdf_type}")
-            self.index_path = base_path
+            self.index_path = default_index_base(pdf_type)
+            if model_name:
+                # Versioned layout: one index per PDF type and embedding model
+                self.index_path = versioned_index_base(pdf_type, model_name)
+                if not os.path.exists(f"{self.index_path}.index") and self._legacy_index_matches():
+                    # Adopt the pre-versioning index in place when this model built it
+                    self.index_path = default_index_base(pdf_type)
         else:
             self.index_path = index_path
         self.metadata_path = f"{self.index_path}_metadata.pkl"
@@ -24,9 +178,28 @@ class FAISSVectorStore:
         # Create data directory if it doesn't exist
         os.makedirs(os.path.dirname(self.index_path), exist_ok=True)
         
+        # Searches take the read side, add/clear take the write side, so
+        # self.index and self.metadata are always observed as a matching pair
+        self._lock = ReadWriteLock()
+        # Bumped on every change, so callers can tell when cached answers are stale
+        self.generation = 0
+        
         # Initialize or load index
         self.index = self._load_or_create_index()
         self.metadata = self._load_metadata()
+        # What was last loaded from / written to disk, to spot other processes' writes
+        self._disk_version = self._read_disk_version()
+        # Column view of metadata used to compile search filters into FAISS ID selectors
+        self._reset_filter_index()
+        self._extend_filter_index(self.metadata)
+    
+    def _legacy_index_matches(self) -> bool:
+        """Check whether the unversioned index for this PDF type was built by our model"""
+        legacy_path = default_index_base(self.pdf_type)
+        if not os.path.exists(f"{legacy_path}.index"):
+            return False
+        info = _read_index_info(legacy_path)
+        return bool(info) and info.get('dimension') == self.dimension and info.get('model_name') == self.model_name
     
     def _load_or_create_index(self):
         """Load existing index or create new one"""
@@ -35,14 +208,15 @@ class FAISSVectorStore:
                 index = faiss.read_index(f"{self.index_path}.index")
                 # Check if dimension matches
                 if index.d != self.dimension:
-                    logger.warning(f"FAISS index dimension mismatch: existing={index.d}, required={self.dimension}. Recreating index.")
-                    # Remove old index and metadata
-                    try:
-                        os.remove(f"{self.index_path}.index")
-                        if os.path.exists(self.metadata_path):
-                            os.remove(self.metadata_path)
-                    except Exception as e:
-                        logger.warning(f"Failed to remove old index files: {str(e)}")
+                    # Keep the old files: they still belong to the model that built them
+                    # and can be served or migrated from. Write ours to a versioned path.
+                    versioned_path = versioned_index_base(self.pdf_type, self.model_name or f"{self.dimension}d")
+                    logger.warning(f"FAISS index dimension mismatch: existing={index.d}, required={self.dimension}. Using {versioned_path} instead.")
+                    if versioned_path != self.index_path:
+                        self.index_path = versioned_path
+                        self.metadata_path = f"{self.index_path}_metadata.pkl"
+                        if os.path.exists(f"{self.index_path}.index"):
+                            return self._load_or_create_index()
                     # Create new index with correct dimension
                     index = faiss.IndexFlatIP(self.dimension)
                     logger.info(f"Created new FAISS index with dimension {self.dimension}")
@@ -73,72 +247,339 @@ class FAISSVectorStore:
     def _save_metadata(self):
         """Save metadata to disk"""
         try:
-            with open(self.metadata_path, 'wb') as f:
+            # Write then rename, so readers in other processes never load a partial file
+            tmp_path = f"{self.metadata_path}.tmp"
+            with open(tmp_path, 'wb') as f:
                 pickle.dump(self.metadata, f)
+            os.replace(tmp_path, self.metadata_path)
+            self._disk_version = self._read_disk_version()
         except Exception as e:
             logger.error(f"Failed to save metadata: {str(e)}")
     
-    def add_vectors(self, vectors: List[List[float]], metadata: List[Dict[str, Any]]):
-        """Add vectors and their metadata to the index"""
+    def add_vectors(self, vectors: List[List[float]], metadata: List[Dict[str, Any]], persist: bool = True):
+        """Add vectors and their metadata to the index
+        
+        With persist=False the caller is responsible for calling save() once a
+        batch of additions is complete.
+        """
         if not vectors or not metadata:
             return
         
-        # Normalize vectors for cosine similarity
+        if len(vectors) != len(metadata):
+            raise ValueError(f"Got {len(vectors)} vectors but {len(metadata)} metadata entries")
+        
+        # Normalize vectors for cosine similarity (outside the lock)
+        vectors_array = self._normalized(vectors)
+        
+        with self._lock.write_locked():
+            self._add_locked(vectors_array, metadata)
+            
+            # Save to disk
+            if persist:
+                self._save_index()
+                self._save_metadata()
+            total = self.index.ntotal
+        
+        logger.info(f"Added {len(vectors)} vectors to index. Total: {total}")
+    
+    def _normalized(self, vectors: List[List[float]]) -> np.ndarray:
         vectors_array = np.array(vectors, dtype=np.float32)
         faiss.normalize_L2(vectors_array)
-        
-        # Add to index
+        return vectors_array
+    
+    def _add_locked(self, vectors_array: np.ndarray, metadata: List[Dict[str, Any]]):
+        """Append vectors and their metadata; the caller holds the write lock"""
         self.index.add(vectors_array)
-        
-        # Add metadata
         self.metadata.extend(metadata)
-        
-        # Save to disk
-        self._save_index()
-        self._save_metadata()
-        
-        logger.info(f"Added {len(vectors)} vectors to index. Total: {self.index.ntotal}")
+        self._extend_filter_index(metadata)
+        self.generation += 1
+    
+    def _remove_locked(self, file_name: str) -> int:
+        """Drop one file's vectors and metadata; the caller holds the write lock"""
+        ids = self._ids_by_file.get(file_name)
+        if not ids:
+            return 0
+        # A flat index compacts in order on removal, so metadata positions stay aligned
+        self.index.remove_ids(np.array(ids, dtype=np.int64))
+        removed = set(ids)
+        self.metadata = [meta for i, meta in enumerate(self.metadata) if i not in removed]
+        self._reset_filter_index()
+        self._extend_filter_index(self.metadata)
+        self.generation += 1
+        return len(ids)
     
     def _save_index(self):
         """Save index to disk"""
         try:
-            faiss.write_index(self.index, f"{self.index_path}.index")
+            tmp_path = f"{self.index_path}.index.tmp"
+            faiss.write_index(self.index, tmp_path)
+            os.replace(tmp_path, f"{self.index_path}.index")
+            with open(f"{self.index_path}_info.json", 'w', encoding='utf-8') as f:
+                json.dump({'model_name': self.model_name, 'dimension': self.dimension}, f)
         except Exception as e:
             logger.error(f"Failed to save index: {str(e)}")
     
-    def search(self, query_vector: List[float], k: int = 5) -> List[Tuple[Dict[str, Any], float]]:
+    def save(self):
+        """Persist index and metadata to disk"""
+        with self._lock.read_locked():
+            self._save_index()
+            self._save_metadata()
+    
+    def _read_disk_version(self) -> Optional[int]:
+        # Metadata is written after the index, so its mtime marks a complete save
+        try:
+            return os.stat(self.metadata_path).st_mtime_ns
+        except OSError:
+            return None
+    
+    def reload_if_changed(self) -> bool:
+        """Reload index and metadata if another process has saved them since
+        
+        Used by read-only workers in a multi-process deployment, where one
+        writer process owns all index writes.
+        
+        Returns:
+            True if a newer version was loaded
+        """
+        version = self._read_disk_version()
+        if version is None or version == self._disk_version:
+            return False
+        
+        try:
+            index = faiss.read_index(f"{self.index_path}.index")
+            with open(self.metadata_path, 'rb') as f:
+                metadata = pickle.load(f)
+        except Exception as e:
+            logger.warning(f"Failed to reload index {self.index_path}: {str(e)}")
+            return False
+        if index.d != self.dimension or index.ntotal != len(metadata):
+            # Read between the writer's index and metadata renames; retry next time
+            return False
+        
+        with self._lock.write_locked():
+            self.index = index
+            self.metadata = metadata
+            self._reset_filter_index()
+            self._extend_filter_index(metadata)
+            self.generation += 1
+            self._disk_version = version
+        logger.info(f"Reloaded {self.pdf_type} index written by another process: {index.ntotal} vectors")
+        return True
+    
+    def replace_with(self, other: 'FAISSVectorStore'):
+        """Swap in the contents of another store (e.g. one rebuilt off to the side) and persist them"""
+        with other._lock.read_locked():
+            index = other.index
+            metadata = list(other.metadata)
+        with self._lock.write_locked():
+            self.index = index
+            self.metadata = metadata
+            self._reset_filter_index()
+            self._extend_filter_index(metadata)
+            self.generation += 1
+            self._save_index()
+            self._save_metadata()
+        logger.info(f"Replaced {self.pdf_type} index: {index.ntotal} vectors")
+    
+    def remove_file(self, file_name: str, persist: bool = True) -> int:
+        """Remove every vector of one file; returns how many were removed"""
+        with self._lock.write_locked():
+            removed = self._remove_locked(file_name)
+            if not removed:
+                return 0
+            if persist:
+                self._save_index()
+                self._save_metadata()
+            total = self.index.ntotal
+        logger.info(f"Removed {removed} vectors of {file_name}. Total: {total}")
+        return removed
+    
+    def replace_file(self, file_name: str, vectors: List[List[float]], metadata: List[Dict[str, Any]],
+                     persist: bool = True) -> int:
+        """Swap one file's vectors for new ones in a single write, so no search sees neither or both
+        
+        Returns:
+            How many old vectors were removed
+        """
+        if len(vectors) != len(metadata):
+            raise ValueError(f"Got {len(vectors)} vectors but {len(metadata)} metadata entries")
+        vectors_array = self._normalized(vectors)
+        
+        with self._lock.write_locked():
+            removed = self._remove_locked(file_name)
+            self._add_locked(vectors_array, metadata)
+            if persist:
+                self._save_index()
+                self._save_metadata()
+            total = self.index.ntotal
+        logger.info(f"Replaced {removed} vectors of {file_name} with {len(vectors)}. Total: {total}")
+        return removed
+    
+    def get_indexed_files(self) -> Dict[str, Optional[str]]:
+        """File name -> the file's modification time when it was indexed"""
+        with self._lock.read_locked():
+            return {
+                file_name: self.metadata[ids[0]].get('file_modified_time')
+                for file_name, ids in self._ids_by_file.items() if ids
+            }
+    
+    def get_metadata_snapshot(self) -> List[Dict[str, Any]]:
+        """Return a copy of the metadata list, in vector ID order"""
+        with self._lock.read_locked():
+            return list(self.metadata)
+    
+    @property
+    def _migrating_marker(self) -> str:
+        return f"{self.index_path}.migrating"
+    
+    def is_migrating(self) -> bool:
+        """True if this store is the incomplete target of an embedding migration"""
+        return os.path.exists(self._migrating_marker)
+    
+    def set_migrating(self, migrating: bool):
+        """Mark or unmark this store as an incomplete migration target"""
+        if migrating:
+            with open(self._migrating_marker, 'w', encoding='utf-8') as f:
+                f.write(self.model_name or '')
+        elif os.path.exists(self._migrating_marker):
+            os.remove(self._migrating_marker)
+    
+    def _reset_filter_index(self):
+        self._ids_by_file = {}
+        self._page_numbers = np.zeros(0, dtype=np.int64)
+        self._modified_times = np.zeros(0, dtype=np.float64)
+        self._ocr_applied = np.zeros(0, dtype=bool)
+    
+    def _extend_filter_index(self, metadata: List[Dict[str, Any]]):
+        """Index new metadata entries by file, page, modification time and OCR flag"""
+        start = len(self._page_numbers)
+        for offset, meta in enumerate(metadata):
+            self._ids_by_file.setdefault(meta.get('file_name', ''), []).append(start + offset)
+        
+        self._page_numbers = np.concatenate([
+            self._page_numbers,
+            np.array([meta.get('page_number') or 0 for meta in metadata], dtype=np.int64)
+        ])
+        self._modified_times = np.concatenate([
+            self._modified_times,
+            np.array([_to_timestamp(meta.get('file_modified_time')) for meta in metadata], dtype=np.float64)
+        ])
+        self._ocr_applied = np.concatenate([
+            self._ocr_applied,
+            np.array([bool(meta.get('ocr_applied', False)) for meta in metadata], dtype=bool)
+        ])
+    
+    def _select_ids(self, filters: Dict[str, Any]) -> np.ndarray:
+        """
+        Compile a filter dict into the sorted vector IDs it matches
+        
+        Supported keys:
+            file_name: a file name or list of file names
+            page_min / page_max: inclusive page number range
+            modified_after / modified_before: datetime, ISO string or timestamp
+                compared with the file's modification time when it was indexed
+            ocr_applied: bool
+        """
+        unknown = set(filters) - FILTER_KEYS
+        if unknown:
+            raise ValueError(f"Unsupported search filter(s): {', '.join(sorted(unknown))}")
+        
+        mask = np.ones(len(self._page_numbers), dtype=bool)
+        
+        if filters.get('file_name') is not None:
+            file_names = filters['file_name']
+            if isinstance(file_names, str):
+                file_names = [file_names]
+            file_mask = np.zeros_like(mask)
+            for file_name in file_names:
+                file_mask[self._ids_by_file.get(file_name, [])] = True
+            mask &= file_mask
+        if filters.get('page_min') is not None:
+            mask &= self._page_numbers >= int(filters['page_min'])
+        if filters.get('page_max') is not None:
+            mask &= self._page_numbers <= int(filters['page_max'])
+        # Chunks indexed without a modification time (NaN) never match a date bound
+        if filters.get('modified_after') is not None:
+            mask &= self._modified_times >= _to_timestamp(filters['modified_after'])
+        if filters.get('modified_before') is not None:
+            mask &= self._modified_times <= _to_timestamp(filters['modified_before'])
+        if filters.get('ocr_applied') is not None:
+            mask &= self._ocr_applied == bool(filters['ocr_applied'])
+        
+        return np.flatnonzero(mask).astype(np.int64)
+    
+    def search(self, query_vector: List[float], k: int = 5, filters: Optional[Dict[str, Any]] = None) -> List[Tuple[Dict[str, Any], float]]:
         """Search for similar vectors"""
-        if self.index.ntotal == 0:
+        return self.search_batch([query_vector], k=k, filters=filters)[0]
+    
+    def search_batch(self, query_vectors: List[List[float]], k: int = 5,
+                     filters: Optional[Dict[str, Any]] = None) -> List[List[Tuple[Dict[str, Any], float]]]:
+        """Search for similar vectors for many queries with a single FAISS call
+        
+        If filters is given (see _select_ids) only the matching vectors are
+        scanned, via a FAISS ID selector, so the top-k is taken from the
+        matching subset rather than filtered after the fact.
+        
+        Returns one result list per query vector, in the same order.
+        """
+        if not query_vectors:
             return []
         
-        # Normalize query vector
-        query_array = np.array([query_vector], dtype=np.float32)
+        # Normalize query vectors
+        query_array = np.array(query_vectors, dtype=np.float32)
         faiss.normalize_L2(query_array)
         
-        # Search
-        scores, indices = self.index.search(query_array, min(k, self.index.ntotal))
-        
-        # Return results with metadata
-        results = []
-        for score, idx in zip(scores[0], indices[0]):
-            if idx < len(self.metadata):
-                results.append((self.metadata[idx], float(score)))
+        with self._lock.read_locked():
+            if self.index.ntotal == 0:
+                return [[] for _ in query_vectors]
+            
+            # Search
+            if filters:
+                ids = self._select_ids(filters)
+                if len(ids) == 0:
+                    return [[] for _ in query_vectors]
+                if ids[-1] - ids[0] + 1 == len(ids):
+                    # Contiguous IDs (e.g. one file indexed in one go): a range check is enough
+                    selector = faiss.IDSelectorRange(int(ids[0]), int(ids[-1]) + 1)
+                else:
+                    selector = faiss.IDSelectorBatch(len(ids), faiss.swig_ptr(ids))
+                params = faiss.SearchParameters(sel=selector)
+                scores, indices = self.index.search(query_array, min(k, len(ids)), params=params)
+            else:
+                scores, indices = self.index.search(query_array, min(k, self.index.ntotal))
+            
+            # Return results with metadata
+            batch_results = []
+            for row_scores, row_indices in zip(scores, indices):
+                results = []
+                for score, idx in zip(row_scores, row_indices):
+                    if 0 <= idx < len(self.metadata):
+                        results.append((self.metadata[idx], float(score)))
+                batch_results.append(results)
         
-        return results
+        return batch_results
     
     def get_stats(self) -> Dict[str, Any]:
         """Get statistics about the vector store"""
+        with self._lock.read_locked():
+            total_vectors = self.index.ntotal
+            generation = self.generation
         return {
-            'total_vectors': self.index.ntotal,
+            'total_vectors': total_vectors,
+            'generation': generation,
             'dimension': self.dimension,
+            'model_name': self.model_name,
             'index_type': 'FAISS_FlatIP'
         }
     
     def clear(self):
         """Clear all vectors and metadata"""
-        self.index = faiss.IndexFlatIP(self.dimension)
-        self.metadata = []
-        self._save_index()
-        self._save_metadata()
+        with self._lock.write_locked():
+            self.index = faiss.IndexFlatIP(self.dimension)
+            self.metadata = []
+            self._reset_filter_index()
+            self.generation += 1
+            self._save_index()
+            self._save_metadata()
         logger.info("Cleared vector store")
 
@@ -0,0 +1,294 @@
+"""
+Incremental indexing of the PDF folders.
+
+FolderWatcher follows the chatbot, submission and notification folders
+and keeps their indexes in step without a full rebuild: created or
+modified PDFs are (re)indexed with index_single_file, deleted ones have
+their vectors removed. Events are debounced per file, so an upload or a
+copy that arrives as a burst of writes is indexed once, after it settles.
+
+Changes come from watchdog (inotify on Linux) when it is installed, and
+from polling the folders otherwise. On start, a catch-up pass queues
+every file whose indexed version differs from the one on disk, which also
+covers changes made while nothing was watching.
+
+Only one process per data directory watches (WATCH_LOCK); it calls the
+indexer's write methods, so in the pre-fork deployment this must be the
+index writer.
+"""
+
+import os
+import threading
+import time
+import logging
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, Any, Optional, Tuple
+
+from ..config import settings
+from .. import metrics
+from .writer import try_become_writer
+
+logger = logging.getLogger(__name__)
+
+try:
+    from watchdog.observers import Observer
+    from watchdog.events import FileSystemEventHandler
+    WATCHDOG_AVAILABLE = True
+except ImportError:
+    WATCHDOG_AVAILABLE = False
+    FileSystemEventHandler = object
+
+# Event types that can change a file's content or existence (not opened/closed_no_write)
+CHANGE_EVENTS = {'created', 'modified', 'deleted', 'moved', 'closed'}
+
+# A file that fails is retried this many times, the delay doubling from
+# debounce_seconds up to RETRY_MAX_DELAY_SECONDS, before it is given up on
+RETRY_LIMIT = 5
+RETRY_MAX_DELAY_SECONDS = 300
+
+
+def _is_pdf(path: str) -> bool:
+    return path.lower().endswith('.pdf')
+
+
+def _modified_time(path: Path) -> str:
+    """A file's mtime in the form the indexer stores it in chunk metadata"""
+    return datetime.fromtimestamp(path.stat().st_mtime).isoformat()
+
+
+class _FolderEventHandler(FileSystemEventHandler):
+    def __init__(self, watcher: 'FolderWatcher', pdf_type: str):
+        self.watcher = watcher
+        self.pdf_type = pdf_type
+
+    def on_any_event(self, event):
+        if event.is_directory or event.event_type not in CHANGE_EVENTS:
+            return
+        # A move out of the folder deletes the source; a move in (e.g. a committed upload) creates the destination
+        for path in (event.src_path, getattr(event, 'dest_path', None)):
+            if path:
+                self.watcher.notify(self.pdf_type, os.fsdecode(path))
+
+
+class FolderWatcher:
+    """Debounced, incremental indexing of PDFs added to, changed in or removed from the PDF folders"""
+
+    def __init__(self, indexer, directories: Dict[str, Path], debounce_seconds: float = 2.0,
+                 poll_seconds: float = 5.0):
+        """
+        Args:
+            indexer: DocumentIndexer that receives the changes
+            directories: pdf_type -> folder to watch
+            debounce_seconds: Quiet time after a file's last event before it is handled
+            poll_seconds: Scan interval when watchdog is not installed
+        """
+        self.indexer = indexer
+        self.directories = {pdf_type: Path(directory) for pdf_type, directory in directories.items()}
+        self.debounce_seconds = debounce_seconds
+        self.poll_seconds = poll_seconds
+        self.backend = 'watchdog' if WATCHDOG_AVAILABLE else 'polling'
+        # (pdf_type, file name) -> (first event, last event), monotonic seconds
+        self._pending: Dict[Tuple[str, str], Tuple[float, float]] = {}
+        # (pdf_type, file name) -> failed attempts since the file was last handled
+        self._failures: Dict[Tuple[str, str], int] = {}
+        self._changed = threading.Condition()
+        self._stopped = threading.Event()
+        self._observer = None
+        self._threads = []
+        self._lock_file = None
+        self.indexed = 0
+        self.removed = 0
+        self.retried = 0
+        self.failed = 0
+        self.last_lag_seconds: Optional[float] = None
+
+    def start(self):
+        if WATCHDOG_AVAILABLE:
+            self._observer = Observer()
+            for pdf_type, directory in self.directories.items():
+                self._observer.schedule(_FolderEventHandler(self, pdf_type), str(directory), recursive=False)
+            self._observer.daemon = True
+            self._observer.start()
+        else:
+            self._start_thread(self._poll, "folder-watcher-poll")
+        self._start_thread(self._run, "folder-watcher")
+        logger.info(f"Watching PDF folders ({self.backend}): {', '.join(str(d) for d in self.directories.values())}")
+
+    def _start_thread(self, target, name: str):
+        thread = threading.Thread(target=target, name=name, daemon=True)
+        thread.start()
+        self._threads.append(thread)
+
+    def stop(self):
+        self._stopped.set()
+        with self._changed:
+            self._changed.notify_all()
+        if self._observer is not None:
+            self._observer.stop()
+        if self._lock_file is not None:
+            self._lock_file.close()
+
+    def notify(self, pdf_type: str, path: str):
+        """Record a change to path; it is handled once no further changes arrive for debounce_seconds"""
+        if not _is_pdf(path):
+            return
+        now = time.monotonic()
+        key = (pdf_type, os.path.basename(path))
+        with self._changed:
+            first_seen, _ = self._pending.get(key, (now, now))
+            self._pending[key] = (first_seen, now)
+            metrics.WATCHER_PENDING.set(len(self._pending))
+            self._changed.notify()
+
+    def _scan(self, directory: Path) -> Dict[str, Tuple[int, int]]:
+        """File name -> (size, mtime_ns) of the PDFs in a folder"""
+        files = {}
+        try:
+            with os.scandir(directory) as entries:
+                for entry in entries:
+                    if entry.is_file() and _is_pdf(entry.name):
+                        stat = entry.stat()
+                        files[entry.name] = (stat.st_size, stat.st_mtime_ns)
+        except OSError as e:
+            logger.warning(f"Could not scan {directory}: {str(e)}")
+        return files
+
+    def _poll(self):
+        """Fallback without watchdog: diff folder listings every poll_seconds"""
+        snapshots = {pdf_type: self._scan(directory) for pdf_type, directory in self.directories.items()}
+        while not self._stopped.wait(self.poll_seconds):
+            for pdf_type, directory in self.directories.items():
+                current = self._scan(directory)
+                previous = snapshots[pdf_type]
+                for name in set(current) | set(previous):
+                    if current.get(name) != previous.get(name):
+                        self.notify(pdf_type, str(directory / name))
+                snapshots[pdf_type] = current
+
+    def _catch_up(self):
+        """Queue files whose indexed version differs from the one on disk, and indexed files that are gone"""
+        for pdf_type, directory in self.directories.items():
+            try:
+                indexed = self.indexer.get_indexed_files(pdf_type)
+            except Exception as e:
+                logger.warning(f"Folder watcher could not read the {pdf_type} index: {str(e)}")
+                continue
+            on_disk = self._scan(directory)
+            for name in set(on_disk) | set(indexed):
+                if name not in on_disk or name not in indexed or indexed[name] != _modified_time(directory / name):
+                    self.notify(pdf_type, str(directory / name))
+
+    def _run(self):
+        self._catch_up()
+        while not self._stopped.is_set():
+            with self._changed:
+                now = time.monotonic()
+                due = [key for key, (_, last) in self._pending.items() if now - last >= self.debounce_seconds]
+                if not due:
+                    # Sleep until the oldest pending file settles, or the next event
+                    waits = [last + self.debounce_seconds - now for _, last in self._pending.values()]
+                    self._changed.wait(timeout=min(waits) if waits else None)
+                    continue
+                changes = [(key, self._pending.pop(key)[0]) for key in due]
+                metrics.WATCHER_PENDING.set(len(self._pending))
+            for (pdf_type, name), first_seen in changes:
+                self._apply(pdf_type, name, first_seen)
+
+    def _retry_later(self, key: Tuple[str, str], first_seen: float) -> Optional[float]:
+        """Queue a failed file again after a backoff; returns the delay, or None once RETRY_LIMIT is reached"""
+        with self._changed:
+            failures = self._failures.get(key, 0) + 1
+            if failures > RETRY_LIMIT:
+                self._failures.pop(key, None)
+                return None
+            self._failures[key] = failures
+            delay = min(self.debounce_seconds * 2 ** (failures - 1), RETRY_MAX_DELAY_SECONDS)
+            if key not in self._pending:
+                # Due once "last event" is debounce_seconds old, i.e. after delay
+                self._pending[key] = (first_seen, time.monotonic() + delay - self.debounce_seconds)
+                metrics.WATCHER_PENDING.set(len(self._pending))
+            self._changed.notify()
+        return delay
+
+    def _apply(self, pdf_type: str, name: str, first_seen: float):
+        """Bring the index in line with one file"""
+        path = self.directories[pdf_type] / name
+        action = 'index'
+        try:
+            indexed = self.indexer.get_indexed_files(pdf_type)
+            if path.exists():
+                if indexed.get(name) == _modified_time(path):
+                    # Touched or closed without changes: already indexed as it is
+                    metrics.WATCHER_CHANGES.labels(pdf_type=pdf_type, action=action, outcome='unchanged').inc()
+                    self._forget_failures(pdf_type, name)
+                    return
+                result = self.indexer.index_single_file(str(path), pdf_type=pdf_type, replace=name in indexed)
+                if not result.get('processed'):
+                    # E.g. a copy that paused longer than the debounce, or the model server restarting
+                    raise RuntimeError(result.get('error', 'not processed'))
+                self.indexed += 1
+            elif name in indexed:
+                action = 'remove'
+                self.indexer.remove_file(name, pdf_type=pdf_type)
+                self.removed += 1
+            else:
+                # Created and deleted again before it was handled
+                self._forget_failures(pdf_type, name)
+                return
+        except Exception as e:
+            delay = self._retry_later((pdf_type, name), first_seen)
+            if delay is not None:
+                self.retried += 1
+                metrics.WATCHER_CHANGES.labels(pdf_type=pdf_type, action=action, outcome='retried').inc()
+                logger.warning(f"Folder watcher could not {action} {pdf_type}/{name}, retrying in {delay:.1f}s: {str(e)}")
+                return
+            self.failed += 1
+            metrics.WATCHER_CHANGES.labels(pdf_type=pdf_type, action=action, outcome='failed').inc()
+            logger.warning(f"Folder watcher gave up on {action} {pdf_type}/{name} after {RETRY_LIMIT} retries: {str(e)}")
+            return
+
+        self._forget_failures(pdf_type, name)
+
+        lag = time.monotonic() - first_seen
+        self.last_lag_seconds = lag
+        metrics.WATCHER_CHANGES.labels(pdf_type=pdf_type, action=action, outcome='success').inc()
+        metrics.WATCHER_LAG_SECONDS.labels(pdf_type=pdf_type, action=action).observe(lag)
+        logger.info(f"Folder watcher: {action} {pdf_type}/{name} done {lag:.1f}s after the change")
+
+    def _forget_failures(self, pdf_type: str, name: str):
+        with self._changed:
+            self._failures.pop((pdf_type, name), None)
+
+    def get_stats(self) -> Dict[str, Any]:
+        with self._changed:
+            pending = len(self._pending)
+            retrying = len(self._failures)
+        return {
+            'backend': self.backend,
+            'pending': pending,
+            'retrying': retrying,
+            'indexed': self.indexed,
+            'removed': self.removed,
+            'retried': self.retried,
+            'failed': self.failed,
+            'last_lag_seconds': self.last_lag_seconds
+        }
+
+
+def start_folder_watcher(indexer, directories: Dict[str, Path]) -> Optional[FolderWatcher]:
+    """
+    Start watching the PDF folders, unless another process already does
+
+    Returns:
+        The running watcher, or None if this process doesn't hold WATCH_LOCK
+    """
+    lock_file = try_become_writer(settings.WATCH_LOCK)
+    if lock_file is None:
+        logger.info("Another process is watching the PDF folders")
+        return None
+    watcher = FolderWatcher(indexer, directories, settings.WATCH_DEBOUNCE_SECONDS, settings.WATCH_POLL_SECONDS)
+    # Held for as long as the watcher runs
+    watcher._lock_file = lock_file
+    watcher.start()
+    return watcher
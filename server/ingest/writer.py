@@ -0,0 +1,211 @@
+"""
+Single index writer for multi-worker (pre-fork) deployments.
+
+With several gunicorn workers sharing one data directory, exactly one of
+them - whichever holds INDEX_WRITER_LOCK - performs index writes. The other
+workers are read-only: their DocumentIndexer hands write calls to the
+writer through a small job directory and reloads indexes from disk when
+the writer has saved them. The same queue carries the few notification
+actions that only the writer, which runs the notification scheduler, may
+perform.
+"""
+
+import json
+import os
+import threading
+import time
+import uuid
+import logging
+from pathlib import Path
+from typing import Any, Optional
+
+logger = logging.getLogger(__name__)
+
+# DocumentIndexer methods that modify indexes
+WRITE_METHODS = {
+    'index_directory',
+    'index_single_file',
+    'remove_file',
+    'clear_index',
+}
+# NotificationScheduler methods that send email or append to its history
+NOTIFICATION_METHODS = {
+    'manual_send_notification',
+}
+# Job target -> methods that may be called on it
+TARGET_METHODS = {
+    'indexer': WRITE_METHODS,
+    'notifications': NOTIFICATION_METHODS,
+}
+
+# Results nobody collected (the submitter timed out or died) are deleted after this long
+RESULT_TTL_SECONDS = 300
+SWEEP_INTERVAL_SECONDS = 60
+
+
+class IndexWriterError(Exception):
+    """Raised in a read-only worker when the writer reports an error or doesn't answer"""
+
+
+def try_become_writer(lock_path: str):
+    """
+    Try to take the writer lock without blocking
+
+    Returns:
+        The open lock file (keep a reference for the life of the process; the
+        lock is released when it is closed or the process exits), or None if
+        another process is the writer
+    """
+    import fcntl
+    Path(lock_path).parent.mkdir(parents=True, exist_ok=True)
+    lock_file = open(lock_path, 'a')
+    try:
+        fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+    except OSError:
+        lock_file.close()
+        return None
+    lock_file.seek(0)
+    lock_file.truncate()
+    lock_file.write(str(os.getpid()))
+    lock_file.flush()
+    return lock_file
+
+
+class IndexWriteQueue:
+    """
+    File-based queue of index write jobs, served by the writer process
+
+    A job is <id>.job until the writer claims it by renaming it to
+    <id>.running, and its outcome is written to <id>.result for the
+    submitter to collect.
+    """
+
+    def __init__(self, jobs_dir: str, poll_interval: float = 0.2):
+        self.jobs_dir = Path(jobs_dir)
+        self.jobs_dir.mkdir(parents=True, exist_ok=True)
+        self.poll_interval = poll_interval
+        self._thread = None
+        self._targets = {}
+
+    def _write_atomic(self, path: Path, payload: dict):
+        tmp_path = path.with_suffix('.tmp')
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(payload, f, default=str)
+        os.replace(tmp_path, path)
+
+    def submit(self, method: str, args: tuple, kwargs: dict, timeout: Optional[float] = None,
+               target: str = 'indexer') -> Any:
+        """Run a write method of target ('indexer' or 'notifications') in the writer process and return its result"""
+        if method not in TARGET_METHODS.get(target, ()):
+            raise IndexWriterError(f"Method not allowed: {target}.{method}")
+        job_id = uuid.uuid4().hex
+        result_path = self.jobs_dir / f"{job_id}.result"
+        self._write_atomic(self.jobs_dir / f"{job_id}.job",
+                           {'target': target, 'method': method, 'args': list(args), 'kwargs': kwargs})
+
+        deadline = time.monotonic() + timeout if timeout else None
+        while not result_path.exists():
+            if deadline and time.monotonic() > deadline:
+                self._cancel(job_id, method, timeout)
+            time.sleep(self.poll_interval)
+
+        with open(result_path, 'r', encoding='utf-8') as f:
+            status, payload = json.load(f)
+        result_path.unlink()
+        if status == 'error':
+            raise IndexWriterError(payload)
+        return payload
+
+    def _cancel(self, job_id: str, method: str, timeout: float):
+        """Give up on a job: withdraw it if the writer hasn't claimed it yet, and raise
+
+        Returns (instead of raising) if the job finished in the meantime.
+        """
+        try:
+            (self.jobs_dir / f"{job_id}.job").unlink()
+        except FileNotFoundError:
+            if (self.jobs_dir / f"{job_id}.result").exists():
+                return
+            # Still running; its result is swept by the writer once it is stale
+            raise IndexWriterError(f"Index writer did not finish {method} within {timeout:.0f}s")
+        raise IndexWriterError(f"Index writer did not start {method} within {timeout:.0f}s; job cancelled")
+
+    def add_target(self, name: str, obj):
+        """Serve jobs for another target, e.g. the notification scheduler once it exists (writer process only)"""
+        self._targets[name] = obj
+
+    def start_serving(self, indexer):
+        """Serve write jobs for indexer on a daemon thread (writer process only)"""
+        self._targets['indexer'] = indexer
+        # Jobs that a writer which died was running are run again
+        for running_path in self.jobs_dir.glob('*.running'):
+            os.replace(running_path, running_path.with_suffix('.job'))
+        self._thread = threading.Thread(target=self._serve, name="index-writer", daemon=True)
+        self._thread.start()
+        logger.info(f"Process {os.getpid()} is the index writer")
+
+    def _pending_jobs(self):
+        """Queued job files, oldest first (a job may be withdrawn while this runs)"""
+        jobs = []
+        for job_path in self.jobs_dir.glob('*.job'):
+            try:
+                jobs.append((job_path.stat().st_mtime, job_path))
+            except FileNotFoundError:
+                continue
+        return [job_path for _, job_path in sorted(jobs)]
+
+    def _sweep(self):
+        """Delete results and temp files that have been left behind for longer than RESULT_TTL_SECONDS"""
+        cutoff = time.time() - RESULT_TTL_SECONDS
+        for pattern in ('*.result', '*.tmp'):
+            for path in self.jobs_dir.glob(pattern):
+                try:
+                    if path.stat().st_mtime < cutoff:
+                        path.unlink()
+                        logger.info(f"Removed stale index job file {path.name}")
+                except FileNotFoundError:
+                    continue
+
+    def _serve(self):
+        next_sweep = 0.0
+        while True:
+            if time.monotonic() >= next_sweep:
+                self._sweep()
+                next_sweep = time.monotonic() + SWEEP_INTERVAL_SECONDS
+            # Jobs left by a writer that died are picked up too
+            jobs = self._pending_jobs()
+            for job_path in jobs:
+                self._run_job(job_path)
+            if not jobs:
+                time.sleep(self.poll_interval)
+
+    def _run_job(self, job_path: Path):
+        running_path = job_path.with_suffix('.running')
+        try:
+            # Claiming the job means the submitter can no longer cancel it
+            os.replace(job_path, running_path)
+        except FileNotFoundError:
+            return
+        try:
+            with open(running_path, 'r', encoding='utf-8') as f:
+                job = json.load(f)
+        except Exception as e:
+            logger.error(f"Unreadable index job {job_path.name}: {str(e)}")
+            running_path.unlink(missing_ok=True)
+            return
+
+        target_name = job.get('target', 'indexer')
+        method = job.get('method')
+        try:
+            if method not in TARGET_METHODS.get(target_name, ()):
+                raise IndexWriterError(f"Method not allowed: {target_name}.{method}")
+            target = self._targets.get(target_name)
+            if target is None:
+                raise IndexWriterError(f"The writer has no {target_name} yet; try again shortly")
+            result = ('ok', getattr(target, method)(*job.get('args', []), **job.get('kwargs', {})))
+        except Exception as e:
+            logger.error(f"Index writer error in {target_name}.{method}: {str(e)}")
+            result = ('error', str(e))
+
+        self._write_atomic(job_path.with_suffix('.result'), result)
+        running_path.unlink(missing_ok=True)
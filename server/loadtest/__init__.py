@@ -0,0 +1 @@
+# Load testing: stand-in providers and the chat load generator
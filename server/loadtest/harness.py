@@ -0,0 +1,313 @@
+"""
+Chat load generator.
+
+Ramps concurrency against either the FastAPI app over HTTP or
+backend_direct.backend_chat in-process, and reports throughput and
+p50/p95/p99 latency per pipeline stage at each step.
+
+    # In-process, with stub providers (no API quota used)
+    python -m server.loadtest.harness --target direct --stub --concurrency 1,4,16 --duration 30
+
+    # Against a running server, replaying questions recorded with CHAT_LOG_PATH
+    python -m server.loadtest.harness --target http --url http://127.0.0.1:8000 \\
+        --questions data/chat_log.jsonl --concurrency 1,8,32
+
+For the HTTP target the server should run with CHAT_RATE_LIMIT_PER_MINUTE=0
+(and LLM_STUB=true EMBEDDING_BACKEND=stub to leave the real providers out);
+otherwise most requests are answered with 429 and counted as rate_limited.
+Per-stage timings over HTTP are read from the Server-Timing response header
+when the server sends one.
+"""
+
+import argparse
+import functools
+import itertools
+import json
+import os
+import threading
+import time
+import urllib.error
+import urllib.request
+from typing import List, Dict, Any, Callable, Optional
+
+DEFAULT_QUESTIONS = [
+    "What are the start and end dates of the ITP?",
+    "What is the submission deadline for Form A?",
+    "What are the four documents required for Form B submission?",
+    "How long does it take to prepare the ITP letter after submitting Form A?",
+    "What is the grading standard for the internship?",
+    "Can a student change companies once placement is confirmed?",
+    "What is the minimum credit hour requirement to join the ITP?",
+    "and what about the deadline for it?",
+]
+
+
+def _percentile(sorted_values: List[float], percentile: float) -> float:
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, int(len(sorted_values) * percentile / 100))
+    return sorted_values[index]
+
+
+class StageTimer:
+    """Thread-safe collection of per-stage durations (seconds)"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._samples: Dict[str, List[float]] = {}
+
+    def record(self, stage: str, seconds: float):
+        with self._lock:
+            self._samples.setdefault(stage, []).append(seconds)
+
+    def reset(self):
+        with self._lock:
+            self._samples = {}
+
+    def summary(self) -> Dict[str, Dict[str, float]]:
+        with self._lock:
+            samples = {stage: sorted(values) for stage, values in self._samples.items()}
+        return {
+            stage: {
+                'count': len(values),
+                'p50_ms': _percentile(values, 50) * 1000,
+                'p95_ms': _percentile(values, 95) * 1000,
+                'p99_ms': _percentile(values, 99) * 1000,
+            }
+            for stage, values in samples.items()
+        }
+
+
+def _wrap_timed(owner, method_name: str, stage: str, timer: StageTimer):
+    original = getattr(owner, method_name)
+
+    @functools.wraps(original)
+    def timed(*args, **kwargs):
+        start = time.perf_counter()
+        try:
+            return original(*args, **kwargs)
+        finally:
+            timer.record(stage, time.perf_counter() - start)
+
+    setattr(owner, method_name, timed)
+
+
+def instrument_pipeline(timer: StageTimer):
+    """Time the pipeline stages of the in-process backend
+
+    With a model server configured, embedding and search run in the server
+    process and only show up inside 'retrieval'.
+    """
+    from server.qa.intent import IntentRouter
+    from server.qa.retriever import DocumentRetriever
+    from server.qa.extractive import ExtractiveAnswerer
+    from server.qa.llm import LLMClient
+    from server.ingest.embedder import EmbeddingGenerator
+    from server.ingest.vectorstore import FAISSVectorStore
+
+    _wrap_timed(IntentRouter, 'route', 'intent', timer)
+    _wrap_timed(DocumentRetriever, 'retrieve_relevant_chunks', 'retrieval', timer)
+    _wrap_timed(EmbeddingGenerator, 'generate_embeddings', 'embedding', timer)
+    _wrap_timed(FAISSVectorStore, 'search_batch', 'search', timer)
+    _wrap_timed(ExtractiveAnswerer, 'answer', 'extractive', timer)
+    _wrap_timed(LLMClient, 'generate_response', 'llm', timer)
+
+
+def direct_sender() -> Callable[[str, str, str], Dict[str, Any]]:
+    """Send a question to backend_direct.backend_chat; returns {'status', 'stages'}"""
+    import backend_direct
+
+    def send(message: str, user_id: str, session_id: str) -> Dict[str, Any]:
+        result = backend_direct.backend_chat(message, user_id, session_id)
+        if 'retry_after' in result:
+            return {'status': 'rate_limited'}
+        if 'error' in result:
+            return {'status': 'error'}
+        return {'status': 'ok'}
+
+    return send
+
+
+def _parse_server_timing(header: Optional[str]) -> Dict[str, float]:
+    """'retrieval;dur=12.5, llm;dur=800' -> {'retrieval': 0.0125, 'llm': 0.8}"""
+    stages = {}
+    for part in (header or '').split(','):
+        name, *params = [p.strip() for p in part.split(';')]
+        for param in params:
+            if name and param.startswith('dur='):
+                try:
+                    stages[name] = float(param[4:]) / 1000
+                except ValueError:
+                    pass
+    return stages
+
+
+def http_sender(url: str, timeout: float = 60) -> Callable[[str, str, str], Dict[str, Any]]:
+    """Send a question to POST {url}/api/chat"""
+    endpoint = url.rstrip('/') + '/api/chat'
+
+    def send(message: str, user_id: str, session_id: str) -> Dict[str, Any]:
+        body = json.dumps({'message': message, 'user_id': user_id, 'session_id': session_id}).encode('utf-8')
+        request = urllib.request.Request(endpoint, data=body, headers={'Content-Type': 'application/json'})
+        try:
+            with urllib.request.urlopen(request, timeout=timeout) as response:
+                response.read()
+                return {'status': 'ok', 'stages': _parse_server_timing(response.headers.get('Server-Timing'))}
+        except urllib.error.HTTPError as e:
+            return {'status': 'rate_limited' if e.code == 429 else 'error'}
+        except Exception:
+            return {'status': 'error'}
+
+    return send
+
+
+def run_level(send: Callable, questions: List[Dict[str, Any]], concurrency: int, duration: float,
+              timer: StageTimer) -> Dict[str, Any]:
+    """Closed loop: `concurrency` virtual users send back to back for `duration` seconds"""
+    timer.reset()
+    counts = {'ok': 0, 'error': 0, 'rate_limited': 0}
+    counts_lock = threading.Lock()
+    cycle = itertools.cycle(questions)
+    cycle_lock = threading.Lock()
+    deadline = time.monotonic() + duration
+
+    def user(index: int):
+        user_id = f"loadtest-{index}"
+        while time.monotonic() < deadline:
+            with cycle_lock:
+                entry = next(cycle)
+            # Recorded conversations keep their session, per virtual user
+            session_id = f"{user_id}-{entry.get('session_id') or 'default'}"
+            start = time.perf_counter()
+            outcome = send(entry['message'], user_id, session_id)
+            elapsed = time.perf_counter() - start
+            with counts_lock:
+                counts[outcome['status']] += 1
+            if outcome['status'] == 'ok':
+                timer.record('total', elapsed)
+                for stage, seconds in outcome.get('stages', {}).items():
+                    timer.record(stage, seconds)
+
+    started = time.monotonic()
+    threads = [threading.Thread(target=user, args=(i,), daemon=True) for i in range(concurrency)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.monotonic() - started
+
+    return {
+        'concurrency': concurrency,
+        'duration_s': elapsed,
+        'requests': sum(counts.values()),
+        **counts,
+        'throughput_rps': counts['ok'] / elapsed if elapsed else 0.0,
+        'stages': timer.summary(),
+    }
+
+
+def run_replay(send: Callable, questions: List[Dict[str, Any]], speed: float, max_concurrency: int,
+               timer: StageTimer) -> Dict[str, Any]:
+    """Open loop: send recorded questions at their original spacing (divided by speed)"""
+    from concurrent.futures import ThreadPoolExecutor
+
+    timer.reset()
+    counts = {'ok': 0, 'error': 0, 'rate_limited': 0}
+    counts_lock = threading.Lock()
+    first = questions[0].get('time', 0.0)
+
+    def fire(entry):
+        session_id = entry.get('session_id') or 'replay'
+        start = time.perf_counter()
+        outcome = send(entry['message'], f"replay-{session_id}", session_id)
+        elapsed = time.perf_counter() - start
+        with counts_lock:
+            counts[outcome['status']] += 1
+        if outcome['status'] == 'ok':
+            timer.record('total', elapsed)
+            for stage, seconds in outcome.get('stages', {}).items():
+                timer.record(stage, seconds)
+
+    started = time.monotonic()
+    with ThreadPoolExecutor(max_workers=max_concurrency) as executor:
+        for entry in questions:
+            delay = (entry.get('time', first) - first) / speed - (time.monotonic() - started)
+            if delay > 0:
+                time.sleep(delay)
+            executor.submit(fire, entry)
+    elapsed = time.monotonic() - started
+
+    return {
+        'concurrency': f"replay x{speed:g}",
+        'duration_s': elapsed,
+        'requests': sum(counts.values()),
+        **counts,
+        'throughput_rps': counts['ok'] / elapsed if elapsed else 0.0,
+        'stages': timer.summary(),
+    }
+
+
+def print_report(results: List[Dict[str, Any]]):
+    for result in results:
+        print(f"\nconcurrency {result['concurrency']}: {result['requests']} requests in {result['duration_s']:.1f}s, "
+              f"{result['throughput_rps']:.1f} req/s ok, {result['error']} errors, {result['rate_limited']} rate limited")
+        print(f"  {'stage':<12}{'count':>8}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}")
+        for stage, stats in sorted(result['stages'].items()):
+            print(f"  {stage:<12}{stats['count']:>8}{stats['p50_ms']:>10.1f}{stats['p95_ms']:>10.1f}{stats['p99_ms']:>10.1f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Load test the chat pipeline")
+    parser.add_argument('--target', choices=['direct', 'http'], default='direct')
+    parser.add_argument('--url', default='http://127.0.0.1:8000', help="Base URL for --target http")
+    parser.add_argument('--questions', help="QuestionLog JSONL or text file with one question per line")
+    parser.add_argument('--concurrency', default='1,2,4,8,16', help="Comma-separated ramp of virtual users")
+    parser.add_argument('--duration', type=float, default=20, help="Seconds per concurrency level")
+    parser.add_argument('--replay', action='store_true', help="Replay questions at their recorded times instead of ramping")
+    parser.add_argument('--speed', type=float, default=1.0, help="Replay speed-up factor")
+    parser.add_argument('--stub', action='store_true', help="Use stub LLM and embeddings (direct target)")
+    parser.add_argument('--output', help="Write the results as JSON to this file")
+    args = parser.parse_args()
+
+    if args.stub:
+        # Must be set before server.config is imported
+        os.environ.setdefault('LLM_STUB', 'true')
+        os.environ.setdefault('EMBEDDING_BACKEND', 'stub')
+    if args.target == 'direct':
+        # The limiter would otherwise cap every virtual user at a few requests a minute
+        os.environ.setdefault('CHAT_RATE_LIMIT_PER_MINUTE', '0')
+
+    if args.questions:
+        from server.loadtest.questions import load_questions
+        questions = load_questions(args.questions)
+    else:
+        questions = [{'message': q} for q in DEFAULT_QUESTIONS]
+    if not questions:
+        raise SystemExit("No questions to send")
+
+    timer = StageTimer()
+    if args.target == 'direct':
+        instrument_pipeline(timer)
+        send = direct_sender()
+        # Warm up: load the embedding model and indexes before measuring
+        send(questions[0]['message'], 'loadtest-warmup', 'warmup')
+    else:
+        send = http_sender(args.url)
+
+    results = []
+    if args.replay:
+        results.append(run_replay(send, questions, args.speed, max(int(c) for c in args.concurrency.split(',')), timer))
+    else:
+        for concurrency in [int(c) for c in args.concurrency.split(',') if c.strip()]:
+            results.append(run_level(send, questions, concurrency, args.duration, timer))
+            print_report(results[-1:])
+
+    if args.replay:
+        print_report(results)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
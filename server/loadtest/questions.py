@@ -0,0 +1,55 @@
+import json
+import threading
+import time
+import logging
+from pathlib import Path
+from typing import List, Dict, Any, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class QuestionLog:
+    """Append chat questions to a JSONL file so real traffic can be replayed in load tests"""
+
+    def __init__(self, path: str):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+
+    def record(self, message: str, session_id: Optional[str] = None):
+        # No user IDs are written; sessions are enough to replay conversations
+        entry = {'time': time.time(), 'message': message, 'session_id': session_id}
+        try:
+            with self._lock, open(self.path, 'a', encoding='utf-8') as f:
+                f.write(json.dumps(entry, ensure_ascii=False) + '\n')
+        except Exception as e:
+            logger.error(f"Failed to record question: {str(e)}")
+
+
+def load_questions(path: str) -> List[Dict[str, Any]]:
+    """
+    Load questions to replay
+
+    Accepts a QuestionLog JSONL file or a plain text file with one question
+    per line.
+
+    Returns:
+        Entries with 'message' and, when known, 'time' and 'session_id',
+        in file order
+    """
+    entries = []
+    with open(path, 'r', encoding='utf-8') as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            if line.startswith('{'):
+                try:
+                    entry = json.loads(line)
+                    if entry.get('message'):
+                        entries.append(entry)
+                    continue
+                except json.JSONDecodeError:
+                    pass
+            entries.append({'message': line})
+    return entries
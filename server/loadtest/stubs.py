@@ -0,0 +1,105 @@
+"""
+In-process stand-ins for the LLM and embedding providers.
+
+They let /api/chat and backend_chat run end to end without network calls
+or API quota, with latencies drawn from a configurable distribution, so
+load tests measure the pipeline's own overhead. Enable them with
+
+    LLM_STUB=true EMBEDDING_BACKEND=stub
+
+Latency specs (milliseconds):
+
+    fixed:5               always 5ms
+    uniform:200,900       uniformly between 200ms and 900ms
+    lognormal:800,0.5     median 800ms, log-space sigma 0.5 (long right tail)
+"""
+
+import hashlib
+import math
+import random
+import re
+import time
+import logging
+from typing import List, Dict, Any
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+# Stub vectors are not comparable with any real model's, so they get their own index
+STUB_MODEL_NAME = 'stub-hash-384'
+
+
+class LatencyModel:
+    """Samples request latencies from a spec like 'lognormal:800,0.5' (milliseconds)"""
+
+    def __init__(self, spec: str):
+        self.spec = spec
+        kind, _, args = spec.partition(':')
+        self.kind = kind.strip().lower()
+        self.args = [float(a) for a in args.split(',') if a.strip()]
+        if self.kind not in ('fixed', 'uniform', 'lognormal'):
+            raise ValueError(f"Unknown latency distribution: {spec}")
+
+    def sample(self) -> float:
+        """Latency in seconds"""
+        if self.kind == 'fixed':
+            ms = self.args[0] if self.args else 0.0
+        elif self.kind == 'uniform':
+            ms = random.uniform(self.args[0], self.args[1])
+        else:
+            median, sigma = self.args[0], self.args[1] if len(self.args) > 1 else 0.5
+            ms = random.lognormvariate(math.log(median), sigma)
+        return max(ms, 0.0) / 1000.0
+
+    def sleep(self):
+        time.sleep(self.sample())
+
+
+class StubEncoder:
+    """
+    Stand-in for SentenceTransformer: hashed bag-of-words vectors.
+
+    Texts sharing words get similar vectors, so retrieval over a stub index
+    still returns plausible chunks. Exposes the subset of
+    SentenceTransformer.encode used by EmbeddingGenerator.
+    """
+
+    index_model_name = STUB_MODEL_NAME
+
+    def __init__(self, dimension: int = 384, latency: str = "fixed:5"):
+        self.dimension = dimension
+        self.latency = LatencyModel(latency)
+
+    def _vector(self, text: str) -> np.ndarray:
+        vector = np.zeros(self.dimension, dtype=np.float32)
+        for word in re.findall(r'[a-z0-9]+', text.lower()):
+            digest = hashlib.md5(word.encode('utf-8')).digest()
+            index = int.from_bytes(digest[:4], 'little') % self.dimension
+            vector[index] += 1.0 if digest[4] & 1 else -1.0
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm > 0 else vector
+
+    def encode(self, texts: List[str], batch_size: int = 32, convert_to_tensor: bool = False, **kwargs) -> np.ndarray:
+        if isinstance(texts, str):
+            texts = [texts]
+        self.latency.sleep()
+        return np.array([self._vector(text) for text in texts], dtype=np.float32)
+
+
+class StubLLM:
+    """Stand-in LLM provider that answers with the start of the context after a sampled delay"""
+
+    def __init__(self, latency: str = "lognormal:800,0.5", error_rate: float = 0.0):
+        self.latency = LatencyModel(latency)
+        self.error_rate = error_rate
+
+    def generate(self, query: str, context: str) -> Dict[str, Any]:
+        self.latency.sleep()
+        if self.error_rate and random.random() < self.error_rate:
+            return {'response': 'Sorry, I encountered an error: stub failure', 'confidence': 0.0, 'error': 'stub failure'}
+        excerpt = ' '.join(context.split()[:60])
+        return {
+            'response': f"(stub) {excerpt}" if excerpt else "(stub) No context.",
+            'confidence': 0.8,
+            'model': 'stub'
+        }
@@ -1,23 +1,39 @@
-from fastapi import FastAPI, UploadFile, File, HTTPException, Form
+from fastapi import FastAPI, UploadFile, File, HTTPException, Form, Request
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse, Response
 from pydantic import BaseModel
 import os
+import gc
 import json
 import logging
+import threading
 from contextlib import asynccontextmanager
 from pathlib import Path
 
 from .config import settings
-from .ingest.indexer import DocumentIndexer
-from .qa.retriever import DocumentRetriever
+# The RAG stack (faiss, nltk, embedding models) and apscheduler are imported
+# where they are first used, so importing the app (e.g. by the gunicorn
+# master before preloading, or by tests) stays light.
+from . import metrics, tracing
+from .ingest.writer import IndexWriteQueue, try_become_writer
+from .ingest.watcher import start_folder_watcher
 from .qa.llm import LLMClient
+from .qa.singleflight import SingleFlight, normalize_question
+from .qa.extractive import ExtractiveAnswerer
+from .qa.intent import IntentRouter
+from .qa.ratelimit import TokenBucketLimiter, FairScheduler, RateLimitExceeded, retry_after_header
+from .qa.session import SessionStore, Turn, resolve_follow_up
+from .loadtest.questions import QuestionLog
 from .cv.checker import check_cv
 from .teacher.pdf_manager import PDFManager
 from .teacher.pdf_metadata import PDFMetadataManager
+from .teacher.uploads import UploadRejected, spool_upload
+from .teacher.file_serving import conditional_file_response
+from .teacher.content_hash import content_hashes
+from .teacher.previews import PreviewService, PreviewUnavailable, THUMBNAIL_WIDTH
 from .notification.deadline_parser import DeadlineParser
 from .notification.student_parser import StudentEmailParser
 from .notification.email_sender import EmailSender
-from .notification.scheduler import NotificationScheduler
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
@@ -31,7 +47,29 @@ retriever = None
 llm_client = None
 pdf_manager = None
 pdf_metadata_manager = None
+preview_service = None
 notification_scheduler = None
+folder_watcher = None
+# Whether this process writes indexes; always true unless attach_worker() says otherwise
+is_index_writer = True
+index_writer_lock = None
+# Pre-fork mode: jobs for (or, in the writer, from) the other workers
+write_queue = None
+# Background startup progress: starting -> loading_models -> loading_index -> indexing -> ready (or failed)
+startup_state = {"phase": "starting", "index_loaded": False, "error": None}
+# Identical questions asked at the same time share one retrieval + LLM call; a
+# scheduler rejection is the leader's own, so followers retry instead of sharing it
+chat_flight = SingleFlight("chat_coalesced", unshared_errors=(RateLimitExceeded,))
+extractive_answerer = ExtractiveAnswerer()
+intent_router = IntentRouter()
+chat_limiter = TokenBucketLimiter(
+    settings.CHAT_RATE_LIMIT_PER_MINUTE, settings.CHAT_RATE_LIMIT_BURST, settings.RATE_LIMIT_DB_PATH or None
+)
+chat_scheduler = FairScheduler(
+    settings.CHAT_MAX_CONCURRENT, settings.CHAT_MAX_QUEUED_PER_USER, settings.CHAT_QUEUE_TIMEOUT_SECONDS
+)
+chat_sessions = SessionStore(settings.CHAT_SESSION_MAX, settings.CHAT_SESSION_TTL_SECONDS)
+question_log = QuestionLog(settings.CHAT_LOG_PATH) if settings.CHAT_LOG_PATH else None
 
 # Simple user storage (for demo - in production use proper database)
 USERS_FILE = Path(__file__).parent.parent / "data" / "users.json"
@@ -65,16 +103,31 @@ def init_users():
         save_users(users)
     return users
 
-@asynccontextmanager
-async def lifespan(app: FastAPI):
-    # Startup
-    global indexer, retriever, llm_client, pdf_manager, pdf_metadata_manager, notification_scheduler
-    
-    logger.info("Starting up Industrial Training Chatbot...")
+def init_managers():
+    """Create the user store and the teacher PDF managers (cheap; no models or indexes)"""
+    global pdf_manager, pdf_metadata_manager, preview_service
+    if pdf_manager is not None:
+        return
     
     # Initialize users storage
     init_users()
     
+    # Initialize teacher PDF management
+    pdf_manager = PDFManager()
+    pdf_metadata_manager = PDFMetadataManager()
+    preview_service = PreviewService(settings.PREVIEW_CACHE_DIR, settings.PREVIEW_CACHE_MAX_BYTES)
+    logger.info("Teacher PDF management initialized")
+
+
+def init_components():
+    """Create the PDF managers, indexer, retriever and LLM client"""
+    global indexer, retriever, llm_client
+    
+    init_managers()
+    
+    from .ingest.indexer import DocumentIndexer
+    from .qa.retriever import DocumentRetriever
+    
     # Initialize components
     indexer = DocumentIndexer()
     retriever = DocumentRetriever(indexer)
@@ -102,33 +155,140 @@ async def lifespan(app: FastAPI):
         # Fallback to basic client
         llm_client = LLMClient(use_google=False)
         logger.info("Using local fallback due to initialization error")
+
+
+def index_on_startup():
+    # Index documents on startup (only chatbot PDFs for backward compatibility).
+    # The index is rebuilt off to the side, so chat keeps using the persisted one until it is swapped in.
+    logger.info(f"Indexing chatbot documents from: {settings.PDF_FOLDER}")
+    index_result = indexer.index_directory(settings.PDF_FOLDER, pdf_type="chatbot", rebuild=True)
+    logger.info(f"Indexing complete: {index_result}")
+
+
+def run_startup():
+    """Load components and the persisted index, then refresh the index (runs on a background thread)"""
+    global folder_watcher
+    try:
+        # In pre-fork mode the gunicorn master has already loaded everything
+        if indexer is None:
+            startup_state["phase"] = "loading_models"
+            init_components()
+        startup_state["phase"] = "loading_index"
+        indexer.get_stats(pdf_type="chatbot")
+        startup_state["index_loaded"] = True
+        # Only the index writer refreshes; read-only workers reload when it saves
+        if is_index_writer:
+            startup_state["phase"] = "indexing"
+            index_on_startup()
+            # From here on, files dropped into the PDF folders are indexed as they arrive
+            if settings.WATCH_PDF_FOLDERS:
+                folder_watcher = start_folder_watcher(indexer, {
+                    pdf_type: pdf_manager.get_directory(pdf_type)
+                    for pdf_type in ("chatbot", "submission", "notification")
+                })
+        startup_state["phase"] = "ready"
+    except Exception as e:
+        logger.error(f"Startup failed: {str(e)}")
+        startup_state["phase"] = "failed"
+        startup_state["error"] = str(e)
+
+
+def is_ready() -> bool:
+    """Whether chat can be served: components are up and there is an index to answer from"""
+    if not (retriever and llm_client and startup_state["index_loaded"]):
+        return False
+    if startup_state["phase"] == "ready":
+        return True
+    # While the refresh runs, the persisted index is good enough unless it is empty (first start)
+    return indexer.get_stats(pdf_type="chatbot").get('total_vectors', 0) > 0
+
+
+def get_startup_progress() -> dict:
+    phase = startup_state["phase"]
+    progress = indexer.get_indexing_progress(pdf_type="chatbot") if indexer and phase == "indexing" else None
+    if phase == "ready":
+        percent = 100.0
+    elif progress:
+        percent = progress.get("percent", 0.0)
+    else:
+        percent = 0.0
+    return {"phase": phase, "percent": percent, "indexing": progress, "error": startup_state["error"]}
+
+
+def preload_components():
+    """
+    Pre-fork mode: initialize in the gunicorn master, before workers fork
     
-    # Initialize teacher PDF management
-    pdf_manager = PDFManager()
-    pdf_metadata_manager = PDFMetadataManager()
-    logger.info("Teacher PDF management initialized")
+    The embedding model and every persisted index are loaded here once, so
+    all workers share these pages copy-on-write instead of each loading its
+    own copy. The startup index refresh runs later, in the writer worker.
+    """
+    logger.info("Preloading models and indexes before forking workers...")
+    init_components()
+    for pdf_type in ("chatbot", "submission", "notification"):
+        indexer.get_stats(pdf_type=pdf_type)
+    # Keep the garbage collector from touching (and so copying) preloaded objects
+    gc.freeze()
+
+
+def attach_worker():
+    """
+    Pre-fork mode: run in each worker right after it is forked
     
-    # Initialize notification scheduler
-    notification_scheduler = NotificationScheduler()
-    notification_scheduler.start()
-    logger.info("Notification scheduler initialized and started")
+    The first worker to take the writer lock becomes the only process that
+    writes indexes (and sends notifications); the others hand writes to it
+    and reload indexes when it saves them.
+    """
+    global index_writer_lock, is_index_writer, write_queue
+    write_queue = IndexWriteQueue(settings.INDEX_JOBS_DIR)
+    index_writer_lock = try_become_writer(settings.INDEX_WRITER_LOCK)
+    is_index_writer = index_writer_lock is not None
+    if is_index_writer:
+        write_queue.start_serving(indexer)
+    else:
+        indexer.attach_read_only(write_queue)
+        logger.info(f"Worker {os.getpid()} attached read-only")
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Startup
+    global notification_scheduler
     
-    # Index documents on startup (only chatbot PDFs for backward compatibility)
-    logger.info(f"Indexing chatbot documents from: {settings.PDF_FOLDER}")
-    index_result = indexer.index_directory(settings.PDF_FOLDER, pdf_type="chatbot")
-    logger.info(f"Indexing complete: {index_result}")
+    logger.info("Starting up Industrial Training Chatbot...")
+    
+    # Uploads, listings and previews don't wait for the models
+    init_managers()
+    
+    # Load and index in the background so the server answers /livez and /api/status meanwhile
+    threading.Thread(target=run_startup, name="startup", daemon=True).start()
+    
+    # Every worker reads notification state from disk; only the writer runs
+    # the send loop, and the others hand manual sends to it
+    from .notification.scheduler import NotificationScheduler
+    notification_scheduler = NotificationScheduler()
+    if is_index_writer:
+        notification_scheduler.start()
+        if write_queue:
+            write_queue.add_target("notifications", notification_scheduler)
+        logger.info("Notification scheduler initialized and started")
+    else:
+        logger.info("Notification scheduler loaded read-only; sends go to the index writer")
     
     yield
     
     # Shutdown
     if notification_scheduler:
         notification_scheduler.stop()
+    if folder_watcher:
+        folder_watcher.stop()
     logger.info("Shutting down...")
 
 
 class ChatRequest(BaseModel):
     message: str
     session_id: str | None = None
+    user_id: str | None = None
 
 
 class ChatResponse(BaseModel):
@@ -163,8 +323,25 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["Server-Timing"],
 )
 
+
+@app.middleware("http")
+async def trace_requests(request: Request, call_next):
+    """Trace each request and report its span timings in a Server-Timing header"""
+    with tracing.trace(
+        f"{request.method} {request.url.path}",
+        request.headers.get("traceparent"),
+        **{"http.method": request.method, "http.target": request.url.path}
+    ) as trace:
+        response = await call_next(request)
+        trace.root.set_attribute("http.status_code", response.status_code)
+        trace.root.error = response.status_code >= 500
+        if settings.SERVER_TIMING:
+            response.headers["Server-Timing"] = trace.server_timing()
+        return response
+
 #LOGIN LOGIC
 @app.post("/api/login", response_model=LoginResponse)
 def login(req: LoginRequest):
@@ -233,59 +410,140 @@ def health():
     }
 
 
+@app.get("/livez")
+def livez():
+    """Liveness: the process is up and serving requests"""
+    return {"status": "ok"}
+
+
+@app.get("/readyz")
+def readyz():
+    """Readiness: chat can be answered (possibly from the persisted index while it is refreshed)"""
+    progress = get_startup_progress()
+    if not is_ready():
+        return JSONResponse(status_code=503, content={"status": "not_ready", **progress})
+    return {"status": "ready", **progress}
+
+
+@app.get("/metrics")
+def get_metrics():
+    """Prometheus scrape endpoint"""
+    body, content_type = metrics.render_latest()
+    return Response(content=body, media_type=content_type)
+
+
 @app.post("/api/chat", response_model=ChatResponse)
-def chat(req: ChatRequest):
+def chat(req: ChatRequest, request: Request):
     text = (req.message or "").strip()
     # Force English responses for consistency
     lang = "en"
     
-    # Check if we have the RAG components ready
-    if not retriever or not llm_client:
-        reply = "System is still initializing. Please wait a moment and try again."
-        return ChatResponse(reply=reply, language=lang)
-    
     # Handle empty messages
     if not text:
         reply = "Hi! I'm your Industrial Training assistant. You can start asking questions anytime."
         return ChatResponse(reply=reply, language=lang)
     
-    # Check for farewell keywords
-    farewell_map = {
-        "en": ["bye", "goodbye", "thank you", "thanks"],
-    }
-    lowered = text.lower()
-    if any(k in lowered for k in farewell_map.get(lang, [])):
-        reply = "Thanks for chatting! If you have more questions, just ask anytime."
+    if question_log:
+        question_log.record(text, req.session_id)
+    
+    # Greetings and farewells don't need the RAG pipeline
+    if settings.INTENT_ROUTER:
+        with tracing.span("intent"):
+            intent = intent_router.route(text)
+        if intent != "in_domain":
+            return ChatResponse(reply=intent_router.canned_reply(intent), language=lang)
+    
+    # Check if we have the RAG components ready
+    if not retriever or not llm_client:
+        reply = "System is still initializing. Please wait a moment and try again."
         return ChatResponse(reply=reply, language=lang)
     
+    # Budgets are per student; anonymous callers fall back to session, then IP
+    user_key = req.user_id or req.session_id or (request.client.host if request.client else "anonymous")
+    if settings.CHAT_RATE_LIMIT_PER_MINUTE > 0:
+        wait = chat_limiter.acquire(user_key)
+        if wait > 0:
+            raise HTTPException(
+                status_code=429,
+                detail="Too many questions in a short time. Please wait a moment and try again.",
+                headers={"Retry-After": retry_after_header(wait)}
+            )
+    
     try:
-        # Retrieve relevant chunks - increase k for better coverage
-        chunks = retriever.retrieve_relevant_chunks(text, k=8)
-        
-        if not chunks:
-            reply = "I couldn't find that in the Industrial Training documents. Please rephrase or ask another question."
-            return ChatResponse(reply=reply, language=lang)
-        
-        # Format context
-        context = retriever.format_context(chunks)
-        
-        # Generate response using LLM
-        llm_result = llm_client.generate_response(text, context, lang)
-        reply = llm_result.get('response', 'Sorry, I could not generate a response.')
-        
-        # If confidence is low, add a clarification
-        confidence = llm_result.get('confidence', 0.0)
-        if confidence < 0.3:
-            reply += " Could you provide more specific details about what you're looking for?"
+        generation = indexer.get_index_generation("chatbot")
+        # Follow-ups in a session carry the previous topic and reuse its chunks
+        previous = chat_sessions.last_turn(req.session_id)
+        query, prior_chunks = resolve_follow_up(text, previous, generation)
         
+        if prior_chunks:
+            # The answer depends on this session's earlier context, so it can't be shared
+            reply, chunks = answer_question(query, lang, user_key, prior_chunks)
+        else:
+            # Keyed on the index generation so a re-index never serves an answer
+            # computed from the old documents
+            key = (normalize_question(query), lang, generation)
+            reply, chunks = chat_flight.do(key, lambda: answer_question(query, lang, user_key))
+        chat_sessions.record_turn(req.session_id, Turn(text, query, chunks, generation))
         return ChatResponse(reply=reply, language=lang)
         
+    except RateLimitExceeded as e:
+        raise HTTPException(
+            status_code=429,
+            detail="The assistant is busy right now. Please try again shortly.",
+            headers={"Retry-After": e.retry_after_header}
+        )
     except Exception as e:
         logger.error(f"Chat error: {str(e)}")
+        metrics.ERRORS.labels(component='chat').inc()
         reply = "Sorry, I encountered an error while processing your question. Please try again."
         return ChatResponse(reply=reply, language=lang)
 
 
+def answer_question(text: str, lang: str, user_key: str, prior_chunks: list = None):
+    """Run the retrieval + LLM pipeline for one question
+    
+    Returns:
+        (reply, chunks the reply was based on)
+    """
+    # Pipeline slots are shared fairly between users
+    with chat_scheduler.slot(user_key):
+        return _run_pipeline(text, lang, prior_chunks)
+
+
+def _run_pipeline(text: str, lang: str, prior_chunks: list = None):
+    if prior_chunks:
+        # Follow-up: the previous turn's context plus a smaller fresh search
+        chunks = retriever.retrieve_relevant_chunks(text, k=settings.CHAT_FOLLOW_UP_K)
+        chunks = retriever.merge_chunks(chunks, prior_chunks, k=settings.CHAT_FOLLOW_UP_MAX_CHUNKS)
+    else:
+        # Retrieve relevant chunks - increase k for better coverage
+        chunks = retriever.retrieve_relevant_chunks(text, k=8)
+    
+    if not chunks:
+        return "I couldn't find that in the Industrial Training documents. Please rephrase or ask another question.", []
+    
+    # Confident date/number answers come straight from the documents
+    if settings.EXTRACTIVE_ANSWERS:
+        with tracing.span("extractive"):
+            extracted = extractive_answerer.answer(text, chunks)
+        if extracted:
+            return extracted['response'], chunks
+    
+    # Format context
+    context = retriever.format_context(chunks)
+    
+    # Generate response using LLM
+    llm_result = llm_client.generate_response(text, context, lang)
+    reply = llm_result.get('response', 'Sorry, I could not generate a response.')
+    
+    # If confidence is low, add a clarification
+    confidence = llm_result.get('confidence', 0.0)
+    if confidence < 0.3:
+        reply += " Could you provide more specific details about what you're looking for?"
+    
+    return reply, chunks
+
+
 def detect_language(text: str) -> str:
     if not text:
         return "en"  # Default to English
@@ -310,15 +568,23 @@ def detect_language(text: str) -> str:
 @app.get("/api/status")
 def get_status():
     """Get system status and indexing information"""
-    if not indexer:
-        return {"status": "initializing", "message": "System is starting up..."}
+    if not indexer or not startup_state["index_loaded"]:
+        return {"status": "initializing", "message": "System is starting up...", "startup": get_startup_progress()}
     
     stats = indexer.get_stats(pdf_type="chatbot")  # Status endpoint shows chatbot stats
     return {
-        "status": "ready",
+        "status": "ready" if is_ready() else "initializing",
+        "startup": get_startup_progress(),
         "indexed_documents": stats.get('total_vectors', 0),
         "pdf_folder": settings.PDF_FOLDER,
-        "has_api_key": bool(settings.GROQ_API_KEY or settings.GOOGLE_API_KEY or settings.OPENAI_API_KEY)
+        "has_api_key": bool(settings.GROQ_API_KEY or settings.GOOGLE_API_KEY or settings.OPENAI_API_KEY),
+        "llm_providers": llm_client.get_provider_health() if llm_client else {},
+        "llm_hedging": llm_client.get_hedge_stats() if llm_client else {},
+        "chat_coalescing": chat_flight.get_stats(),
+        "chat_scheduler": chat_scheduler.get_stats(),
+        "chat_sessions": chat_sessions.get_stats(),
+        "folder_watcher": folder_watcher.get_stats() if folder_watcher else None,
+        "index_writer": is_index_writer
     }
 
 @app.post("/api/reindex")
@@ -459,13 +725,23 @@ async def cv_check(file: UploadFile = File(...)):
     if not file.filename.endswith('.pdf'):
         raise HTTPException(status_code=400, detail="Only PDF files are supported")
     
+    upload = None
     try:
-        pdf_content = await file.read()
-        result = check_cv(pdf_content)
+        # Streamed to a temporary file; only its path is handed to the checker
+        upload = pdf_manager.new_upload()
+        with tracing.span("upload.receive"):
+            await spool_upload(file, upload, settings.UPLOAD_CHUNK_BYTES)
+        with tracing.span("cv_check", bytes=upload.size):
+            result = check_cv(pdf_path=upload.path)
         return result
+    except UploadRejected as e:
+        raise HTTPException(status_code=e.status_code, detail=str(e))
     except Exception as e:
         logger.error(f"CV check error: {str(e)}")
         raise HTTPException(status_code=500, detail=f"Error processing CV: {str(e)}")
+    finally:
+        if upload:
+            upload.discard()
 
 
 @app.post("/api/student/submit-cv")
@@ -485,15 +761,18 @@ async def student_submit_cv(
         raise HTTPException(status_code=400, detail="Missing user_id")
 
     try:
-        pdf_content = await file.read()
-
-        # Save PDF in submission directory with uploader = student id
-        result = pdf_manager.upload_pdf(
-            file_content=pdf_content,
-            filename=file.filename,
-            pdf_type="submission",
-            uploaded_by=user_id,
-        )
+        with pdf_manager.new_upload() as upload:
+            with tracing.span("upload.receive"):
+                await spool_upload(file, upload, settings.UPLOAD_CHUNK_BYTES)
+
+            # Save PDF in submission directory with uploader = student id
+            with tracing.span("upload.save", bytes=upload.size):
+                result = pdf_manager.commit_upload(
+                    upload,
+                    filename=file.filename,
+                    pdf_type="submission",
+                    uploaded_by=user_id,
+                )
 
         if not result.get("success"):
             raise HTTPException(
@@ -506,7 +785,10 @@ async def student_submit_cv(
             pdf_type="submission",
             file_size=result["file_size"],
             uploaded_by=user_id,
+            content_hash=result["content_hash"],
         )
+        # The hash is known already; view-pdf won't need to re-read the file for its ETag
+        content_hashes.remember(Path(result["file_path"]), result["content_hash"])
         pdf_metadata_manager.update_pdf_status(
             filename=result["file_name"],
             pdf_type="submission",
@@ -519,6 +801,8 @@ async def student_submit_cv(
             "file_name": result["file_name"],
             "pdf_type": "submission",
         }
+    except UploadRejected as e:
+        raise HTTPException(status_code=e.status_code, detail=str(e))
     except HTTPException:
         raise
     except Exception as e:
@@ -557,15 +841,18 @@ async def upload_pdf(
         raise HTTPException(status_code=400, detail="Only PDF files are supported")
     
     try:
-        pdf_content = await file.read()
         uploaded_by = user_id or "teacher"
-        
-        result = pdf_manager.upload_pdf(
-            file_content=pdf_content,
-            filename=file.filename,
-            pdf_type=pdf_type,
-            uploaded_by=uploaded_by
-        )
+        with pdf_manager.new_upload() as upload:
+            with tracing.span("upload.receive"):
+                await spool_upload(file, upload, settings.UPLOAD_CHUNK_BYTES)
+            
+            with tracing.span("upload.save", bytes=upload.size, pdf_type=pdf_type):
+                result = pdf_manager.commit_upload(
+                    upload,
+                    filename=file.filename,
+                    pdf_type=pdf_type,
+                    uploaded_by=uploaded_by
+                )
         
         if not result.get("success"):
             raise HTTPException(status_code=500, detail=result.get("error", "Upload failed"))
@@ -575,8 +862,10 @@ async def upload_pdf(
             filename=result["file_name"],
             pdf_type=pdf_type,
             file_size=result["file_size"],
-            uploaded_by=uploaded_by
+            uploaded_by=uploaded_by,
+            content_hash=result["content_hash"]
         )
+        content_hashes.remember(Path(result["file_path"]), result["content_hash"])
         
         # Update upload status
         pdf_metadata_manager.update_pdf_status(
@@ -591,82 +880,78 @@ async def upload_pdf(
         
         return result
         
+    except UploadRejected as e:
+        raise HTTPException(status_code=e.status_code, detail=str(e))
     except Exception as e:
         logger.error(f"PDF upload error: {str(e)}")
         raise HTTPException(status_code=500, detail=f"Error uploading PDF: {str(e)}")
 
 
+def _query_catalog(pdf_type: str, page: int, page_size: int, sort: str, order: str, **filters) -> dict:
+    """One page of the PDF catalog, as returned by the list endpoints"""
+    if order not in ("asc", "desc"):
+        raise HTTPException(status_code=400, detail="Invalid order. Must be: asc or desc")
+    try:
+        result = pdf_manager.query_pdfs(
+            pdf_type, pdf_metadata_manager.list_pdf_metadata(pdf_type),
+            page=page, page_size=page_size, sort=sort, descending=order == "desc", **filters
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return {
+        "success": True,
+        "pdf_type": pdf_type,
+        "files": result["files"],
+        "count": len(result["files"]),
+        "total": result["total"],
+        "page": result["page"],
+        "page_size": result["page_size"]
+    }
+
+
 @app.get("/api/teacher/list-pdfs")
-def list_pdfs(pdf_type: str):
-    """List all PDFs of a specific type (teacher only)"""
+def list_pdfs(pdf_type: str, page: int = 1, page_size: int = 50, sort: str = "modified_time", order: str = "desc",
+              uploaded_by: str = None, status: str = None, since: str = None, until: str = None, search: str = None):
+    """
+    List PDFs of a specific type (teacher only)
+    
+    Paginated and sorted server-side; filter by uploader, status
+    (success, failed, pending), upload date range (ISO, since inclusive,
+    until exclusive) and file name substring.
+    """
     if pdf_type not in ["chatbot", "submission", "notification"]:
         raise HTTPException(status_code=400, detail="Invalid pdf_type. Must be: chatbot, submission, or notification")
     
     try:
-        pdf_list = pdf_manager.list_pdfs(pdf_type)
-        # Merge with metadata to include status information
-        metadata_list = pdf_metadata_manager.list_pdf_metadata(pdf_type)
-        metadata_dict = {item["file_name"]: item for item in metadata_list if "file_name" in item}
-        
-        # Merge file info with metadata
-        for pdf in pdf_list:
-            if pdf["file_name"] in metadata_dict:
-                pdf["upload_status"] = metadata_dict[pdf["file_name"]].get("upload_status")
-                pdf["rebuild_status"] = metadata_dict[pdf["file_name"]].get("rebuild_status")
-                pdf["delete_status"] = metadata_dict[pdf["file_name"]].get("delete_status")
-                # Status shows the most recent operation (delete > rebuild > upload)
-                pdf["status"] = pdf.get("delete_status") or pdf.get("rebuild_status") or pdf.get("upload_status") or "pending"
-                # Determine last action type (delete > rebuild > upload)
-                if pdf.get("delete_status"):
-                    pdf["last_action"] = "delete"
-                elif pdf.get("rebuild_status"):
-                    pdf["last_action"] = "rebuild"
-                elif pdf.get("upload_status"):
-                    pdf["last_action"] = "upload"
-                else:
-                    pdf["last_action"] = "none"
-            else:
-                pdf["status"] = "pending"
-                pdf["last_action"] = "none"
-        
-        return {
-            "success": True,
-            "pdf_type": pdf_type,
-            "files": pdf_list,
-            "count": len(pdf_list)
-        }
+        return _query_catalog(
+            pdf_type, page, page_size, sort, order, uploaded_by=uploaded_by, status=status,
+            uploaded_after=since, uploaded_before=until, name_contains=search
+        )
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"List PDFs error: {str(e)}")
         raise HTTPException(status_code=500, detail=f"Error listing PDFs: {str(e)}")
 
 
 @app.get("/api/teacher/list-student-submissions")
-def list_student_submissions():
+def list_student_submissions(page: int = 1, page_size: int = 50, sort: str = "upload_time", order: str = "desc",
+                             uploaded_by: str = None, status: str = None, since: str = None, until: str = None,
+                             search: str = None):
     """
-    List all student-submitted CV/Resume PDFs (submission type where uploader is not the teacher account).
+    List student-submitted CV/Resume PDFs (submission type where uploader is not the teacher account).
+    
+    Takes the same pagination, sort and filter parameters as list-pdfs.
     """
     pdf_type = "submission"
     try:
-        pdf_list = pdf_manager.list_pdfs(pdf_type)
-        metadata_list = pdf_metadata_manager.list_pdf_metadata(pdf_type)
-        metadata_dict = {item["file_name"]: item for item in metadata_list if "file_name" in item}
-
-        student_files = []
-        for pdf in pdf_list:
-            meta = metadata_dict.get(pdf["file_name"])
-            # Treat anything not uploaded by the teacher admin as a student submission
-            if meta and meta.get("uploaded_by") != TEACHER_ID:
-                combined = pdf.copy()
-                combined["uploaded_by"] = meta.get("uploaded_by")
-                combined["upload_time"] = meta.get("upload_time", combined.get("upload_time"))
-                student_files.append(combined)
-
-        return {
-            "success": True,
-            "pdf_type": pdf_type,
-            "files": student_files,
-            "count": len(student_files),
-        }
+        # Treat anything not uploaded by the teacher admin as a student submission
+        return _query_catalog(
+            pdf_type, page, page_size, sort, order, uploaded_by=uploaded_by, exclude_uploaded_by=TEACHER_ID,
+            status=status, uploaded_after=since, uploaded_before=until, name_contains=search
+        )
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"List student submissions error: {str(e)}")
         raise HTTPException(status_code=500, detail=f"Error listing student submissions: {str(e)}")
@@ -729,24 +1014,19 @@ def get_pdf_info(filename: str, pdf_type: str):
 
 
 @app.get("/api/teacher/view-pdf")
-def view_pdf(filename: str, pdf_type: str):
-    """View/download a PDF file (teacher only)"""
+def view_pdf(filename: str, pdf_type: str, request: Request):
+    """View/download a PDF file (teacher only); supports If-None-Match and Range requests"""
     if pdf_type not in ["chatbot", "submission", "notification"]:
         raise HTTPException(status_code=400, detail="Invalid pdf_type. Must be: chatbot, submission, or notification")
     
     try:
-        from fastapi.responses import FileResponse
         target_dir = pdf_manager.get_directory(pdf_type)
-        file_path = target_dir / filename
+        file_path = target_dir / os.path.basename(filename)
         
         if not file_path.exists():
             raise HTTPException(status_code=404, detail="File not found")
         
-        return FileResponse(
-            path=str(file_path),
-            filename=filename,
-            media_type="application/pdf"
-        )
+        return conditional_file_response(request, file_path, "application/pdf", filename)
         
     except HTTPException:
         raise
@@ -755,6 +1035,25 @@ def view_pdf(filename: str, pdf_type: str):
         raise HTTPException(status_code=500, detail=f"Error viewing PDF: {str(e)}")
 
 
+@app.get("/api/teacher/pdf-preview")
+def pdf_preview(filename: str, pdf_type: str, request: Request, page: int = 1, width: int = THUMBNAIL_WIDTH):
+    """JPEG of one page of a PDF (a page-1 thumbnail by default), rendered once and cached (teacher only)"""
+    if pdf_type not in ["chatbot", "submission", "notification"]:
+        raise HTTPException(status_code=400, detail="Invalid pdf_type. Must be: chatbot, submission, or notification")
+    if page < 1:
+        raise HTTPException(status_code=400, detail="page must be 1 or more")
+    
+    file_path = pdf_manager.get_directory(pdf_type) / os.path.basename(filename)
+    if not file_path.exists():
+        raise HTTPException(status_code=404, detail="File not found")
+    
+    try:
+        preview_path = preview_service.get_preview(file_path, page, width)
+    except PreviewUnavailable as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    return conditional_file_response(request, preview_path, "image/jpeg")
+
+
 # Notification API Endpoints
 @app.post("/api/teacher/upload-emails")
 async def upload_student_emails(file: UploadFile = File(...)):
@@ -812,10 +1111,9 @@ def delete_email_file(filename: str):
 
 
 @app.get("/api/teacher/view-email-file")
-def view_email_file(filename: str):
-    """View/download an uploaded email file"""
+def view_email_file(filename: str, request: Request):
+    """View/download an uploaded email file; supports If-None-Match and Range requests"""
     try:
-        from fastapi.responses import FileResponse
         student_parser = StudentEmailParser()
         file_path = student_parser.get_uploaded_file_path(filename)
         
@@ -827,11 +1125,7 @@ def view_email_file(filename: str):
         if filename.lower().endswith('.csv'):
             media_type = "text/csv"
         
-        return FileResponse(
-            path=str(file_path),
-            filename=filename,
-            media_type=media_type
-        )
+        return conditional_file_response(request, file_path, media_type, filename)
         
     except HTTPException:
         raise
@@ -884,6 +1178,10 @@ def send_notification_manual(reminder_type: str = "general"):
         raise HTTPException(status_code=500, detail="Notification scheduler not initialized")
     
     try:
+        if not is_index_writer:
+            # Sending and logging the history belong to the process running the scheduler
+            return write_queue.submit("manual_send_notification", (reminder_type,), {},
+                                      timeout=settings.INDEX_WRITE_TIMEOUT_SECONDS, target="notifications")
         result = notification_scheduler.manual_send_notification(reminder_type)
         return result
     except Exception as e:
@@ -0,0 +1,160 @@
+"""
+Prometheus metrics for the chat pipeline and indexing.
+
+One registry per process, shared by the FastAPI app (served on /metrics)
+and by backend_direct in Streamlit mode (served on METRICS_PORT by
+start_metrics_server). In the pre-fork deployment, set
+PROMETHEUS_MULTIPROC_DIR to an empty directory so /metrics aggregates all
+workers.
+
+Without prometheus_client installed every metric is a no-op.
+"""
+
+import os
+import logging
+from contextlib import contextmanager
+
+logger = logging.getLogger(__name__)
+
+try:
+    from prometheus_client import (
+        CollectorRegistry, Counter, Gauge, Histogram, CONTENT_TYPE_LATEST, generate_latest, start_http_server
+    )
+    PROMETHEUS_AVAILABLE = True
+except ImportError:
+    PROMETHEUS_AVAILABLE = False
+    CONTENT_TYPE_LATEST = "text/plain; version=0.0.4; charset=utf-8"
+
+# Chat pipeline stages are milliseconds to a few seconds; LLM calls can take tens of seconds
+STAGE_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+LLM_BUCKETS = (0.1, 0.25, 0.5, 1.0, 2.0, 3.0, 5.0, 8.0, 12.0, 20.0, 30.0, 60.0)
+RATE_BUCKETS = (0.5, 1, 2, 5, 10, 20, 50, 100, 200, 500, 1000)
+OCR_PAGE_BUCKETS = (0, 1, 2, 5, 10, 20, 50, 100, 200)
+# From a file change to its vectors being searchable (debounce + parse + OCR + embed)
+WATCH_LAG_BUCKETS = (0.5, 1, 2, 3, 5, 10, 20, 30, 60, 120, 300, 600)
+
+
+class _NoopMetric:
+    def labels(self, *args, **kwargs):
+        return self
+
+    def inc(self, amount=1):
+        pass
+
+    def set(self, value):
+        pass
+
+    def observe(self, value):
+        pass
+
+    @contextmanager
+    def time(self):
+        yield
+
+
+if PROMETHEUS_AVAILABLE:
+    REGISTRY = CollectorRegistry()
+
+    STAGE_SECONDS = Histogram(
+        'rag_stage_seconds', 'Time spent in each chat pipeline stage',
+        ['stage'], buckets=STAGE_BUCKETS, registry=REGISTRY
+    )
+    LLM_SECONDS = Histogram(
+        'rag_llm_request_seconds', 'LLM provider call latency',
+        ['provider', 'model', 'outcome'], buckets=LLM_BUCKETS, registry=REGISTRY
+    )
+    CACHE_HITS = Counter(
+        'rag_cache_hits_total', 'Chat work answered from shared or cached results',
+        ['cache'], registry=REGISTRY
+    )
+    FALLBACKS = Counter(
+        'rag_llm_fallbacks_total', 'LLM requests that moved on to another provider or the local fallback',
+        ['kind'], registry=REGISTRY
+    )
+    ERRORS = Counter(
+        'rag_errors_total', 'Errors by component',
+        ['component'], registry=REGISTRY
+    )
+    INDEX_VECTORS = Gauge(
+        'rag_index_vectors', 'Vectors (ntotal) in the live FAISS index',
+        ['pdf_type'], registry=REGISTRY, multiprocess_mode='livemax'
+    )
+    INDEXING_PAGES_PER_SECOND = Histogram(
+        'rag_indexing_pages_per_second', 'Per-file indexing throughput in pages per second',
+        ['pdf_type'], buckets=RATE_BUCKETS, registry=REGISTRY
+    )
+    INDEXING_CHUNKS_PER_SECOND = Histogram(
+        'rag_indexing_chunks_per_second', 'Per-file indexing throughput in chunks per second',
+        ['pdf_type'], buckets=RATE_BUCKETS, registry=REGISTRY
+    )
+    INDEXING_OCR_PAGES = Histogram(
+        'rag_indexing_ocr_pages', 'Pages that needed OCR per indexed file',
+        ['pdf_type'], buckets=OCR_PAGE_BUCKETS, registry=REGISTRY
+    )
+    WATCHER_LAG_SECONDS = Histogram(
+        'rag_watcher_lag_seconds', 'Time from the first filesystem event of a change until the index reflects it',
+        ['pdf_type', 'action'], buckets=WATCH_LAG_BUCKETS, registry=REGISTRY
+    )
+    WATCHER_CHANGES = Counter(
+        'rag_watcher_changes_total', 'File changes handled by the folder watcher',
+        ['pdf_type', 'action', 'outcome'], registry=REGISTRY
+    )
+    WATCHER_PENDING = Gauge(
+        'rag_watcher_pending_files', 'Changed files waiting for the folder watcher',
+        registry=REGISTRY, multiprocess_mode='livesum'
+    )
+else:
+    REGISTRY = None
+    STAGE_SECONDS = LLM_SECONDS = CACHE_HITS = FALLBACKS = ERRORS = _NoopMetric()
+    INDEX_VECTORS = INDEXING_PAGES_PER_SECOND = INDEXING_CHUNKS_PER_SECOND = INDEXING_OCR_PAGES = _NoopMetric()
+    WATCHER_LAG_SECONDS = WATCHER_CHANGES = WATCHER_PENDING = _NoopMetric()
+
+
+def time_stage(stage: str):
+    """Context manager timing one pipeline stage into rag_stage_seconds"""
+    return STAGE_SECONDS.labels(stage=stage).time()
+
+
+def observe_file_indexed(pdf_type: str, pdf_data: dict, chunks: int, seconds: float):
+    """Record throughput for one indexed file"""
+    pages = len(pdf_data.get('pages', []))
+    ocr_pages = sum(1 for page in pdf_data.get('pages', []) if page.get('ocr_applied'))
+    INDEXING_OCR_PAGES.labels(pdf_type=pdf_type).observe(ocr_pages)
+    if seconds > 0:
+        INDEXING_PAGES_PER_SECOND.labels(pdf_type=pdf_type).observe(pages / seconds)
+        INDEXING_CHUNKS_PER_SECOND.labels(pdf_type=pdf_type).observe(chunks / seconds)
+
+
+def render_latest():
+    """
+    Metrics in the Prometheus text format
+
+    Returns:
+        (body bytes, content type)
+    """
+    if not PROMETHEUS_AVAILABLE:
+        return b"# prometheus_client is not installed\n", CONTENT_TYPE_LATEST
+    if os.getenv('PROMETHEUS_MULTIPROC_DIR'):
+        from prometheus_client import multiprocess
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+        return generate_latest(registry), CONTENT_TYPE_LATEST
+    return generate_latest(REGISTRY), CONTENT_TYPE_LATEST
+
+
+_server_started = False
+
+
+def start_metrics_server(port: int, addr: str = "127.0.0.1") -> bool:
+    """Serve the registry on http://addr:port/metrics from a background thread (once per process)"""
+    global _server_started
+    if _server_started or not port or not PROMETHEUS_AVAILABLE:
+        return _server_started
+    try:
+        start_http_server(port, addr=addr, registry=REGISTRY)
+        _server_started = True
+        logger.info(f"Serving metrics on http://{addr}:{port}/metrics")
+    except OSError as e:
+        # Streamlit reruns the script; another process may already own the port
+        logger.warning(f"Could not start metrics server on port {port}: {str(e)}")
+    return _server_started
@@ -2,10 +2,22 @@
 Notification module for email notifications and deadline management.
 """
 
-from .email_sender import EmailSender
-from .scheduler import NotificationScheduler
-from .student_parser import StudentEmailParser
-from .deadline_parser import DeadlineParser
+import importlib
 
 __all__ = ['EmailSender', 'NotificationScheduler', 'StudentEmailParser', 'DeadlineParser']
 
+# Submodules are imported on first attribute access: the scheduler pulls in
+# apscheduler and the deadline parser pulls in the PDF/OCR stack, which pages
+# that only need StudentEmailParser should not pay for.
+_SUBMODULES = {
+    'EmailSender': '.email_sender',
+    'NotificationScheduler': '.scheduler',
+    'StudentEmailParser': '.student_parser',
+    'DeadlineParser': '.deadline_parser',
+}
+
+
+def __getattr__(name):
+    if name in _SUBMODULES:
+        return getattr(importlib.import_module(_SUBMODULES[name], __name__), name)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
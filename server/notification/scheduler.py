@@ -202,6 +202,8 @@ class NotificationScheduler:
     
     def get_notification_status(self) -> Dict[str, Any]:
         """Get current notification status"""
+        # Another process (the one running the scheduler) may have sent since
+        self.notification_history = self._load_notification_history()
         deadline_info = self._load_deadline_info()
         
         if not deadline_info or not deadline_info.get("deadline"):
@@ -242,6 +244,7 @@ class NotificationScheduler:
     
     def get_notification_history(self, limit: int = 50) -> list:
         """Get notification history"""
+        self.notification_history = self._load_notification_history()
         return self.notification_history[-limit:]
     
     def manual_send_notification(self, reminder_type: str = "general") -> Dict[str, Any]:
@@ -0,0 +1,157 @@
+import re
+import logging
+from typing import List, Dict, Any, Optional, Set
+from ..config import settings
+
+logger = logging.getLogger(__name__)
+
+MONTHS = r'(?:jan(?:uary)?|feb(?:ruary)?|mar(?:ch)?|apr(?:il)?|may|june?|july?|aug(?:ust)?|sep(?:t(?:ember)?)?|oct(?:ober)?|nov(?:ember)?|dec(?:ember)?)'
+
+# Spans that can answer each kind of question
+DATE_PATTERN = re.compile(
+    r'\b(?:\d{1,2}(?:st|nd|rd|th)?\s+' + MONTHS + r',?\s+\d{4}'
+    r'|' + MONTHS + r'\s+\d{1,2}(?:st|nd|rd|th)?,?\s+\d{4}'
+    r'|\d{1,2}[/-]\d{1,2}[/-]\d{2,4}'
+    r'|(?:week|wk)\s*\d{1,2})\b',
+    re.IGNORECASE
+)
+NUMBER_PATTERN = re.compile(
+    r'(?:RM\s?)?\b\d+(?:[.,]\d+)?\s*(?:%|percent|weeks?|days?|months?|hours?|credits?|pages?|copies|marks?|words?)?',
+    re.IGNORECASE
+)
+
+# Question cues for each answer type
+DATE_QUESTION = re.compile(r'\b(when|what date|which date|what day|deadline|due|until|by when|last day|closing date)\b', re.IGNORECASE)
+NUMBER_QUESTION = re.compile(r'\b(how many|how much|how long|number of|what percentage|minimum|maximum|duration)\b', re.IGNORECASE)
+
+# Words that carry no topic information for overlap scoring
+STOPWORDS = {
+    'the', 'a', 'an', 'is', 'are', 'was', 'were', 'be', 'to', 'of', 'for', 'in', 'on', 'at', 'by',
+    'and', 'or', 'do', 'does', 'did', 'i', 'we', 'my', 'our', 'what', 'when', 'which', 'how',
+    'many', 'much', 'long', 'who', 'where', 'it', 'this', 'that', 'with', 'can', 'should', 'will',
+    'need', 'have', 'has', 'there', 'date', 'day', 'number', 'until', 'due', 'deadline', 'about',
+}
+
+
+def _content_words(text: str) -> List[str]:
+    # Single letters and digits stay: they tell "Form A" from "Form B" and "week 3" from "week 4"
+    return [w for w in re.findall(r'[a-z0-9]+', text.lower()) if w not in STOPWORDS]
+
+
+def _identifiers(words: Set[str]) -> Set[str]:
+    """Words that name one item of a series (a letter, or anything with a digit)"""
+    return {w for w in words if len(w) == 1 or any(c.isdigit() for c in w)}
+
+
+# Where a sentence joins independent clauses, each with its own subject and date
+CLAUSE_BREAK = re.compile(r'\s*;\s*|,?\s+(?:and|but|while|whereas|then)\s+', re.IGNORECASE)
+
+
+def _split_sentences(text: str) -> List[str]:
+    sentences = re.split(r'(?<=[.!?])\s+|\n+', text)
+    return [s.strip() for s in sentences if len(s.strip()) >= 15]
+
+
+class ExtractiveAnswerer:
+    """
+    Answer date, number and deadline questions directly from retrieved chunks.
+
+    Candidate sentences are those containing a span of the right kind (a
+    date for "when"/deadline questions, a quantity for "how many"/"how long"
+    ones). Each is scored by how many of the question's content words it
+    contains, weighted with the retrieval score of its chunk. Words and span
+    must be in the same clause: in "training starts on 1 March and the
+    report is submitted to the faculty" the date answers when training
+    starts, not when the report is due. A clause only counts if it contains
+    every identifier in the question (the "B" of "Form B", the "3" of
+    "week 3") and either all of its content words or at least min_overlap
+    of them. The best sentence is returned with
+    its source only if it clears min_confidence and no candidate with a
+    different span scores nearly as well; anything else is left to the LLM.
+    """
+
+    def __init__(self, min_confidence: float = None, min_margin: float = 0.1, min_overlap: int = 2):
+        self.min_confidence = settings.EXTRACTIVE_MIN_CONFIDENCE if min_confidence is None else min_confidence
+        self.min_margin = min_margin
+        self.min_overlap = min_overlap
+
+    def classify_question(self, query: str) -> Optional[str]:
+        """Return 'date' or 'number' for questions this stage can answer, else None"""
+        if DATE_QUESTION.search(query):
+            return 'date'
+        if NUMBER_QUESTION.search(query):
+            return 'number'
+        return None
+
+    def answer(self, query: str, chunks: List[Dict[str, Any]]) -> Optional[Dict[str, Any]]:
+        """
+        Try to answer query from chunks without the LLM
+
+        Args:
+            query: User question
+            chunks: Retrieved chunks (text, file_name, page_number, score)
+
+        Returns:
+            Response dict like LLMClient.generate_response plus 'citation',
+            or None if the question should go to the LLM
+        """
+        answer_type = self.classify_question(query)
+        if not answer_type or not chunks:
+            return None
+
+        query_words = set(_content_words(query))
+        if not query_words:
+            return None
+        identifiers = _identifiers(query_words)
+        pattern = DATE_PATTERN if answer_type == 'date' else NUMBER_PATTERN
+
+        candidates = []
+        for chunk in chunks:
+            retrieval_score = max(0.0, min(float(chunk.get('score', 0.0)), 1.0))
+            for sentence in _split_sentences(chunk.get('text', '')):
+                sentence_shared = query_words & set(_content_words(sentence))
+                for clause in CLAUSE_BREAK.split(sentence):
+                    spans = [m.group(0).strip() for m in pattern.finditer(clause) if m.group(0).strip()]
+                    if not spans:
+                        continue
+                    shared = query_words & set(_content_words(clause))
+                    # Topic words in another clause: this clause's span answers something else
+                    if shared != sentence_shared:
+                        continue
+                    # A clause about another form/week, or sharing a single generic word, isn't an answer
+                    if not identifiers <= shared:
+                        continue
+                    if shared != query_words and len(shared) < self.min_overlap:
+                        continue
+                    overlap = len(shared) / len(query_words)
+                    score = 0.7 * overlap + 0.3 * retrieval_score
+                    candidates.append((score, spans[0].lower(), sentence, chunk))
+
+        if not candidates:
+            return None
+
+        candidates.sort(key=lambda c: c[0], reverse=True)
+        best_score, best_span, sentence, chunk = candidates[0]
+        # Another sentence giving a different date/number almost as convincingly
+        # means the documents are ambiguous; let the LLM reconcile them
+        for score, span, _, _ in candidates[1:]:
+            if span != best_span:
+                if best_score - score < self.min_margin:
+                    return None
+                break
+
+        if best_score < self.min_confidence:
+            return None
+
+        file_name = chunk.get('file_name', '')
+        page_number = chunk.get('page_number', 0)
+        source = f"{file_name}, page {page_number}" if page_number else file_name
+        response = f"{sentence}\n\n(Source: {source})" if source else sentence
+        logger.info(f"Answered {answer_type} question extractively (score {best_score:.2f}) from {source}")
+
+        return {
+            'response': response,
+            'confidence': best_score,
+            'model': 'extractive',
+            'citation': {'file_name': file_name, 'page_number': page_number, 'span': best_span}
+        }
@@ -0,0 +1,125 @@
+import threading
+import time
+from collections import deque
+from typing import Dict, Any, Optional
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+class ProviderHealth:
+    """
+    Rolling latency/error window and circuit breaker for one LLM provider.
+
+    The circuit opens when the failure rate over the window reaches
+    failure_rate (once at least min_requests calls were seen), or after
+    consecutive_failures failures in a row. While open the provider is
+    skipped; after open_seconds a single probe request is let through
+    (half-open) and its outcome closes or re-opens the circuit.
+    """
+
+    def __init__(self, name: str, window_seconds: float = 300, failure_rate: float = 0.5,
+                 min_requests: int = 4, consecutive_failures: int = 3, open_seconds: float = 30):
+        self.name = name
+        self.window_seconds = window_seconds
+        self.failure_rate = failure_rate
+        self.min_requests = min_requests
+        self.consecutive_failures = consecutive_failures
+        self.open_seconds = open_seconds
+
+        self._lock = threading.Lock()
+        self._samples = deque()  # (timestamp, latency, success)
+        self._failures_in_row = 0
+        self._state = "closed"
+        self._open_until = 0.0
+        self._probe_in_flight = False
+
+    def _prune(self, now: float):
+        while self._samples and now - self._samples[0][0] > self.window_seconds:
+            self._samples.popleft()
+
+    def allow_request(self) -> bool:
+        """Whether a request may be sent now (claims the probe slot when half-open)"""
+        with self._lock:
+            if self._state == "closed":
+                return True
+            if self._state == "open":
+                if time.monotonic() < self._open_until:
+                    return False
+                self._state = "half_open"
+                self._probe_in_flight = False
+            if self._probe_in_flight:
+                return False
+            self._probe_in_flight = True
+            return True
+
+    def record_success(self, latency: float):
+        with self._lock:
+            now = time.monotonic()
+            self._samples.append((now, latency, True))
+            self._prune(now)
+            self._failures_in_row = 0
+            if self._state != "closed":
+                logger.info(f"LLM provider {self.name} recovered, closing circuit")
+                # Start the error window afresh so old failures don't re-open it at once
+                self._samples = deque([(now, latency, True)])
+            self._state = "closed"
+            self._probe_in_flight = False
+
+    def record_failure(self, latency: float):
+        with self._lock:
+            now = time.monotonic()
+            self._samples.append((now, latency, False))
+            self._prune(now)
+            self._failures_in_row += 1
+
+            failures = sum(1 for _, _, ok in self._samples if not ok)
+            too_many = (len(self._samples) >= self.min_requests
+                        and failures / len(self._samples) >= self.failure_rate)
+            if self._state == "half_open" or too_many or self._failures_in_row >= self.consecutive_failures:
+                self._open(now, self.open_seconds)
+
+    def trip(self, open_seconds: float):
+        """Open the circuit immediately, e.g. on an invalid API key"""
+        with self._lock:
+            self._open(time.monotonic(), open_seconds)
+
+    def _open(self, now: float, open_seconds: float):
+        if self._state != "open":
+            logger.warning(f"LLM provider {self.name} is failing, opening circuit for {open_seconds:.0f}s")
+        self._state = "open"
+        self._open_until = now + open_seconds
+        self._probe_in_flight = False
+
+    def latency_percentile(self, percentile: float, min_samples: int = 1) -> Optional[float]:
+        """Latency percentile (0-100) of successful calls in the window, None if too few were seen"""
+        with self._lock:
+            self._prune(time.monotonic())
+            latencies = sorted(latency for _, latency, ok in self._samples if ok)
+        if not latencies or len(latencies) < min_samples:
+            return None
+        index = min(len(latencies) - 1, int(len(latencies) * percentile / 100))
+        return latencies[index]
+
+    def request_count(self) -> int:
+        """Calls (successful or not) recorded in the window"""
+        with self._lock:
+            self._prune(time.monotonic())
+            return len(self._samples)
+
+    def latency_estimate(self) -> Optional[float]:
+        """Median latency of successful calls in the window, None if there are none"""
+        return self.latency_percentile(50)
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            self._prune(time.monotonic())
+            total = len(self._samples)
+            failures = sum(1 for _, _, ok in self._samples if not ok)
+            state = self._state
+        return {
+            'state': state,
+            'requests': total,
+            'error_rate': failures / total if total else 0.0,
+            'median_latency': self.latency_estimate()
+        }
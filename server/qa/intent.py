@@ -0,0 +1,136 @@
+import math
+import re
+import logging
+from collections import Counter
+from typing import Dict, List, Tuple
+from ..config import settings
+
+logger = logging.getLogger(__name__)
+
+# Labelled examples the router is trained from; add phrasings here when a
+# message is routed wrongly
+INTENT_EXAMPLES = {
+    "greeting": [
+        "hi", "hello", "hey", "hi there", "hello there", "good morning", "good afternoon",
+        "good evening", "hey bot", "hai", "helo", "yo", "howdy", "greetings",
+        "hi, how are you", "hello, anyone there?",
+    ],
+    "farewell": [
+        "bye", "goodbye", "bye bye", "see you", "see you later", "thanks", "thank you",
+        "thanks a lot", "thank you so much", "ok thanks", "okay thank you", "thanks, bye",
+        "that's all, thanks", "cheers", "great, thanks", "got it, thank you", "ok noted, thanks",
+    ],
+    "out_of_scope": [
+        "what is the weather today", "tell me a joke", "who won the football match",
+        "what is the capital of france", "write me a poem", "can you help with my math homework",
+        "what's your favourite movie", "recommend a good restaurant", "how do I cook rice",
+        "what is bitcoin price", "who is the president", "sing a song", "what time is it",
+        "translate this to spanish", "play some music", "are you human",
+    ],
+    "in_domain": [
+        "when is the industrial training report deadline", "how do I submit my logbook",
+        "what documents do I need for industrial training", "how many weeks is the internship",
+        "who is my faculty supervisor", "how do I apply for industrial training placement",
+        "what is form a", "where do I submit form b", "thanks, but what about form b?",
+        "what is the grading for industrial training", "can I change my company",
+        "what should be in the final report", "is the briefing attendance compulsory",
+        "how do I get the offer letter", "what are the requirements for the cv",
+        "hi, when is the deadline for the report?", "thank you, and how do I submit the logbook?",
+        "what happens if I submit late", "how long is the internship", "what is the weekly log",
+        "do I need an insurance letter", "which companies are approved", "what is the presentation date",
+    ],
+}
+
+# Only these are answered without the RAG pipeline. out_of_scope is still
+# learned, as a counterweight that keeps questions away from greeting and
+# farewell, but a few examples can't tell "what time is it" from "what time
+# do I start work"; those go to retrieval, which says so when it finds nothing.
+SHORT_CIRCUIT_INTENTS = ("greeting", "farewell")
+
+CANNED_REPLIES = {
+    "greeting": "Hi! I'm your Industrial Training assistant. You can start asking questions anytime.",
+    "farewell": "Thanks for chatting! If you have more questions, just ask anytime.",
+}
+
+
+def _features(text: str) -> Counter:
+    """Bag of words plus character trigrams (robust to typos like 'helo')"""
+    text = re.sub(r'\s+', ' ', text.lower()).strip()
+    words = re.findall(r"[a-z0-9']+", text)
+    counts = Counter(f"w:{w}" for w in words)
+    for word in words:
+        padded = f" {word} "
+        counts.update(f"c:{padded[i:i + 3]}" for i in range(len(padded) - 2))
+    return counts
+
+
+def _normalize(vector: Dict[str, float]) -> Dict[str, float]:
+    norm = math.sqrt(sum(v * v for v in vector.values())) or 1.0
+    return {k: v / norm for k, v in vector.items()}
+
+
+def _dot(a: Dict[str, float], b: Dict[str, float]) -> float:
+    if len(a) > len(b):
+        a, b = b, a
+    return sum(v * b.get(k, 0.0) for k, v in a.items())
+
+
+class IntentRouter:
+    """
+    Nearest-centroid intent classifier for chat messages.
+
+    Each intent's centroid is the mean feature vector of its examples; a
+    message is assigned to the most similar centroid. Anything not
+    confidently a greeting or farewell (too little similarity, or too
+    close to in_domain or out_of_scope) goes to the RAG pipeline, so
+    misroutes fail towards answering.
+    """
+
+    def __init__(self, examples: Dict[str, List[str]] = None, min_confidence: float = None,
+                 min_margin: float = 0.05):
+        self.min_confidence = settings.INTENT_MIN_CONFIDENCE if min_confidence is None else min_confidence
+        self.min_margin = min_margin
+        examples = examples or INTENT_EXAMPLES
+
+        # IDF over all examples, so words shared by every intent ("what", "the")
+        # count for little and topic words ("form", "logbook", "joke") dominate
+        document_frequency = Counter()
+        total = 0
+        for texts in examples.values():
+            for text in texts:
+                document_frequency.update(set(_features(text)))
+                total += 1
+        self.idf = {k: math.log((total + 1) / (df + 1)) + 1 for k, df in document_frequency.items()}
+        self.default_idf = math.log(total + 1) + 1
+
+        self.centroids = {}
+        for label, texts in examples.items():
+            centroid = Counter()
+            for text in texts:
+                centroid.update(self._vectorize(text))
+            self.centroids[label] = _normalize(centroid)
+
+    def _vectorize(self, text: str) -> Dict[str, float]:
+        return _normalize({k: v * self.idf.get(k, self.default_idf) for k, v in _features(text).items()})
+
+    def classify(self, text: str) -> List[Tuple[str, float]]:
+        """Similarity to every intent, best first"""
+        features = self._vectorize(text)
+        scores = [(label, _dot(features, centroid)) for label, centroid in self.centroids.items()]
+        return sorted(scores, key=lambda s: s[1], reverse=True)
+
+    def route(self, text: str) -> str:
+        """Return 'greeting' or 'farewell' for messages with a canned reply, else 'in_domain'"""
+        scores = self.classify(text)
+        label, score = scores[0]
+        if label not in SHORT_CIRCUIT_INTENTS:
+            return "in_domain"
+
+        runner_up = scores[1][1] if len(scores) > 1 else 0.0
+        if score < self.min_confidence or score - runner_up < self.min_margin:
+            return "in_domain"
+        logger.info(f"Routed message as {label} (score {score:.2f})")
+        return label
+
+    def canned_reply(self, intent: str) -> str:
+        return CANNED_REPLIES[intent]
@@ -1,13 +1,28 @@
-import openai
-import google.generativeai as genai
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Optional
+import contextvars
+import inspect
 import logging
 import re
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeoutError, wait, FIRST_COMPLETED
 from ..config import settings
-from groq import Groq
+from .health import ProviderHealth
+from .. import metrics, tracing
 
 logger = logging.getLogger(__name__)
 
+# Provider names, in default preference order
+PROVIDERS = ("groq", "gemini", "openai")
+
+# Successful calls needed before the hedge delay follows the provider's own latency
+HEDGE_MIN_SAMPLES = 20
+# Recent requests over which LLM_HEDGE_MAX_RATE is enforced
+HEDGE_BUDGET_WINDOW = 200
+HEDGE_MAX_WORKERS = 32
+
+
 class LLMClient:
     def __init__(self, api_key: str = None, use_google: bool = False, use_groq: bool = False):
         self.use_google = use_google
@@ -15,91 +30,287 @@ class LLMClient:
         self.groq_client = None
         self.google_api_key = None
         self.api_key = None
+        self.openai_client = None
         self.model = None
+        self._gemini_call_options = {}
         self._groq_failed = False  # Track if Groq has failed
+        self._stub = None
 
-        if use_groq:
-            groq_key = api_key or settings.GROQ_API_KEY
-            if groq_key and groq_key.strip() and groq_key != "your_groq_api_key_here":
-                try:
-                    self.groq_client = Groq(api_key=groq_key)
-                    logger.info("Groq client initialized successfully")
-                except Exception as e:
-                    logger.error(f"Failed to initialize Groq client: {str(e)}")
-                    logger.info("Falling back to alternative LLM")
-                    self.groq_client = None
-                    self.use_groq = False
-                    self._groq_failed = True
-                    # Try to fallback to Google or OpenAI
-                    self._setup_fallback()
-            else:
-                logger.warning("Groq API key not provided or invalid, setting up fallback")
-                self.use_groq = False
-                self._groq_failed = True
-                self._setup_fallback()
-        elif use_google:
-            self.google_api_key = api_key or settings.GOOGLE_API_KEY
-            if self.google_api_key and self.google_api_key.strip() and self.google_api_key != "your_google_gemini_api_key_here":
-                try:
-                    genai.configure(api_key=self.google_api_key)
-                    self.model = genai.GenerativeModel('gemini-pro')
-                    logger.info("Google Gemini client initialized successfully")
-                except Exception as e:
-                    logger.error(f"Failed to initialize Google Gemini client: {str(e)}")
-                    self.model = None
-            else:
-                logger.warning("Google API key not provided or invalid")
+        if settings.LLM_STUB:
+            # Load testing: a single in-process stand-in instead of any real provider
+            from ..loadtest.stubs import StubLLM
+            self._stub = StubLLM(settings.LLM_STUB_LATENCY, settings.LLM_STUB_ERROR_RATE)
+            use_groq = use_google = self.use_groq = self.use_google = False
+            logger.warning("Using stub LLM provider (load testing only)")
+
+        # Every provider with a usable key is set up so requests can be routed
+        # around one that is failing; api_key applies to the requested provider
+        primary = "groq" if use_groq else "gemini" if use_google else "openai"
+        if self._stub is None:
+            self._setup_groq(api_key if primary == "groq" else None)
+            self._setup_google(api_key if primary == "gemini" else None)
+            self._setup_openai(api_key if primary == "openai" else None)
+
+        # Preference order: requested provider first, then Groq > Gemini > OpenAI
+        order = [primary] + [name for name in PROVIDERS if name != primary]
+        self.providers = [name for name in order if self._provider_available(name)]
+        if self._stub is not None:
+            self.providers = ["stub"]
+        self.health = {
+            name: ProviderHealth(
+                name,
+                window_seconds=settings.LLM_HEALTH_WINDOW_SECONDS,
+                failure_rate=settings.LLM_BREAKER_FAILURE_RATE,
+                min_requests=settings.LLM_BREAKER_MIN_REQUESTS,
+                consecutive_failures=settings.LLM_BREAKER_CONSECUTIVE_FAILURES,
+                open_seconds=settings.LLM_BREAKER_OPEN_SECONDS
+            )
+            for name in self.providers
+        }
+
+        # Hedging state (only used when LLM_HEDGING is on)
+        self._hedge_executor = None
+        self._hedge_lock = threading.Lock()
+        self._hedge_window = deque(maxlen=HEDGE_BUDGET_WINDOW)  # True where a hedge was sent
+        self._hedge_stats = {'requests': 0, 'hedges_sent': 0, 'hedge_wins': 0, 'hedges_over_budget': 0}
+
+        if use_groq and not self.groq_client:
+            logger.warning("Groq API key not provided or invalid, using fallback providers")
+            self.use_groq = False
+            self._groq_failed = True
+            self.use_google = self.model is not None
+        if not self.providers:
+            logger.warning("No LLM provider available, will use local fallback")
         else:
-            self.api_key = api_key or settings.OPENAI_API_KEY
-            if self.api_key:
-                openai.api_key = self.api_key
-    
-    def _setup_fallback(self):
-        """Setup fallback LLM when primary fails"""
-        # Try Google Gemini first
-        if settings.GOOGLE_API_KEY and settings.GOOGLE_API_KEY.strip() and settings.GOOGLE_API_KEY != "your_google_gemini_api_key_here":
+            logger.info(f"LLM providers available: {', '.join(self.providers)}")
+
+    def _setup_groq(self, api_key: str = None):
+        groq_key = api_key or settings.GROQ_API_KEY
+        if groq_key and groq_key.strip() and groq_key != "your_groq_api_key_here":
+            try:
+                from groq import Groq
+                # Retries are left to the router, which can try another provider instead
+                self.groq_client = Groq(api_key=groq_key, timeout=settings.LLM_TIMEOUT_SECONDS, max_retries=0)
+                logger.info("Groq client initialized successfully")
+            except Exception as e:
+                logger.error(f"Failed to initialize Groq client: {str(e)}")
+                self.groq_client = None
+
+    def _setup_google(self, api_key: str = None):
+        google_key = api_key or settings.GOOGLE_API_KEY
+        if google_key and google_key.strip() and google_key not in ("your_google_gemini_api_key_here", "PUT_YOUR_GOOGLE_API_KEY_HERE"):
             try:
-                self.google_api_key = settings.GOOGLE_API_KEY
-                genai.configure(api_key=self.google_api_key)
+                import google.generativeai as genai
+                genai.configure(api_key=google_key)
                 self.model = genai.GenerativeModel('gemini-pro')
-                self.use_google = True
-                logger.info("Using Google Gemini as fallback")
-                return
+                # request_options arrived in google-generativeai 0.4; older versions
+                # pass unknown keywords into the request proto and reject it
+                if 'request_options' in inspect.signature(self.model.generate_content).parameters:
+                    self._gemini_call_options = {'request_options': {'timeout': settings.LLM_TIMEOUT_SECONDS}}
+                else:
+                    logger.warning("This google-generativeai version can't time out calls; "
+                                   "Gemini requests are bounded by hedging and the circuit breaker only")
+                self.google_api_key = google_key
+                logger.info("Google Gemini client initialized successfully")
             except Exception as e:
-                logger.error(f"Failed to setup Google Gemini fallback: {str(e)}")
-        # Try OpenAI as second fallback
-        if settings.OPENAI_API_KEY and settings.OPENAI_API_KEY.strip():
-            self.api_key = settings.OPENAI_API_KEY
+                logger.error(f"Failed to initialize Google Gemini client: {str(e)}")
+                self.model = None
+
+    def _setup_openai(self, api_key: str = None):
+        openai_key = api_key or settings.OPENAI_API_KEY
+        if openai_key and openai_key.strip():
+            import openai
+            self.api_key = openai_key
             openai.api_key = self.api_key
-            logger.info("Using OpenAI as fallback")
-        else:
-            logger.warning("No fallback LLM available, will use local fallback")
-    
-    def generate_response(self, query: str, context: str, language: str = "en") -> Dict[str, Any]:
-        """Generate response using Groq, Google AI, OpenAI, or fallback"""
-        # Try Groq first if available
-        if self.use_groq and self.groq_client and not self._groq_failed:
-            result = self._generate_groq_response(query, context, language)
-            # Check if Groq failed with 401 error, then switch to fallback
-            if result.get('error') and ('401' in str(result.get('error')) or 'Invalid API Key' in str(result.get('error')) or 'invalid_api_key' in str(result.get('error'))):
-                logger.warning("Groq API key invalid, switching to fallback")
+            # Retries are left to the router, which can try another provider instead
+            self.openai_client = openai.OpenAI(api_key=openai_key, timeout=settings.LLM_TIMEOUT_SECONDS, max_retries=0)
+
+    def _provider_available(self, name: str) -> bool:
+        if name == "groq":
+            return self.groq_client is not None
+        if name == "gemini":
+            return bool(self.google_api_key and self.model)
+        return bool(self.api_key and self.openai_client)
+
+    def _call_provider(self, name: str, query: str, context: str, language: str) -> Dict[str, Any]:
+        if name == "stub":
+            return self._stub.generate(query, context)
+        if name == "groq":
+            return self._generate_groq_response(query, context, language)
+        if name == "gemini":
+            return self._generate_google_response(query, context, language)
+        return self._generate_openai_response(query, context, language)
+
+    def _route(self) -> List[str]:
+        """Providers ordered fastest first by recent median latency.
+
+        Providers with a known latency come first. After them come providers
+        with no recent calls (in preference order, so they are sampled when
+        the measured ones fail), and last those whose recent calls all
+        failed, so a provider that only ever fails is never tried ahead of a
+        healthy one.
+        """
+        def key(name):
+            health = self.health[name]
+            latency = health.latency_estimate()
+            if latency is not None:
+                return (0, latency, self.providers.index(name))
+            tier = 2 if health.request_count() else 1
+            return (tier, 0.0, self.providers.index(name))
+        return sorted(self.providers, key=key)
+
+    @staticmethod
+    def _is_auth_error(error: str) -> bool:
+        return '401' in error or 'Invalid API Key' in error or 'invalid_api_key' in error
+
+    def get_provider_health(self) -> Dict[str, Dict[str, Any]]:
+        """Circuit state, error rate and median latency per provider"""
+        return {name: self.health[name].snapshot() for name in self.providers}
+
+    def get_hedge_stats(self) -> Dict[str, Any]:
+        """How often requests were hedged and how often the hedge answered first"""
+        with self._hedge_lock:
+            stats = dict(self._hedge_stats)
+            recent = len(self._hedge_window)
+            stats['recent_hedge_rate'] = sum(self._hedge_window) / recent if recent else 0.0
+        stats['enabled'] = settings.LLM_HEDGING
+        stats['hedge_win_rate'] = stats['hedge_wins'] / stats['hedges_sent'] if stats['hedges_sent'] else 0.0
+        return stats
+
+    def _attempt(self, name: str, query: str, context: str, language: str) -> Dict[str, Any]:
+        """Call one provider and record the outcome in its health window"""
+        health = self.health[name]
+        start = time.monotonic()
+        with tracing.span(f"llm.{name}", provider=name) as span:
+            result = self._call_provider(name, query, context, language)
+            if span:
+                span.set_attribute('model', result.get('model', 'unknown'))
+                span.error = bool(result.get('error'))
+        latency = time.monotonic() - start
+
+        error = result.get('error')
+        metrics.LLM_SECONDS.labels(
+            provider=name, model=result.get('model', 'unknown'), outcome='error' if error else 'ok'
+        ).observe(latency)
+        if not error:
+            health.record_success(latency)
+            result['provider'] = name
+            return result
+
+        health.record_failure(latency)
+        metrics.ERRORS.labels(component='llm').inc()
+        if self._is_auth_error(str(error)):
+            # A bad key won't fix itself quickly; keep the provider out for longer
+            health.trip(settings.LLM_AUTH_FAILURE_OPEN_SECONDS)
+            if name == "groq":
                 self._groq_failed = True
-                self.use_groq = False
-                # Setup fallback if not already done
-                if not self.use_google and not self.api_key:
-                    self._setup_fallback()
-                # Retry with fallback
-                return self.generate_response(query, context, language)
+        logger.warning(f"LLM provider {name} failed after {latency:.2f}s")
+        return result
+
+    def generate_response(self, query: str, context: str, language: str = "en") -> Dict[str, Any]:
+        """Generate response from the fastest healthy provider, failing over to the others"""
+        with tracing.span('llm', context_chars=len(context)) as span:
+            result = self._generate_response(query, context, language)
+            if span:
+                span.set_attribute('provider', result.get('provider', 'local'))
+                span.set_attribute('model', result.get('model', 'unknown'))
             return result
-        # Try Google Gemini if available
-        if self.use_google and self.google_api_key and self.model:
-            return self._generate_google_response(query, context, language)
-        # Try OpenAI if available
-        if self.api_key:
-            return self._generate_openai_response(query, context, language)
-        # Fallback to simple response based on context
+
+    def _generate_response(self, query: str, context: str, language: str) -> Dict[str, Any]:
+        remaining = self._route()
+        failed = False
+        while remaining:
+            name = remaining.pop(0)
+            if not self.health[name].allow_request():
+                continue
+
+            if failed:
+                metrics.FALLBACKS.labels(kind='failover').inc()
+            if settings.LLM_HEDGING and remaining:
+                result = self._generate_hedged(name, remaining, query, context, language)
+            else:
+                result = self._attempt(name, query, context, language)
+            if not result.get('error'):
+                return result
+            failed = True
+
+        # No provider configured, or all of them failing: answer from the context locally
+        metrics.FALLBACKS.labels(kind='local').inc()
         return self._generate_simple_response(query, context, language)
 
+    def _hedge_delay(self, name: str) -> float:
+        delay = self.health[name].latency_percentile(settings.LLM_HEDGE_PERCENTILE, min_samples=HEDGE_MIN_SAMPLES)
+        return delay if delay is not None else settings.LLM_HEDGE_DEFAULT_DELAY_SECONDS
+
+    def _take_hedge_provider(self, remaining: List[str]) -> Optional[str]:
+        """Pick the provider to hedge with, within the hedge budget; None if hedging isn't possible"""
+        with self._hedge_lock:
+            recent = len(self._hedge_window)
+            if sum(self._hedge_window) >= settings.LLM_HEDGE_MAX_RATE * max(recent, 1):
+                self._hedge_stats['hedges_over_budget'] += 1
+                self._hedge_window.append(False)
+                return None
+
+        for name in remaining:
+            if self.health[name].allow_request():
+                remaining.remove(name)
+                with self._hedge_lock:
+                    self._hedge_stats['hedges_sent'] += 1
+                    self._hedge_window.append(True)
+                return name
+
+        with self._hedge_lock:
+            self._hedge_window.append(False)
+        return None
+
+    def _generate_hedged(self, primary: str, remaining: List[str], query: str, context: str,
+                         language: str) -> Dict[str, Any]:
+        """
+        Call primary; if it is slower than its usual latency, also call a backup provider.
+
+        The first successful answer wins. The losing call can't be interrupted
+        mid-request, so it is left to finish in the background (bounded by
+        LLM_TIMEOUT_SECONDS) and only its latency is kept, in its health window.
+        """
+        with self._hedge_lock:
+            if self._hedge_executor is None:
+                self._hedge_executor = ThreadPoolExecutor(max_workers=HEDGE_MAX_WORKERS, thread_name_prefix="llm-hedge")
+            self._hedge_stats['requests'] += 1
+
+        # Attempts run in the pool under a copy of the caller's context, so their spans join the request's trace
+        primary_future = self._hedge_executor.submit(contextvars.copy_context().run, self._attempt,
+                                                     primary, query, context, language)
+        try:
+            result = primary_future.result(timeout=self._hedge_delay(primary))
+            with self._hedge_lock:
+                self._hedge_window.append(False)
+            return result
+        except FutureTimeoutError:
+            pass
+
+        backup = self._take_hedge_provider(remaining)
+        if backup is None:
+            return primary_future.result()
+
+        logger.info(f"LLM provider {primary} is slow, hedging with {backup}")
+        backup_future = self._hedge_executor.submit(contextvars.copy_context().run, self._attempt,
+                                                    backup, query, context, language)
+        pending = {primary_future, backup_future}
+        result = None
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                result = future.result()
+                if not result.get('error'):
+                    for loser in pending:
+                        loser.cancel()
+                    if future is backup_future:
+                        with self._hedge_lock:
+                            self._hedge_stats['hedge_wins'] += 1
+                    return result
+        # Both failed
+        return result
+
     def _build_system_prompt(self) -> str:
         prompt = """You are an Industrial Training assistant for IT students.
 
@@ -167,7 +378,7 @@ Content rules:
             prompt = f"{system_prompt}\n\nContext:\n{context}\n\nQuestion: {query}\n\nAnswer:"
             
             # Generate response
-            response = self.model.generate_content(prompt)
+            response = self.model.generate_content(prompt, **self._gemini_call_options)
             response_text = response.text.strip()
             response_text = self._format_numbered(response_text)
             
@@ -200,7 +411,7 @@ Content rules:
             ]
             
             # Call OpenAI API
-            response = openai.chat.completions.create(
+            response = self.openai_client.chat.completions.create(
                 model="gpt-3.5-turbo",
                 messages=messages,
                 max_tokens=500,
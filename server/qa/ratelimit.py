@@ -0,0 +1,191 @@
+import math
+import sqlite3
+import threading
+import time
+import logging
+from collections import OrderedDict, deque
+from contextlib import contextmanager, closing
+from typing import Dict, Any, Optional
+
+logger = logging.getLogger(__name__)
+
+# Idle buckets are dropped once this many users are tracked in memory
+MAX_TRACKED_USERS = 10000
+
+
+def retry_after_header(seconds: float) -> str:
+    """Retry-After value in whole seconds (at least 1)"""
+    return str(max(1, math.ceil(seconds)))
+
+
+class RateLimitExceeded(Exception):
+    """Raised when a user must wait before sending another chat request"""
+
+    def __init__(self, retry_after: float, message: str = "Too many requests"):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+    @property
+    def retry_after_header(self) -> str:
+        return retry_after_header(self.retry_after)
+
+
+class TokenBucketLimiter:
+    """
+    Per-user token buckets.
+
+    Each user gets `burst` tokens, refilled at rate_per_minute; a request
+    takes one token. State is kept in memory, or in a SQLite file when
+    db_path is set so that several worker processes on one host share the
+    same budgets.
+    """
+
+    def __init__(self, rate_per_minute: float, burst: int, db_path: Optional[str] = None):
+        self.rate = rate_per_minute / 60.0
+        self.burst = burst
+        self.db_path = db_path
+        self._lock = threading.Lock()
+        self._buckets: Dict[str, tuple] = {}  # user -> (tokens, updated_at)
+        if db_path:
+            with closing(self._connect()) as conn:
+                conn.execute(
+                    "CREATE TABLE IF NOT EXISTS buckets (user_key TEXT PRIMARY KEY, tokens REAL, updated REAL)"
+                )
+
+    def _connect(self):
+        return sqlite3.connect(self.db_path, timeout=5, isolation_level=None)
+
+    def _take(self, tokens: float, updated: float, now: float):
+        """Refill then try to take one token; returns (new tokens, wait seconds)"""
+        tokens = min(self.burst, tokens + (now - updated) * self.rate)
+        if tokens >= 1:
+            return tokens - 1, 0.0
+        return tokens, (1 - tokens) / self.rate if self.rate > 0 else float('inf')
+
+    def acquire(self, user_key: str) -> float:
+        """
+        Take a token for user_key
+
+        Returns:
+            0.0 if the request may proceed, otherwise the seconds to wait
+        """
+        now = time.time()
+        if self.db_path:
+            return self._acquire_shared(user_key, now)
+
+        with self._lock:
+            tokens, updated = self._buckets.get(user_key, (self.burst, now))
+            tokens, wait = self._take(tokens, updated, now)
+            self._buckets[user_key] = (tokens, now)
+            if len(self._buckets) > MAX_TRACKED_USERS:
+                self._prune(now)
+        return wait
+
+    def _acquire_shared(self, user_key: str, now: float) -> float:
+        try:
+            with self._lock, closing(self._connect()) as conn:
+                # IMMEDIATE takes the write lock up front so read-modify-write is atomic across processes
+                conn.execute("BEGIN IMMEDIATE")
+                row = conn.execute("SELECT tokens, updated FROM buckets WHERE user_key = ?", (user_key,)).fetchone()
+                tokens, updated = row if row else (self.burst, now)
+                tokens, wait = self._take(tokens, updated, now)
+                conn.execute(
+                    "INSERT OR REPLACE INTO buckets (user_key, tokens, updated) VALUES (?, ?, ?)",
+                    (user_key, tokens, now)
+                )
+                conn.execute("COMMIT")
+            return wait
+        except sqlite3.Error as e:
+            # Never turn a limiter problem into an outage
+            logger.error(f"Rate limit store error, allowing request: {str(e)}")
+            return 0.0
+
+    def _prune(self, now: float):
+        """Drop buckets that have refilled completely (called with the lock held)"""
+        full_after = self.burst / self.rate if self.rate > 0 else float('inf')
+        for key in [k for k, (_, updated) in self._buckets.items() if now - updated >= full_after]:
+            del self._buckets[key]
+
+
+class FairScheduler:
+    """
+    Fair-share admission in front of the RAG pipeline.
+
+    At most max_concurrent requests run at once. When all slots are busy,
+    requests queue per user and freed slots are handed out round-robin
+    across users, so one user with many requests waits behind everyone
+    else's first request instead of taking every slot.
+    """
+
+    def __init__(self, max_concurrent: int, max_queued_per_user: int = 2, queue_timeout: float = 30.0):
+        self.max_concurrent = max_concurrent
+        self.max_queued_per_user = max_queued_per_user
+        self.queue_timeout = queue_timeout
+        self._lock = threading.Lock()
+        self._active = 0
+        self._queues: "OrderedDict[str, deque]" = OrderedDict()  # user -> waiting tickets
+        self.rejected = 0
+
+    @contextmanager
+    def slot(self, user_key: str):
+        """Hold a pipeline slot for the duration of the block
+
+        Raises:
+            RateLimitExceeded: If the user already has too many queued requests
+                or no slot freed up within queue_timeout
+        """
+        self._acquire(user_key)
+        try:
+            yield
+        finally:
+            self._release()
+
+    def _acquire(self, user_key: str):
+        with self._lock:
+            if self._active < self.max_concurrent and not self._queues:
+                self._active += 1
+                return
+            queue = self._queues.get(user_key)
+            if queue is not None and len(queue) >= self.max_queued_per_user:
+                self.rejected += 1
+                raise RateLimitExceeded(self.queue_timeout, "Too many requests queued")
+            ticket = threading.Event()
+            self._queues.setdefault(user_key, deque()).append(ticket)
+
+        if ticket.wait(self.queue_timeout):
+            return
+
+        with self._lock:
+            # The slot may have been granted just as the wait timed out
+            if ticket.is_set():
+                return
+            queue = self._queues.get(user_key)
+            if queue is not None:
+                queue.remove(ticket)
+                if not queue:
+                    del self._queues[user_key]
+            self.rejected += 1
+        raise RateLimitExceeded(self.queue_timeout, "Server is busy")
+
+    def _release(self):
+        with self._lock:
+            self._active -= 1
+            while self._active < self.max_concurrent and self._queues:
+                # Serve the user at the head of the rotation, then move them to the back
+                user_key, queue = next(iter(self._queues.items()))
+                ticket = queue.popleft()
+                if queue:
+                    self._queues.move_to_end(user_key)
+                else:
+                    del self._queues[user_key]
+                self._active += 1
+                ticket.set()
+
+    def get_stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                'active': self._active,
+                'queued': sum(len(q) for q in self._queues.values()),
+                'queued_users': len(self._queues),
+                'rejected': self.rejected
+            }
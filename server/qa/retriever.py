@@ -1,7 +1,8 @@
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Optional
 import logging
 from difflib import SequenceMatcher
 from ..ingest.indexer import DocumentIndexer
+from .. import metrics, tracing
 
 logger = logging.getLogger(__name__)
 
@@ -9,11 +10,16 @@ class DocumentRetriever:
     def __init__(self, indexer: DocumentIndexer):
         self.indexer = indexer
     
-    def retrieve_relevant_chunks(self, query: str, k: int = 5) -> List[Dict[str, Any]]:
-        """Retrieve relevant document chunks for a query"""
+    def retrieve_relevant_chunks(self, query: str, k: int = 5, filters: Optional[Dict[str, Any]] = None) -> List[Dict[str, Any]]:
+        """Retrieve relevant document chunks for a query, optionally restricted by metadata filters"""
+        with tracing.span('retrieval', k=k):
+            return self._retrieve_relevant_chunks(query, k, filters)
+    
+    def _retrieve_relevant_chunks(self, query: str, k: int, filters: Optional[Dict[str, Any]]) -> List[Dict[str, Any]]:
         try:
             # Get more results to have better selection
-            results = self.indexer.search_documents(query, k=k*4)  # Get 4x more results for better coverage
+            # Filters are applied inside FAISS, so the 4x is only headroom for dedup
+            results = self.indexer.search_documents(query, k=k*4, filters=filters)  # Get 4x more results for better coverage
             
             # Log the actual scores for debugging
             if results:
@@ -24,62 +30,93 @@ class DocumentRetriever:
                     first_result = results[0]
                     logger.info(f"First result text: {first_result.get('text', '')[:100]}...")
             
-            # More lenient filtering - lower threshold and better duplicate handling
-            filtered_results = []
-            seen_texts = set()
-            
-            for result in results:
-                score = result.get('score', 0)
-                text = result.get('text', '').strip()
-                
-                # Much lower threshold - accept more results
-                if score > 0.001 and text:  # Very low threshold
-                    # Better duplicate detection - check for substantial similarity
-                    is_duplicate = False
-                    for seen_text in seen_texts:
-                        # Check if texts are too similar (more than 80% overlap)
-                        if self._text_similarity(text, seen_text) > 0.8:
-                            is_duplicate = True
-                            break
-                    
-                    if not is_duplicate:
-                        seen_texts.add(text)
-                        filtered_results.append(result)
-                        
-                        # Stop when we have enough unique results
-                        if len(filtered_results) >= k:
-                            break
-            
-            # If we still don't have enough results, lower the threshold even more
-            if len(filtered_results) < k and results:
-                for result in results:
-                    if result not in filtered_results:
-                        text = result.get('text', '').strip()
-                        if text:  # Accept any text content
-                            filtered_results.append(result)
-                            if len(filtered_results) >= k:
-                                break
+            with tracing.span('dedup', candidates=len(results)), metrics.time_stage('dedup'):
+                filtered_results = self._select_results(results, k)
             
             logger.info(f"Retrieved {len(filtered_results)} relevant chunks for query: {query[:50]}...")
             return filtered_results
             
         except Exception as e:
             logger.error(f"Retrieval error: {str(e)}")
+            metrics.ERRORS.labels(component='retrieval').inc()
             return []
     
+    def retrieve_relevant_chunks_batch(self, queries: List[str], k: int = 5,
+                                       filters: Optional[Dict[str, Any]] = None) -> List[List[Dict[str, Any]]]:
+        """Retrieve relevant document chunks for many queries with one embedding and search call"""
+        try:
+            with tracing.span('search', queries=len(queries)):
+                results_per_query = self.indexer.search_batch(queries, k=k*4, filters=filters)
+            with tracing.span('dedup'), metrics.time_stage('dedup'):
+                batch_chunks = [self._select_results(results, k) for results in results_per_query]
+            logger.info(f"Retrieved chunks for {len(queries)} queries in one batch")
+            return batch_chunks
+            
+        except Exception as e:
+            logger.error(f"Batch retrieval error: {str(e)}")
+            metrics.ERRORS.labels(component='retrieval').inc()
+            return [[] for _ in queries]
+    
+    def merge_chunks(self, chunks: List[Dict[str, Any]], prior_chunks: List[Dict[str, Any]], k: int) -> List[Dict[str, Any]]:
+        """Combine fresh chunks with ones reused from an earlier turn, dropping duplicates"""
+        metrics.CACHE_HITS.labels(cache='session_context').inc()
+        with tracing.span('dedup', reused=len(prior_chunks)), metrics.time_stage('dedup'):
+            return self._select_results(chunks + prior_chunks, k)
+    
+    def _select_results(self, results: List[Dict[str, Any]], k: int) -> List[Dict[str, Any]]:
+        """Drop near-duplicate and empty results, keeping at most k"""
+        # More lenient filtering - lower threshold and better duplicate handling
+        filtered_results = []
+        seen_texts = set()
+        
+        for result in results:
+            score = result.get('score', 0)
+            text = result.get('text', '').strip()
+            
+            # Much lower threshold - accept more results
+            if score > 0.001 and text:  # Very low threshold
+                # Better duplicate detection - check for substantial similarity
+                is_duplicate = False
+                for seen_text in seen_texts:
+                    # Check if texts are too similar (more than 80% overlap)
+                    if self._text_similarity(text, seen_text) > 0.8:
+                        is_duplicate = True
+                        break
+                
+                if not is_duplicate:
+                    seen_texts.add(text)
+                    filtered_results.append(result)
+                    
+                    # Stop when we have enough unique results
+                    if len(filtered_results) >= k:
+                        break
+        
+        # If we still don't have enough results, lower the threshold even more
+        if len(filtered_results) < k and results:
+            for result in results:
+                if result not in filtered_results:
+                    text = result.get('text', '').strip()
+                    if text:  # Accept any text content
+                        filtered_results.append(result)
+                        if len(filtered_results) >= k:
+                            break
+        
+        return filtered_results
+    
     def format_context(self, chunks: List[Dict[str, Any]]) -> str:
         """Format retrieved chunks into context for LLM"""
         if not chunks:
             return ""
         
-        context_parts = []
-        for chunk in chunks:
-            text = chunk.get('text', '').strip()
+        with tracing.span('context_build', chunks=len(chunks)), metrics.time_stage('context_build'):
+            context_parts = []
+            for chunk in chunks:
+                text = chunk.get('text', '').strip()
+                
+                if text:
+                    context_parts.append(text)
             
-            if text:
-                context_parts.append(text)
-        
-        return "\n\n".join(context_parts)
+            return "\n\n".join(context_parts)
     
     def _text_similarity(self, text1: str, text2: str) -> float:
         """Calculate similarity between two texts"""
@@ -0,0 +1,114 @@
+import re
+import threading
+import time
+import logging
+from collections import OrderedDict, deque
+from typing import List, Dict, Any, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Pronouns and connectives that make a message depend on the previous turn
+FOLLOW_UP_PATTERN = re.compile(
+    r"^(and|also|what about|how about|then|so)\b|\b(it|its|it's|that|this|those|these|they|them|there|same)\b",
+    re.IGNORECASE
+)
+# Longer messages are treated as self-contained even if they contain a pronoun
+FOLLOW_UP_MAX_WORDS = 10
+# Words a follow-up may consist of besides its pronoun or connective: question
+# words, auxiliaries and the generic things one asks about a topic. Any other
+# word means the message names its own topic and is searched as it is.
+FOLLOW_UP_FILLER = {
+    'and', 'also', 'what', 'about', 'how', 'then', 'so', 'it', 'its', "it's", 'that', "that's", 'this',
+    'those', 'these', 'they', 'them', 'there', 'same', 'the', 'a', 'an', 'is', 'are', 'was', 'were', 'be',
+    'do', 'does', 'did', 'can', 'could', 'should', 'will', 'would', 'must', 'i', 'we', 'you', 'me', 'us',
+    'my', 'our', 'to', 'for', 'of', 'in', 'on', 'at', 'by', 'with', 'from', 'when', 'where', 'which',
+    'who', 'why', "what's", 'whats', 'long', 'many', 'much', 'due', 'deadline', 'date', 'time', 'required',
+    'need', 'needed', 'mean', 'means', 'again', 'too', 'one', 'ones', 'else', 'more', 'please', 'explain',
+}
+
+
+class Turn:
+    def __init__(self, question: str, query: str, chunks: List[Dict[str, Any]], generation: str):
+        self.question = question
+        self.query = query  # The (possibly rewritten) query that was retrieved for
+        self.chunks = chunks
+        self.generation = generation
+
+
+class SessionStore:
+    """
+    Recent chat turns per session, bounded by an LRU size limit and a TTL.
+
+    Each turn keeps the question and the chunks retrieved for it, so a
+    follow-up can reuse that context and only run a small extra search.
+    """
+
+    def __init__(self, max_sessions: int = 1000, ttl_seconds: float = 1800, max_turns: int = 3):
+        self.max_sessions = max_sessions
+        self.ttl_seconds = ttl_seconds
+        self.max_turns = max_turns
+        self._lock = threading.Lock()
+        self._sessions: "OrderedDict[str, Tuple[float, deque]]" = OrderedDict()  # id -> (last used, turns)
+
+    def last_turn(self, session_id: Optional[str]) -> Optional[Turn]:
+        """Most recent turn of a live session, or None"""
+        if not session_id:
+            return None
+        with self._lock:
+            entry = self._sessions.get(session_id)
+            if entry is None:
+                return None
+            updated, turns = entry
+            if time.monotonic() - updated > self.ttl_seconds:
+                del self._sessions[session_id]
+                return None
+            return turns[-1] if turns else None
+
+    def record_turn(self, session_id: Optional[str], turn: Turn):
+        if not session_id:
+            return
+        now = time.monotonic()
+        with self._lock:
+            entry = self._sessions.pop(session_id, None)
+            turns = entry[1] if entry else deque(maxlen=self.max_turns)
+            turns.append(turn)
+            self._sessions[session_id] = (now, turns)
+            # Evict least recently used sessions beyond the limit
+            while len(self._sessions) > self.max_sessions:
+                self._sessions.popitem(last=False)
+
+    def get_stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {'sessions': len(self._sessions)}
+
+
+def is_follow_up(text: str) -> bool:
+    """Whether a message reads as a continuation of the previous turn
+
+    It must start with a connective or contain a pronoun, and have no
+    content words of its own: "when is it due?" is a follow-up, "what is
+    this logbook for?" is a new question.
+    """
+    if len(text.split()) > FOLLOW_UP_MAX_WORDS or not FOLLOW_UP_PATTERN.search(text):
+        return False
+    words = re.findall(r"[a-z0-9']+", text.lower().replace('\u2019', "'"))
+    return all(word.strip("'") in FOLLOW_UP_FILLER for word in words)
+
+
+def resolve_follow_up(text: str, previous: Optional[Turn], generation: str) -> Tuple[str, List[Dict[str, Any]]]:
+    """
+    Work out what to retrieve for a message given the previous turn
+
+    Returns:
+        (query, prior_chunks): the query to search with, rewritten to carry
+        the previous question's topic when the message is a follow-up, and
+        the previous turn's chunks to reuse (empty when the message stands
+        alone or the index has changed since)
+    """
+    if previous is None or not is_follow_up(text):
+        return text, []
+    # Chain from the previous retrieval query so a run of follow-ups keeps the topic
+    query = f"{' '.join(previous.query.split()[-30:])} {text}"
+    prior_chunks = previous.chunks if previous.generation == generation else []
+    logger.info(f"Follow-up detected, retrieving for: {query[:80]}")
+    return query, prior_chunks
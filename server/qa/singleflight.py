@@ -0,0 +1,92 @@
+import re
+import threading
+import logging
+from typing import Any, Callable, Dict, Hashable, Tuple, Type
+from .. import metrics
+
+logger = logging.getLogger(__name__)
+
+
+def normalize_question(text: str) -> str:
+    """Normalize a question so trivially different phrasings share one key
+
+    Lowercases, collapses whitespace and drops trailing punctuation, so
+    "When is the deadline?" and "when is the  deadline" coalesce.
+    """
+    text = re.sub(r'\s+', ' ', (text or '').strip().lower())
+    return text.rstrip(' ?!.')
+
+
+class _Call:
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+        self.waiters = 0
+
+
+class SingleFlight:
+    """
+    Coalesce concurrent calls with the same key into one execution.
+
+    The first caller for a key runs the function; callers arriving while it
+    is running wait for it and receive the same result (or exception).
+    Nothing is cached once the call has finished.
+
+    Exceptions of the types in unshared_errors concern only the caller that
+    ran the function (e.g. its own admission being rejected), so waiters
+    don't receive them; they try again and one of them runs the call.
+    """
+
+    def __init__(self, name: str = "singleflight", unshared_errors: Tuple[Type[BaseException], ...] = ()):
+        self.name = name  # Label for the rag_cache_hits_total counter
+        self.unshared_errors = unshared_errors
+        self._lock = threading.Lock()
+        self._calls: Dict[Hashable, _Call] = {}
+        self.executions = 0
+        self.coalesced = 0
+
+    def do(self, key: Hashable, fn: Callable[[], Any]) -> Any:
+        """Run fn for key, or wait for the identical call already in flight"""
+        while True:
+            with self._lock:
+                call = self._calls.get(key)
+                if call is not None:
+                    call.waiters += 1
+                    self.coalesced += 1
+                    leader = False
+                else:
+                    call = _Call()
+                    self._calls[key] = call
+                    self.executions += 1
+                    leader = True
+
+            if leader:
+                break
+            metrics.CACHE_HITS.labels(cache=self.name).inc()
+            call.done.wait()
+            if call.error is None:
+                return call.result
+            if not isinstance(call.error, self.unshared_errors):
+                raise call.error
+
+        try:
+            call.result = fn()
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            if call.waiters:
+                logger.info(f"Shared one result with {call.waiters} identical in-flight request(s)")
+            call.done.set()
+        return call.result
+
+    def get_stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {
+                'executions': self.executions,
+                'coalesced': self.coalesced,
+                'in_flight': len(self._calls)
+            }
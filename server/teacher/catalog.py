@@ -0,0 +1,264 @@
+"""
+Persistent catalog of the PDF collections.
+
+A SQLite table with one row per PDF, combining the file's size and mtime
+with its metadata (uploader, upload time, statuses), so listings are one
+indexed query with server-side pagination, sorting and filtering instead
+of a directory glob plus a stat per file on every request.
+
+PDFManager updates rows on upload and delete, PDFMetadataManager on
+metadata and status changes. Files added or removed behind the app's
+back are picked up by reconcile(), which is throttled and skips
+directories whose mtime hasn't changed since the last pass.
+"""
+
+import os
+import sqlite3
+import threading
+import time
+import logging
+from contextlib import closing
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, Any, Optional, Iterable
+
+from ..config import settings
+
+logger = logging.getLogger(__name__)
+
+SORT_COLUMNS = ('file_name', 'file_size', 'upload_time', 'modified_time', 'uploaded_by', 'status')
+MAX_PAGE_SIZE = 500
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS pdf_files (
+    pdf_type TEXT NOT NULL,
+    file_name TEXT NOT NULL,
+    file_size INTEGER,
+    modified_time REAL,
+    upload_time TEXT,
+    uploaded_by TEXT,
+    upload_status TEXT,
+    rebuild_status TEXT,
+    delete_status TEXT,
+    status TEXT,
+    last_action TEXT,
+    content_hash TEXT,
+    PRIMARY KEY (pdf_type, file_name)
+);
+CREATE INDEX IF NOT EXISTS pdf_files_upload_time ON pdf_files (pdf_type, upload_time);
+CREATE INDEX IF NOT EXISTS pdf_files_uploaded_by ON pdf_files (pdf_type, uploaded_by);
+CREATE INDEX IF NOT EXISTS pdf_files_status ON pdf_files (pdf_type, status);
+CREATE TABLE IF NOT EXISTS reconcile_state (
+    pdf_type TEXT PRIMARY KEY,
+    dir_mtime_ns INTEGER
+);
+"""
+
+
+def status_fields(meta: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+    """Statuses of a file from its metadata; the most recent operation wins (delete > rebuild > upload)"""
+    meta = meta or {}
+    fields = {
+        'upload_status': meta.get('upload_status'),
+        'rebuild_status': meta.get('rebuild_status'),
+        'delete_status': meta.get('delete_status'),
+    }
+    fields['status'] = fields['delete_status'] or fields['rebuild_status'] or fields['upload_status'] or "pending"
+    if fields['delete_status']:
+        fields['last_action'] = "delete"
+    elif fields['rebuild_status']:
+        fields['last_action'] = "rebuild"
+    elif fields['upload_status']:
+        fields['last_action'] = "upload"
+    else:
+        fields['last_action'] = "none"
+    return fields
+
+
+class PDFCatalog:
+    """SQLite-backed index of PDF files and their metadata"""
+
+    def __init__(self, db_path: str, reconcile_interval: float = 30.0):
+        self.db_path = db_path
+        self.reconcile_interval = reconcile_interval
+        self._last_reconcile: Dict[str, float] = {}
+        self._reconcile_lock = threading.Lock()
+        Path(db_path).parent.mkdir(parents=True, exist_ok=True)
+        with closing(self._connect()) as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.executescript(SCHEMA)
+
+    def _connect(self):
+        conn = sqlite3.connect(self.db_path, timeout=10)
+        conn.row_factory = sqlite3.Row
+        return conn
+
+    def record_file(self, pdf_type: str, file_name: str, file_size: int, modified_time: float,
+                    content_hash: Optional[str] = None):
+        """Insert or refresh the file-system fields of a row (e.g. after an upload)"""
+        with closing(self._connect()) as conn, conn:
+            conn.execute(
+                """INSERT INTO pdf_files (pdf_type, file_name, file_size, modified_time, upload_time, status, last_action, content_hash)
+                   VALUES (?, ?, ?, ?, ?, 'pending', 'none', ?)
+                   ON CONFLICT (pdf_type, file_name) DO UPDATE SET
+                       file_size = excluded.file_size,
+                       modified_time = excluded.modified_time,
+                       content_hash = excluded.content_hash""",
+                (pdf_type, file_name, file_size, modified_time,
+                 datetime.fromtimestamp(modified_time).isoformat(), content_hash)
+            )
+
+    def remove_file(self, pdf_type: str, file_name: str):
+        with closing(self._connect()) as conn, conn:
+            conn.execute("DELETE FROM pdf_files WHERE pdf_type = ? AND file_name = ?", (pdf_type, file_name))
+
+    def update_metadata(self, pdf_type: str, file_name: str, meta: Optional[Dict[str, Any]]):
+        """Copy a file's metadata (uploader, upload time, statuses) into its row; None clears it"""
+        fields = status_fields(meta)
+        with closing(self._connect()) as conn, conn:
+            conn.execute(
+                """UPDATE pdf_files SET
+                       uploaded_by = ?,
+                       upload_time = COALESCE(?, upload_time),
+                       upload_status = ?, rebuild_status = ?, delete_status = ?, status = ?, last_action = ?,
+                       content_hash = COALESCE(?, content_hash)
+                   WHERE pdf_type = ? AND file_name = ?""",
+                ((meta or {}).get('uploaded_by'), (meta or {}).get('upload_time'),
+                 fields['upload_status'], fields['rebuild_status'], fields['delete_status'],
+                 fields['status'], fields['last_action'], (meta or {}).get('content_hash'),
+                 pdf_type, file_name)
+            )
+
+    def reconcile(self, pdf_type: str, directory: Path, metadata_items: Iterable[Dict[str, Any]],
+                  force: bool = False) -> bool:
+        """
+        Bring the catalog in line with the directory
+
+        Runs at most once per reconcile_interval per PDF type (unless forced),
+        and only scans the directory when its mtime has changed, which
+        happens whenever a file is created, deleted or renamed in it.
+
+        Returns:
+            True if the directory was scanned
+        """
+        now = time.monotonic()
+        with self._reconcile_lock:
+            if not force and now - self._last_reconcile.get(pdf_type, float('-inf')) < self.reconcile_interval:
+                return False
+            self._last_reconcile[pdf_type] = now
+
+        try:
+            dir_mtime_ns = directory.stat().st_mtime_ns
+        except OSError:
+            return False
+        with closing(self._connect()) as conn:
+            row = conn.execute("SELECT dir_mtime_ns FROM reconcile_state WHERE pdf_type = ?", (pdf_type,)).fetchone()
+            if row and row['dir_mtime_ns'] == dir_mtime_ns and not force:
+                return False
+
+            on_disk = {}
+            with os.scandir(directory) as entries:
+                for entry in entries:
+                    if entry.is_file() and entry.name.lower().endswith('.pdf'):
+                        stat = entry.stat()
+                        on_disk[entry.name] = (stat.st_size, stat.st_mtime)
+            cataloged = {
+                r['file_name']: (r['file_size'], r['modified_time'])
+                for r in conn.execute("SELECT file_name, file_size, modified_time FROM pdf_files WHERE pdf_type = ?", (pdf_type,))
+            }
+            metadata = {item['file_name']: item for item in metadata_items if 'file_name' in item}
+
+            removed = [name for name in cataloged if name not in on_disk]
+            changed = [name for name, info in on_disk.items() if cataloged.get(name) != info]
+            with conn:
+                conn.executemany("DELETE FROM pdf_files WHERE pdf_type = ? AND file_name = ?",
+                                 [(pdf_type, name) for name in removed])
+                conn.execute("INSERT OR REPLACE INTO reconcile_state (pdf_type, dir_mtime_ns) VALUES (?, ?)",
+                             (pdf_type, dir_mtime_ns))
+
+        for name in changed:
+            size, mtime = on_disk[name]
+            # Content changed (or is new), so any known hash is stale
+            self.record_file(pdf_type, name, size, mtime, content_hash=None)
+            if name not in cataloged:
+                self.update_metadata(pdf_type, name, metadata.get(name))
+        if removed or changed:
+            logger.info(f"Catalog reconciled for {pdf_type}: {len(changed)} added/changed, {len(removed)} removed")
+        return True
+
+    def query(self, pdf_type: str, page: int = 1, page_size: int = 50, sort: str = 'upload_time',
+              descending: bool = True, uploaded_by: Optional[str] = None, exclude_uploaded_by: Optional[str] = None,
+              status: Optional[str] = None, uploaded_after: Optional[str] = None,
+              uploaded_before: Optional[str] = None, name_contains: Optional[str] = None) -> Dict[str, Any]:
+        """
+        One page of a PDF type's files
+
+        Args:
+            page: 1-based page number
+            page_size: Rows per page (at most MAX_PAGE_SIZE)
+            sort: One of SORT_COLUMNS
+            uploaded_by / exclude_uploaded_by: Only / all but this uploader;
+                excluding also drops files without a known uploader
+            status: success, failed or pending
+            uploaded_after / uploaded_before: ISO dates or datetimes (inclusive / exclusive)
+            name_contains: Case-insensitive substring of the file name
+
+        Returns:
+            {'files': [...], 'total': matching rows, 'page': ..., 'page_size': ...}
+        """
+        if sort not in SORT_COLUMNS:
+            raise ValueError(f"Invalid sort: {sort}. Must be one of: {', '.join(SORT_COLUMNS)}")
+        page = max(1, int(page))
+        page_size = max(1, min(int(page_size), MAX_PAGE_SIZE))
+
+        clauses, params = ["pdf_type = ?"], [pdf_type]
+        if uploaded_by:
+            clauses.append("uploaded_by = ?")
+            params.append(uploaded_by)
+        if exclude_uploaded_by:
+            clauses.append("uploaded_by IS NOT NULL AND uploaded_by != ?")
+            params.append(exclude_uploaded_by)
+        if status:
+            clauses.append("status = ?")
+            params.append(status)
+        if uploaded_after:
+            clauses.append("upload_time >= ?")
+            params.append(uploaded_after)
+        if uploaded_before:
+            clauses.append("upload_time < ?")
+            params.append(uploaded_before)
+        if name_contains:
+            clauses.append("file_name LIKE ? ESCAPE '\\'")
+            escaped = name_contains.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_')
+            params.append(f"%{escaped}%")
+        where = " AND ".join(clauses)
+        # file_name breaks ties so pages are stable
+        order = f"{sort} {'DESC' if descending else 'ASC'}, file_name ASC"
+
+        with closing(self._connect()) as conn:
+            total = conn.execute(f"SELECT COUNT(*) FROM pdf_files WHERE {where}", params).fetchone()[0]
+            rows = conn.execute(
+                f"SELECT * FROM pdf_files WHERE {where} ORDER BY {order} LIMIT ? OFFSET ?",
+                params + [page_size, (page - 1) * page_size]
+            ).fetchall()
+
+        files = []
+        for row in rows:
+            item = dict(row)
+            del item['pdf_type']
+            item['modified_time'] = datetime.fromtimestamp(item['modified_time']).isoformat() if item['modified_time'] else None
+            files.append(item)
+        return {'files': files, 'total': total, 'page': page, 'page_size': page_size}
+
+
+_catalog = None
+_catalog_lock = threading.Lock()
+
+
+def get_catalog() -> PDFCatalog:
+    """The process-wide catalog (the SQLite file itself is shared by all processes)"""
+    global _catalog
+    with _catalog_lock:
+        if _catalog is None:
+            _catalog = PDFCatalog(settings.CATALOG_DB_PATH, settings.CATALOG_RECONCILE_INTERVAL_SECONDS)
+        return _catalog
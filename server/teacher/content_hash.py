@@ -0,0 +1,63 @@
+"""
+SHA-256 content hashes of files, cached until the file changes.
+
+Used for ETags on file downloads and as the cache key for rendered
+previews. Uploads record the hash computed while streaming, so those files
+are never re-read just to hash them.
+"""
+
+import hashlib
+import os
+import threading
+from collections import OrderedDict
+from pathlib import Path
+from typing import Optional, Tuple
+
+HASH_CHUNK_BYTES = 1024 * 1024
+MAX_CACHED_HASHES = 4096
+
+
+class ContentHashCache:
+    """SHA-256 of files, cached until the file changes"""
+
+    def __init__(self, max_entries: int = MAX_CACHED_HASHES):
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._hashes: "OrderedDict[str, Tuple[tuple, str]]" = OrderedDict()  # path -> (file key, hash)
+
+    @staticmethod
+    def _file_key(stat: os.stat_result) -> tuple:
+        return (stat.st_ino, stat.st_size, stat.st_mtime_ns)
+
+    def get(self, path: Path, stat: Optional[os.stat_result] = None) -> str:
+        stat = stat or path.stat()
+        key = self._file_key(stat)
+        with self._lock:
+            cached = self._hashes.get(str(path))
+            if cached and cached[0] == key:
+                self._hashes.move_to_end(str(path))
+                return cached[1]
+
+        digest = hashlib.sha256()
+        with open(path, 'rb') as f:
+            for chunk in iter(lambda: f.read(HASH_CHUNK_BYTES), b''):
+                digest.update(chunk)
+        self._store(str(path), key, digest.hexdigest())
+        return digest.hexdigest()
+
+    def remember(self, path: Path, content_hash: str):
+        """Record a hash already computed elsewhere (e.g. while streaming an upload)"""
+        try:
+            self._store(str(path), self._file_key(path.stat()), content_hash)
+        except OSError:
+            pass
+
+    def _store(self, path: str, key: tuple, content_hash: str):
+        with self._lock:
+            self._hashes[path] = (key, content_hash)
+            self._hashes.move_to_end(path)
+            while len(self._hashes) > self.max_entries:
+                self._hashes.popitem(last=False)
+
+
+content_hashes = ContentHashCache()
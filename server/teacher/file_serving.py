@@ -0,0 +1,121 @@
+"""
+Conditional and partial file responses.
+
+Files are served with a strong ETag derived from their SHA-256, so
+If-None-Match revalidations are answered with 304, and single byte ranges
+are answered with 206, which lets PDF viewers show the first page of a
+large file before the rest has arrived. Hashes come from the shared
+ContentHashCache, so a file is only read in full once per change.
+"""
+
+from email.utils import formatdate, parsedate_to_datetime
+from pathlib import Path
+from typing import Optional, Tuple
+from urllib.parse import quote
+
+from fastapi import Request
+from fastapi.responses import FileResponse, Response, StreamingResponse
+
+from .content_hash import content_hashes
+
+STREAM_CHUNK_BYTES = 64 * 1024
+
+
+def _etag_matches(header: str, etag: str) -> bool:
+    """If-None-Match comparison (weak comparison, as RFC 9110 requires for it)"""
+    if header.strip() == '*':
+        return True
+    return any(tag.strip().removeprefix('W/') == etag for tag in header.split(','))
+
+
+def _not_modified_since(header: str, mtime: float) -> bool:
+    try:
+        return int(mtime) <= parsedate_to_datetime(header).timestamp()
+    except (TypeError, ValueError):
+        return False
+
+
+def _parse_range(header: str, size: int) -> Optional[Tuple[int, int]]:
+    """
+    Parse a single 'bytes=start-end' range
+
+    Returns:
+        (start, end) inclusive, None to ignore the header (malformed or
+        multiple ranges: the full file is sent), or (-1, -1) if unsatisfiable
+    """
+    unit, _, spec = header.partition('=')
+    if unit.strip().lower() != 'bytes' or ',' in spec:
+        return None
+    start_text, _, end_text = spec.strip().partition('-')
+    try:
+        if not start_text:
+            # Suffix range: the last N bytes
+            length = int(end_text)
+            if length <= 0 or size == 0:
+                return (-1, -1)
+            return (max(size - length, 0), size - 1)
+        start = int(start_text)
+        end = int(end_text) if end_text else size - 1
+    except ValueError:
+        return None
+    if start >= size:
+        return (-1, -1)
+    if start > end:
+        return None
+    return (start, min(end, size - 1))
+
+
+def _read_range(path: Path, start: int, end: int):
+    with open(path, 'rb') as f:
+        f.seek(start)
+        remaining = end - start + 1
+        while remaining > 0:
+            chunk = f.read(min(STREAM_CHUNK_BYTES, remaining))
+            if not chunk:
+                break
+            remaining -= len(chunk)
+            yield chunk
+
+
+def conditional_file_response(request: Request, path: Path, media_type: str, filename: Optional[str] = None) -> Response:
+    """Serve a file with ETag/Last-Modified validation and byte-range support
+
+    With a filename the file is sent as an attachment, otherwise inline.
+    """
+    stat = path.stat()
+    etag = f'"{content_hashes.get(path, stat)}"'
+    headers = {
+        'ETag': etag,
+        'Last-Modified': formatdate(stat.st_mtime, usegmt=True),
+        'Accept-Ranges': 'bytes',
+        # Files can be replaced under the same name, so always revalidate (cheap with the ETag)
+        'Cache-Control': 'private, no-cache',
+    }
+
+    if_none_match = request.headers.get('if-none-match')
+    if if_none_match is not None:
+        if _etag_matches(if_none_match, etag):
+            return Response(status_code=304, headers=headers)
+    elif request.headers.get('if-modified-since') and _not_modified_since(request.headers['if-modified-since'], stat.st_mtime):
+        return Response(status_code=304, headers=headers)
+
+    range_header = request.headers.get('range')
+    # If-Range: only honour the range if the client's copy is still current
+    if_range = request.headers.get('if-range')
+    if range_header and if_range and if_range.strip() != etag:
+        range_header = None
+    byte_range = _parse_range(range_header, stat.st_size) if range_header else None
+
+    if byte_range == (-1, -1):
+        return Response(status_code=416, headers={**headers, 'Content-Range': f'bytes */{stat.st_size}'})
+    if byte_range is None:
+        return FileResponse(path=str(path), filename=filename, media_type=media_type, headers=headers, stat_result=stat)
+
+    start, end = byte_range
+    headers.update({
+        'Content-Range': f'bytes {start}-{end}/{stat.st_size}',
+        'Content-Length': str(end - start + 1),
+    })
+    if filename:
+        headers['Content-Disposition'] = f"attachment; filename*=utf-8''{quote(filename)}"
+    return StreamingResponse(_read_range(path, start, end), status_code=206, media_type=media_type, headers=headers)
@@ -5,12 +5,15 @@ Supports three types: chatbot, submission, notification
 
 import os
 import shutil
+import time
 from pathlib import Path
 from typing import List, Dict, Any, Optional
 import logging
 from datetime import datetime
 
 from ..config import settings
+from .uploads import PDFUploadWriter, UploadRejected, SPOOL_SUFFIX
+from .catalog import get_catalog
 
 logger = logging.getLogger(__name__)
 
@@ -27,6 +30,23 @@ class PDFManager:
         self.pdf_chatbot_dir.mkdir(parents=True, exist_ok=True)
         self.pdf_submission_dir.mkdir(parents=True, exist_ok=True)
         self.pdf_notification_dir.mkdir(parents=True, exist_ok=True)
+        
+        # Uploads are streamed here first; same filesystem as the PDF folders, so the final rename is atomic
+        self.spool_dir = Path(settings.DATA_FOLDER) / "uploads_tmp"
+        self.spool_dir.mkdir(parents=True, exist_ok=True)
+        self._remove_stale_uploads()
+        
+        self.catalog = get_catalog()
+    
+    def _remove_stale_uploads(self, max_age_seconds: float = 3600):
+        """Delete temporary files left behind by uploads interrupted by a crash"""
+        cutoff = time.time() - max_age_seconds
+        for part_path in self.spool_dir.glob(f"*{SPOOL_SUFFIX}"):
+            try:
+                if part_path.stat().st_mtime < cutoff:
+                    part_path.unlink()
+            except OSError:
+                pass
     
     def get_directory(self, pdf_type: str) -> Path:
         """Get directory path for PDF type"""
@@ -41,6 +61,10 @@ class PDFManager:
         
         return type_map[pdf_type]
     
+    def new_upload(self) -> PDFUploadWriter:
+        """Start a streamed upload; write chunks to it, then pass it to commit_upload"""
+        return PDFUploadWriter(str(self.spool_dir), settings.MAX_UPLOAD_BYTES)
+    
     def upload_pdf(self, file_content: bytes, filename: str, pdf_type: str, uploaded_by: str = "teacher") -> Dict[str, Any]:
         """
         Upload a PDF file to the specified directory
@@ -54,6 +78,44 @@ class PDFManager:
         Returns:
             Dictionary with file information
         """
+        try:
+            upload = self.new_upload()
+        except Exception as e:
+            logger.error(f"Error uploading PDF: {str(e)}")
+            return {
+                "success": False,
+                "error": str(e)
+            }
+        
+        try:
+            chunk_size = settings.UPLOAD_CHUNK_BYTES
+            for start in range(0, len(file_content), chunk_size):
+                upload.write(file_content[start:start + chunk_size])
+        except UploadRejected as e:
+            upload.discard()
+            return {
+                "success": False,
+                "error": str(e)
+            }
+        
+        return self.commit_upload(upload, filename, pdf_type, uploaded_by)
+    
+    def commit_upload(self, upload: PDFUploadWriter, filename: str, pdf_type: str, uploaded_by: str = "teacher") -> Dict[str, Any]:
+        """
+        Move a streamed upload into the specified directory
+        
+        The file is renamed into place atomically, so nothing ever sees a
+        partly written PDF. The temporary file is removed if this fails.
+        
+        Args:
+            upload: Upload with all chunks written
+            filename: Original filename
+            pdf_type: Type of PDF (chatbot, submission, notification)
+            uploaded_by: User ID who uploaded the file
+            
+        Returns:
+            Dictionary with file information, including the content hash
+        """
         try:
             # Validate file type
             if not filename.lower().endswith('.pdf'):
@@ -80,12 +142,14 @@ class PDFManager:
                 file_path = target_dir / safe_filename
             
             # Save file
-            with open(file_path, 'wb') as f:
-                f.write(file_content)
+            content_hash = upload.finish()
+            os.chmod(upload.path, 0o644)
+            os.replace(upload.path, file_path)
             
             # Get file info
-            file_size = os.path.getsize(file_path)
+            file_size = upload.size
             upload_time = datetime.now().isoformat()
+            self._catalog_record(pdf_type, file_path, content_hash)
             
             logger.info(f"Uploaded PDF: {safe_filename} to {pdf_type} directory")
             
@@ -96,10 +160,12 @@ class PDFManager:
                 "file_size": file_size,
                 "upload_time": upload_time,
                 "pdf_type": pdf_type,
-                "uploaded_by": uploaded_by
+                "uploaded_by": uploaded_by,
+                "content_hash": content_hash
             }
             
         except Exception as e:
+            upload.discard()
             logger.error(f"Error uploading PDF: {str(e)}")
             return {
                 "success": False,
@@ -132,6 +198,7 @@ class PDFManager:
             
             # Delete file
             file_path.unlink()
+            self._catalog_remove(pdf_type, safe_filename)
             
             logger.info(f"Deleted PDF: {safe_filename} from {pdf_type} directory")
             
@@ -148,6 +215,43 @@ class PDFManager:
                 "error": str(e)
             }
     
+    def _catalog_record(self, pdf_type: str, file_path: Path, content_hash: Optional[str] = None):
+        try:
+            file_stat = file_path.stat()
+            self.catalog.record_file(pdf_type, file_path.name, file_stat.st_size, file_stat.st_mtime, content_hash)
+        except Exception as e:
+            # The next reconciliation pass picks the file up
+            logger.warning(f"Could not add {file_path.name} to catalog: {str(e)}")
+    
+    def _catalog_remove(self, pdf_type: str, filename: str):
+        try:
+            self.catalog.remove_file(pdf_type, filename)
+        except Exception as e:
+            logger.warning(f"Could not remove {filename} from catalog: {str(e)}")
+    
+    def query_pdfs(self, pdf_type: str, metadata_items: List[Dict[str, Any]], **filters) -> Dict[str, Any]:
+        """
+        One page of PDFs from the catalog, with their metadata
+        
+        Reconciles the catalog with the directory first (throttled, and
+        skipped while the directory is unchanged), so files copied in or
+        removed outside the app still show up correctly.
+        
+        Args:
+            pdf_type: Type of PDF (chatbot, submission, notification)
+            metadata_items: PDFMetadataManager entries for files new to the catalog
+            **filters: Pagination, sort and filter arguments of PDFCatalog.query
+            
+        Returns:
+            Dictionary with files, total, page and page_size
+        """
+        target_dir = self.get_directory(pdf_type)
+        try:
+            self.catalog.reconcile(pdf_type, target_dir, metadata_items)
+        except Exception as e:
+            logger.warning(f"Catalog reconciliation failed for {pdf_type}: {str(e)}")
+        return self.catalog.query(pdf_type, **filters)
+    
     def list_pdfs(self, pdf_type: str) -> List[Dict[str, Any]]:
         """
         List all PDFs in the specified directory
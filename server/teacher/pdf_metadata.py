@@ -9,6 +9,7 @@ from datetime import datetime
 import logging
 
 from ..config import settings
+from .catalog import get_catalog
 
 logger = logging.getLogger(__name__)
 
@@ -43,7 +44,15 @@ class PDFMetadataManager:
         except Exception as e:
             logger.error(f"Error saving metadata: {str(e)}")
     
-    def add_pdf_metadata(self, filename: str, pdf_type: str, file_size: int, uploaded_by: str) -> bool:
+    def _sync_catalog(self, filename: str, pdf_type: str):
+        """Copy a file's current metadata into the catalog (None once removed)"""
+        try:
+            get_catalog().update_metadata(pdf_type, filename, self.get_pdf_metadata(filename, pdf_type))
+        except Exception as e:
+            logger.warning(f"Could not update catalog for {filename}: {str(e)}")
+    
+    def add_pdf_metadata(self, filename: str, pdf_type: str, file_size: int, uploaded_by: str,
+                         content_hash: Optional[str] = None) -> bool:
         """
         Add metadata for a PDF file
         
@@ -52,6 +61,7 @@ class PDFMetadataManager:
             pdf_type: Type of PDF (chatbot, submission, notification)
             file_size: Size of the file in bytes
             uploaded_by: User ID who uploaded the file
+            content_hash: SHA-256 of the file content, if known
             
         Returns:
             True if successful, False otherwise
@@ -73,6 +83,7 @@ class PDFMetadataManager:
                     "file_size": file_size,
                     "upload_time": datetime.now().isoformat(),
                     "uploaded_by": uploaded_by,
+                    "content_hash": content_hash,
                     "upload_status": "success",
                     "last_action": "upload",
                     "last_updated": datetime.now().isoformat()
@@ -85,6 +96,7 @@ class PDFMetadataManager:
                     "upload_time": datetime.now().isoformat(),
                     "uploaded_by": uploaded_by,
                     "pdf_type": pdf_type,
+                    "content_hash": content_hash,
                     "upload_status": "success",
                     "rebuild_status": None,
                     "delete_status": None,
@@ -93,6 +105,7 @@ class PDFMetadataManager:
                 })
             
             self._save_metadata()
+            self._sync_catalog(filename, pdf_type)
             return True
             
         except Exception as e:
@@ -122,6 +135,7 @@ class PDFMetadataManager:
             ]
             
             self._save_metadata()
+            self._sync_catalog(filename, pdf_type)
             return True
             
         except Exception as e:
@@ -205,6 +219,7 @@ class PDFMetadataManager:
                 elif status_type == "rebuild_status":
                     pdf_item["last_action"] = "rebuild"
                 self._save_metadata()
+                self._sync_catalog(filename, pdf_type)
                 return True
             
             return False
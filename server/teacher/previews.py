@@ -0,0 +1,162 @@
+"""
+Page thumbnails and previews for the Teacher Dashboard.
+
+Pages are rendered with pdf2image once per (content hash, page, width)
+and kept in a disk cache bounded by PREVIEW_CACHE_MAX_MB, evicting the
+least recently used images. Because the key is the content hash, a file
+re-uploaded under another name reuses its previews, and a changed file
+never serves stale ones.
+"""
+
+import os
+import tempfile
+import threading
+import time
+import logging
+from collections import OrderedDict
+from pathlib import Path
+from typing import Dict, Any
+
+from .content_hash import content_hashes
+from ..qa.singleflight import SingleFlight
+
+logger = logging.getLogger(__name__)
+
+THUMBNAIL_WIDTH = 200
+MIN_WIDTH = 64
+MAX_WIDTH = 1600
+PREVIEW_SUFFIX = '.jpg'
+
+
+class PreviewUnavailable(Exception):
+    """Raised when a page can't be rendered (no such page, or poppler missing)"""
+
+
+class PreviewService:
+    """Renders and caches page images of PDFs"""
+
+    def __init__(self, cache_dir: str, max_bytes: int):
+        self.cache_dir = Path(cache_dir)
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        # Concurrent requests for the same preview share one render
+        self._renders = SingleFlight("preview_render")
+        self.hits = 0
+        self.renders = 0
+        self.evictions = 0
+        self._entries: "OrderedDict[str, int]" = OrderedDict()  # file name -> size, least recently used first
+        self._total_bytes = 0
+        self._load_index()
+
+    def _load_index(self):
+        """Rebuild the LRU order from the cache directory (file mtimes record the last use)"""
+        files = []
+        for path in self.cache_dir.glob(f"*{PREVIEW_SUFFIX}"):
+            try:
+                stat = path.stat()
+            except OSError:
+                continue
+            files.append((stat.st_mtime, path.name, stat.st_size))
+        for _, name, size in sorted(files):
+            self._entries[name] = size
+            self._total_bytes += size
+
+    @staticmethod
+    def clamp_width(width: int) -> int:
+        return max(MIN_WIDTH, min(int(width), MAX_WIDTH))
+
+    def get_preview(self, pdf_path: Path, page: int = 1, width: int = THUMBNAIL_WIDTH) -> Path:
+        """
+        Path of a JPEG of one page of pdf_path, rendered on first request
+
+        Raises:
+            PreviewUnavailable: If the page can't be rendered
+        """
+        width = self.clamp_width(width)
+        name = f"{content_hashes.get(pdf_path)}_p{page}_w{width}{PREVIEW_SUFFIX}"
+        cached = self._touch(name)
+        if cached:
+            return cached
+        return self._renders.do(name, lambda: self._render(pdf_path, page, width, name))
+
+    def _touch(self, name: str):
+        with self._lock:
+            if name not in self._entries:
+                return None
+            self._entries.move_to_end(name)
+        path = self.cache_dir / name
+        try:
+            # Persist the recency for the next process start
+            os.utime(path)
+        except FileNotFoundError:
+            # Evicted by another worker sharing the directory
+            with self._lock:
+                self._total_bytes -= self._entries.pop(name, 0)
+            return None
+        with self._lock:
+            self.hits += 1
+        return path
+
+    def _render(self, pdf_path: Path, page: int, width: int, name: str) -> Path:
+        # Another request may have finished rendering it while this one waited
+        cached = self._touch(name)
+        if cached:
+            return cached
+
+        from pdf2image import convert_from_path
+        # Render just big enough for the requested width, then scale to it exactly
+        dpi = 72 if width <= 300 else 150
+        started = time.monotonic()
+        try:
+            images = convert_from_path(str(pdf_path), dpi=dpi, first_page=page, last_page=page, size=(width, None))
+        except Exception as e:
+            raise PreviewUnavailable(f"Could not render page {page}: {str(e)}")
+        if not images:
+            raise PreviewUnavailable(f"Page {page} not found")
+
+        path = self.cache_dir / name
+        fd, tmp_path = tempfile.mkstemp(suffix='.tmp', dir=str(self.cache_dir))
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                images[0].convert('RGB').save(f, format='JPEG', quality=80, optimize=True)
+            os.replace(tmp_path, path)
+        except Exception:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+
+        size = path.stat().st_size
+        with self._lock:
+            self.renders += 1
+            self._total_bytes += size - self._entries.pop(name, 0)
+            self._entries[name] = size
+        logger.info(f"Rendered preview {name} in {time.monotonic() - started:.2f}s")
+        self._evict()
+        return path
+
+    def _evict(self):
+        """Delete least recently used previews until the cache fits in max_bytes"""
+        while True:
+            with self._lock:
+                # Always keep the newest entry, even if it alone is over the limit
+                if self._total_bytes <= self.max_bytes or len(self._entries) <= 1:
+                    return
+                name, size = self._entries.popitem(last=False)
+                self._total_bytes -= size
+                self.evictions += 1
+            try:
+                (self.cache_dir / name).unlink()
+            except FileNotFoundError:
+                pass
+
+    def get_stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                'cached': len(self._entries),
+                'cache_bytes': self._total_bytes,
+                'max_bytes': self.max_bytes,
+                'hits': self.hits,
+                'renders': self.renders,
+                'evictions': self.evictions
+            }
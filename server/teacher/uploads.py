@@ -0,0 +1,99 @@
+"""
+Streaming PDF uploads.
+
+An upload is written to a temporary file next to the PDF folders in
+fixed-size chunks, hashed and validated (PDF magic, size limit) as the
+chunks arrive, so memory per upload stays constant. PDFManager then moves
+the finished file into place with an atomic rename.
+"""
+
+import hashlib
+import os
+import tempfile
+import logging
+from typing import Optional
+
+logger = logging.getLogger(__name__)
+
+PDF_MAGIC = b'%PDF-'
+# Readers accept the header anywhere in the first 1024 bytes
+PDF_MAGIC_WINDOW = 1024
+SPOOL_SUFFIX = '.part'
+
+
+class UploadRejected(Exception):
+    """Raised when an upload is not a PDF or is too large"""
+
+    def __init__(self, message: str, status_code: int = 400):
+        super().__init__(message)
+        self.status_code = status_code
+
+
+class PDFUploadWriter:
+    """
+    Writes one upload to a temporary file chunk by chunk
+
+    Use as a context manager: the temporary file is removed if the block
+    raises, and by discard() if the upload is not committed.
+    """
+
+    def __init__(self, spool_dir: str, max_bytes: int):
+        self.max_bytes = max_bytes
+        fd, self.path = tempfile.mkstemp(suffix=SPOOL_SUFFIX, dir=spool_dir)
+        self._file = os.fdopen(fd, 'wb')
+        self._hash = hashlib.sha256()
+        self._head = b''
+        self.size = 0
+        self.content_hash: Optional[str] = None  # Set by finish()
+
+    def __enter__(self) -> 'PDFUploadWriter':
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is not None:
+            self.discard()
+        return False
+
+    def write(self, chunk: bytes):
+        self.size += len(chunk)
+        if self.size > self.max_bytes:
+            raise UploadRejected(f"File is larger than the {self.max_bytes // (1024 * 1024)} MB limit", status_code=413)
+        if len(self._head) < PDF_MAGIC_WINDOW:
+            self._head += chunk[:PDF_MAGIC_WINDOW - len(self._head)]
+            if len(self._head) >= PDF_MAGIC_WINDOW:
+                self._check_magic()
+        self._hash.update(chunk)
+        self._file.write(chunk)
+
+    def _check_magic(self):
+        if PDF_MAGIC not in self._head:
+            raise UploadRejected("File is not a valid PDF")
+
+    def finish(self) -> str:
+        """Flush the file and validate it; returns the SHA-256 of the content"""
+        if self.content_hash is None:
+            self._check_magic()
+            self._file.flush()
+            os.fsync(self._file.fileno())
+            self._file.close()
+            self.content_hash = self._hash.hexdigest()
+        return self.content_hash
+
+    def discard(self):
+        """Remove the temporary file"""
+        if not self._file.closed:
+            self._file.close()
+        try:
+            os.remove(self.path)
+        except FileNotFoundError:
+            pass
+
+
+async def spool_upload(upload, writer: PDFUploadWriter, chunk_size: int) -> str:
+    """Copy a FastAPI UploadFile into writer chunk by chunk; returns the content hash"""
+    while True:
+        chunk = await upload.read(chunk_size)
+        if not chunk:
+            break
+        writer.write(chunk)
+    return writer.finish()
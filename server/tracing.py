@@ -0,0 +1,248 @@
+"""
+Lightweight per-request tracing.
+
+A trace is started for each API request (and each backend_chat call in
+Streamlit mode); span() blocks inside it record named, nested timings.
+Every trace feeds the Server-Timing response header, and a sampled
+fraction (TRACE_SAMPLE_RATE, or the sampled flag of an incoming W3C
+traceparent header) is exported as OTLP/JSON spans to TRACE_EXPORT_PATH
+(one ExportTraceServiceRequest per line) and/or an OTLP/HTTP collector at
+TRACE_EXPORT_URL.
+
+Spans opened outside a trace - background indexing, or threads that did
+not inherit the request's context - are no-ops.
+"""
+
+import contextvars
+import json
+import os
+import queue
+import random
+import re
+import threading
+import time
+import urllib.request
+import logging
+from contextlib import contextmanager
+from typing import List, Dict, Any, Optional
+
+from .config import settings
+
+logger = logging.getLogger(__name__)
+
+SERVICE_NAME = "itp-chatbot"
+# OTLP span kinds
+SPAN_KIND_INTERNAL = 1
+SPAN_KIND_SERVER = 2
+
+TRACEPARENT_PATTERN = re.compile(r'^[0-9a-f]{2}-([0-9a-f]{32})-([0-9a-f]{16})-([0-9a-f]{2})$')
+
+_current_trace = contextvars.ContextVar('current_trace', default=None)
+_current_span = contextvars.ContextVar('current_span', default=None)
+
+
+class Span:
+    __slots__ = ('name', 'span_id', 'parent_id', 'kind', 'start_ns', 'duration_ns', 'attributes', 'error')
+
+    def __init__(self, name: str, parent_id: Optional[str], kind: int = SPAN_KIND_INTERNAL):
+        self.name = name
+        self.span_id = os.urandom(8).hex()
+        self.parent_id = parent_id
+        self.kind = kind
+        self.start_ns = time.time_ns()
+        self.duration_ns = None  # Set when the span ends
+        self.attributes: Dict[str, Any] = {}
+        self.error = False
+
+    def set_attribute(self, key: str, value: Any):
+        self.attributes[key] = value
+
+
+class Trace:
+    def __init__(self, trace_id: Optional[str] = None, sampled: bool = False, remote_parent_id: Optional[str] = None):
+        self.trace_id = trace_id or os.urandom(16).hex()
+        self.sampled = sampled
+        self.remote_parent_id = remote_parent_id
+        self.root: Optional[Span] = None
+        self._lock = threading.Lock()
+        self._spans: List[Span] = []
+
+    def add(self, span: Span):
+        with self._lock:
+            self._spans.append(span)
+
+    def finished_spans(self) -> List[Span]:
+        with self._lock:
+            return [span for span in self._spans if span.duration_ns is not None]
+
+    def server_timing(self) -> str:
+        """Server-Timing header value: child span durations summed by name, plus the total so far"""
+        totals: Dict[str, float] = {}
+        for span in self.finished_spans():
+            if span is not self.root:
+                totals[span.name] = totals.get(span.name, 0.0) + span.duration_ns / 1e6
+        if self.root is not None:
+            totals['total'] = (time.time_ns() - self.root.start_ns) / 1e6
+        return ', '.join(f"{name};dur={ms:.1f}" for name, ms in totals.items())
+
+
+def current_trace() -> Optional[Trace]:
+    return _current_trace.get()
+
+
+def _parse_traceparent(header: Optional[str]):
+    """(trace_id, parent span id, sampled) from a W3C traceparent header, or Nones"""
+    match = TRACEPARENT_PATTERN.match((header or '').strip().lower())
+    if not match:
+        return None, None, None
+    return match.group(1), match.group(2), bool(int(match.group(3), 16) & 1)
+
+
+@contextmanager
+def span(name: str, **attributes):
+    """Time a block as a child of the current span; yields the Span (or None outside a trace)"""
+    trace = _current_trace.get()
+    if trace is None:
+        yield None
+        return
+
+    parent = _current_span.get()
+    current = Span(name, parent.span_id if parent else trace.remote_parent_id)
+    current.attributes.update(attributes)
+    trace.add(current)
+    token = _current_span.set(current)
+    started = time.perf_counter_ns()
+    try:
+        yield current
+    except BaseException:
+        current.error = True
+        raise
+    finally:
+        current.duration_ns = time.perf_counter_ns() - started
+        _current_span.reset(token)
+
+
+@contextmanager
+def trace(name: str, traceparent: Optional[str] = None, **attributes):
+    """Start a trace for one request; yields the Trace, whose root span is trace.root"""
+    trace_id, remote_parent_id, sampled = _parse_traceparent(traceparent)
+    if sampled is None:
+        sampled = settings.TRACE_SAMPLE_RATE > 0 and random.random() < settings.TRACE_SAMPLE_RATE
+    current = Trace(trace_id, sampled, remote_parent_id)
+    trace_token = _current_trace.set(current)
+    try:
+        with span(name, **attributes) as root:
+            root.kind = SPAN_KIND_SERVER
+            current.root = root
+            yield current
+    finally:
+        _current_trace.reset(trace_token)
+        if current.sampled:
+            exporter = get_exporter()
+            if exporter:
+                exporter.export(current)
+
+
+def _attribute(key: str, value: Any) -> Dict[str, Any]:
+    if isinstance(value, bool):
+        typed = {'boolValue': value}
+    elif isinstance(value, int):
+        typed = {'intValue': str(value)}  # int64 is a string in OTLP/JSON
+    elif isinstance(value, float):
+        typed = {'doubleValue': value}
+    else:
+        typed = {'stringValue': str(value)}
+    return {'key': key, 'value': typed}
+
+
+def _otlp_span(trace_id: str, span: Span) -> Dict[str, Any]:
+    otlp = {
+        'traceId': trace_id,
+        'spanId': span.span_id,
+        'name': span.name,
+        'kind': span.kind,
+        'startTimeUnixNano': str(span.start_ns),
+        'endTimeUnixNano': str(span.start_ns + span.duration_ns),
+        'attributes': [_attribute(key, value) for key, value in span.attributes.items()],
+        # 1 = OK, 2 = ERROR
+        'status': {'code': 2 if span.error else 1},
+    }
+    if span.parent_id:
+        otlp['parentSpanId'] = span.parent_id
+    return otlp
+
+
+class SpanExporter:
+    """Batches finished traces and writes them as OTLP/JSON from a background thread"""
+
+    def __init__(self, path: str = "", url: str = "", max_batch: int = 200, flush_interval: float = 2.0,
+                 max_queued: int = 10000):
+        self.path = path
+        self.url = url
+        self.max_batch = max_batch
+        self.flush_interval = flush_interval
+        self._queue: "queue.Queue[Dict[str, Any]]" = queue.Queue(maxsize=max_queued)
+        self.dropped = 0
+        self._thread = threading.Thread(target=self._run, name="span-exporter", daemon=True)
+        self._thread.start()
+
+    def export(self, trace: Trace):
+        for finished in trace.finished_spans():
+            try:
+                self._queue.put_nowait(_otlp_span(trace.trace_id, finished))
+            except queue.Full:
+                # Never slow requests down for tracing
+                self.dropped += 1
+
+    def _run(self):
+        while True:
+            batch = [self._queue.get()]
+            deadline = time.monotonic() + self.flush_interval
+            while len(batch) < self.max_batch:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(self._queue.get(timeout=remaining))
+                except queue.Empty:
+                    break
+            self._write(batch)
+
+    def _write(self, spans: List[Dict[str, Any]]):
+        payload = {
+            'resourceSpans': [{
+                'resource': {'attributes': [_attribute('service.name', SERVICE_NAME)]},
+                'scopeSpans': [{'scope': {'name': __name__}, 'spans': spans}],
+            }]
+        }
+        body = json.dumps(payload)
+        if self.path:
+            try:
+                with open(self.path, 'a', encoding='utf-8') as f:
+                    f.write(body + '\n')
+            except OSError as e:
+                logger.warning(f"Could not write spans to {self.path}: {str(e)}")
+        if self.url:
+            request = urllib.request.Request(
+                self.url, data=body.encode('utf-8'), headers={'Content-Type': 'application/json'}
+            )
+            try:
+                with urllib.request.urlopen(request, timeout=5) as response:
+                    response.read()
+            except Exception as e:
+                logger.warning(f"Could not send {len(spans)} spans to {self.url}: {str(e)}")
+
+
+_exporter = None
+_exporter_lock = threading.Lock()
+
+
+def get_exporter() -> Optional[SpanExporter]:
+    """The process's span exporter, or None when no export target is configured"""
+    global _exporter
+    if not (settings.TRACE_EXPORT_PATH or settings.TRACE_EXPORT_URL):
+        return None
+    with _exporter_lock:
+        if _exporter is None:
+            _exporter = SpanExporter(settings.TRACE_EXPORT_PATH, settings.TRACE_EXPORT_URL)
+        return _exporter
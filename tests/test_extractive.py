@@ -0,0 +1,50 @@
+"""Extractive answers must come from a sentence about the item the question names"""
+
+import pytest
+
+pytest.importorskip("dotenv")
+
+from server.qa.extractive import ExtractiveAnswerer
+
+FORMS_CHUNK = {
+    'text': "Form A must be submitted by 1 March 2025.\nForm B must be submitted by 15 April 2025.",
+    'file_name': 'guidelines.pdf',
+    'page_number': 3,
+    'score': 0.8,
+}
+
+
+@pytest.fixture
+def answerer():
+    return ExtractiveAnswerer(min_confidence=0.6)
+
+
+def test_answers_from_the_named_form(answerer):
+    result = answerer.answer("What is the deadline for Form B?", [FORMS_CHUNK])
+    assert result is not None
+    assert "Form B" in result['response']
+    assert result['citation']['span'] == '15 april 2025'
+
+
+def test_other_form_is_not_an_answer(answerer):
+    chunk = dict(FORMS_CHUNK, text="Form A must be submitted by 1 March 2025.")
+    assert answerer.answer("What is the deadline for Form B?", [chunk]) is None
+
+
+def test_single_shared_word_falls_through(answerer):
+    chunk = dict(FORMS_CHUNK, text="The final logbook is checked on 3 June 2025.")
+    assert answerer.answer("When is the final report due?", [chunk]) is None
+
+
+def test_date_from_another_clause_falls_through(answerer):
+    chunk = dict(FORMS_CHUNK, text="Industrial training starts on 1 March 2025 and the report should be "
+                                   "submitted to the faculty.")
+    assert answerer.answer("When should the industrial training report be submitted?", [chunk]) is None
+
+
+def test_date_in_the_topic_clause_is_answered(answerer):
+    chunk = dict(FORMS_CHUNK, text="Industrial training starts on 1 March 2025 and the report should be "
+                                   "submitted by 30 June 2025.")
+    result = answerer.answer("When should the report be submitted?", [chunk])
+    assert result is not None
+    assert result['citation']['span'] == '30 june 2025'
@@ -0,0 +1,50 @@
+"""Importing the Streamlit backend or the API app must not load the heavy dependencies"""
+
+import importlib.util
+import subprocess
+import sys
+from pathlib import Path
+
+import pytest
+
+pytest.importorskip("dotenv")
+
+ROOT = Path(__file__).resolve().parent.parent
+
+HEAVY_MODULES = (
+    "faiss", "torch", "sentence_transformers", "openai", "groq", "google.generativeai",
+    "pytesseract", "pdf2image", "nltk", "apscheduler",
+)
+
+# Run in a fresh interpreter: this process may already have imported any of them
+SCRIPT = """
+import importlib.abc
+import sys
+
+HEAVY = {heavy!r}
+
+
+class RejectHeavyImports(importlib.abc.MetaPathFinder):
+    def find_spec(self, name, path=None, target=None):
+        if any(name == heavy or name.startswith(heavy + ".") for heavy in HEAVY):
+            raise ImportError(f"{{name}} imported at import time")
+        return None
+
+
+sys.meta_path.insert(0, RejectHeavyImports())
+import {module}
+"""
+
+
+@pytest.mark.parametrize("module", [
+    "backend_direct",
+    pytest.param("server.main", marks=pytest.mark.skipif(
+        not (importlib.util.find_spec("fastapi") and importlib.util.find_spec("multipart")),
+        reason="fastapi / python-multipart not installed")),
+])
+def test_import_does_not_load_heavy_dependencies(module):
+    result = subprocess.run(
+        [sys.executable, "-c", SCRIPT.format(heavy=HEAVY_MODULES, module=module)],
+        cwd=ROOT, capture_output=True, text=True, timeout=120,
+    )
+    assert result.returncode == 0, result.stderr
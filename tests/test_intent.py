@@ -0,0 +1,37 @@
+"""The intent router may only short-circuit clear greetings and farewells"""
+
+import pytest
+
+pytest.importorskip("dotenv")
+
+from server.qa.intent import IntentRouter
+
+
+@pytest.fixture(scope="module")
+def router():
+    return IntentRouter(min_confidence=0.2)
+
+
+@pytest.mark.parametrize("text, intent", [
+    ("hi", "greeting"),
+    ("good morning", "greeting"),
+    ("thanks!", "farewell"),
+    ("bye", "farewell"),
+])
+def test_greetings_and_farewells_get_canned_replies(router, text, intent):
+    assert router.route(text) == intent
+
+
+@pytest.mark.parametrize("text", [
+    "is there a briefing today",
+    "can you help me with my resume",
+    "what time do i start work",
+    "can I work from home",
+    "what is the dress code",
+    "hello, when is the deadline?",
+    "thanks, and how do i submit form b?",
+    # Off-topic questions also reach retrieval, which replies when it finds nothing
+    "tell me a joke",
+])
+def test_questions_reach_the_rag_pipeline(router, text):
+    assert router.route(text) == "in_domain"
@@ -0,0 +1,54 @@
+"""The ONNX int8 embedder must agree with the sentence-transformers (PyTorch) reference"""
+
+import pytest
+
+np = pytest.importorskip("numpy")
+pytest.importorskip("onnxruntime")
+pytest.importorskip("tokenizers")
+pytest.importorskip("torch")
+sentence_transformers = pytest.importorskip("sentence_transformers")
+
+from server.config import settings
+from server.ingest.embedder import LOCAL_MODEL_NAME
+from server.ingest.onnx_embedder import OnnxSentenceEncoder, PARITY_SENTENCES, MIN_PARITY_COSINE, export_model
+
+# Wider than the export-time check: long, multilingual, numeric and near-empty inputs
+SENTENCES = PARITY_SENTENCES + [
+    "Bilakah tarikh akhir penghantaran laporan latihan industri?",
+    "The logbook must be signed by the industry supervisor every Friday, and a scanned copy "
+    "uploaded to the portal no later than 11:59 pm on the following Monday.",
+    "Section 4.2: 12 weeks, 480 hours minimum.",
+    "?",
+]
+
+
+@pytest.fixture(scope="module")
+def reference_model():
+    try:
+        return sentence_transformers.SentenceTransformer(LOCAL_MODEL_NAME)
+    except OSError as e:
+        pytest.skip(f"{LOCAL_MODEL_NAME} not available (offline?): {e}")
+
+
+@pytest.fixture(scope="module")
+def int8_encoder(reference_model, tmp_path_factory):
+    # Export into a temporary directory so the test leaves nothing in the data dir
+    onnx_dir = tmp_path_factory.mktemp("onnx")
+    with pytest.MonkeyPatch.context() as monkeypatch:
+        monkeypatch.setattr(settings, "ONNX_MODEL_DIR", str(onnx_dir))
+        model_dir = f"{settings.ONNX_MODEL_DIR}/{LOCAL_MODEL_NAME}"
+        export_model(LOCAL_MODEL_NAME, model_dir, quantize=True)
+        yield OnnxSentenceEncoder(model_dir, quantized=True)
+
+
+def test_int8_embeddings_match_reference(reference_model, int8_encoder):
+    reference = reference_model.encode(SENTENCES, convert_to_tensor=False)
+    reference = reference / np.linalg.norm(reference, axis=1, keepdims=True)
+
+    vectors = int8_encoder.encode(SENTENCES)
+
+    assert vectors.shape == reference.shape
+    cosines = np.sum(vectors * reference, axis=1)
+    worst = int(np.argmin(cosines))
+    assert cosines[worst] >= MIN_PARITY_COSINE, \
+        f"cosine {cosines[worst]:.4f} < {MIN_PARITY_COSINE} for {SENTENCES[worst]!r}"
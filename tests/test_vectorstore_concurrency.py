@@ -0,0 +1,92 @@
+"""Stress test: searches running while the index is added to, pruned and cleared"""
+
+import threading
+import time
+
+import pytest
+
+np = pytest.importorskip("numpy")
+pytest.importorskip("faiss")
+
+from server.ingest.vectorstore import FAISSVectorStore
+
+DIMENSION = 64
+CHUNKS_PER_FILE = 200
+RUN_SECONDS = 3.0
+
+
+def _vector(key: int):
+    """Deterministic vector for a chunk, so a result's score can be checked against its metadata"""
+    return np.random.default_rng(key).standard_normal(DIMENSION).astype(np.float32)
+
+
+def _unit(vector):
+    return vector / np.linalg.norm(vector)
+
+
+def test_concurrent_search_and_ingest(tmp_path):
+    store = FAISSVectorStore(dimension=DIMENSION, index_path=str(tmp_path / "stress"), pdf_type="stress")
+    errors = []
+    # Files whose vectors have been removed (remove_file or clear returned); names are never reused
+    removed = set()
+    removed_lock = threading.Lock()
+    stop = threading.Event()
+
+    def writer():
+        file_number = 0
+        live = []
+        try:
+            while not stop.is_set():
+                file_number += 1
+                name = f"file_{file_number}.pdf"
+                keys = [file_number * 1000 + chunk for chunk in range(CHUNKS_PER_FILE)]
+                store.add_vectors([_vector(key).tolist() for key in keys],
+                                  [{'file_name': name, 'key': key} for key in keys], persist=False)
+                live.append(name)
+                if file_number % 2 == 0:
+                    victim = live.pop(0)
+                    store.remove_file(victim, persist=False)
+                    with removed_lock:
+                        removed.add(victim)
+                if file_number % 25 == 0:
+                    cleared = list(live)
+                    store.clear()
+                    live.clear()
+                    with removed_lock:
+                        removed.update(cleared)
+        except Exception as e:
+            errors.append(e)
+
+    def reader(seed: int):
+        rng = np.random.default_rng(seed)
+        try:
+            while not stop.is_set():
+                with removed_lock:
+                    removed_before = set(removed)
+                queries = [_vector(int(key)) for key in rng.integers(1000, 100000, size=3)]
+                if rng.random() < 0.5:
+                    batches = store.search_batch([q.tolist() for q in queries], k=5)
+                else:
+                    batches = [store.search(q.tolist(), k=5) for q in queries]
+                for query, results in zip(queries, batches):
+                    for metadata, score in results:
+                        assert metadata['file_name'] not in removed_before, \
+                            f"{metadata['file_name']} returned after it was removed"
+                        # The score must be that of the vector the metadata describes (ids still aligned)
+                        expected = float(np.dot(_unit(query), _unit(_vector(metadata['key']))))
+                        assert abs(score - expected) < 1e-4, f"metadata {metadata} does not match its vector"
+        except Exception as e:
+            errors.append(e)
+
+    threads = [threading.Thread(target=writer)] + [threading.Thread(target=reader, args=(i,)) for i in range(4)]
+    for thread in threads:
+        thread.start()
+    time.sleep(RUN_SECONDS)
+    stop.set()
+    for thread in threads:
+        thread.join(timeout=30)
+
+    assert not errors, errors
+    remaining = {meta['file_name'] for meta in store.get_metadata_snapshot()}
+    assert not remaining & removed
+    assert store.get_stats()['total_vectors'] == len(store.get_metadata_snapshot())
@@ -21,8 +21,12 @@ from backend_direct import (
     backend_teacher_notification_status,
     backend_teacher_send_notification,
     backend_teacher_notification_history,
+    backend_teacher_pdf_preview,
 )
 
+# Query params the file list endpoints pass through to the catalog
+CATALOG_LIST_PARAMS = ("page", "page_size", "sort", "order", "uploaded_by", "status", "since", "until", "search")
+
 def api_call(endpoint: str, method: str = "GET", json_data: dict = None, files: dict = None, params: dict = None):
     """Call backend functions directly (no HTTP API needed)"""
     try:
@@ -35,7 +39,7 @@ def api_call(endpoint: str, method: str = "GET", json_data: dict = None, files:
         
         # Chat endpoint
         elif endpoint == "/api/chat" and method == "POST":
-            return backend_chat(json_data.get("message", ""))
+            return backend_chat(json_data.get("message", ""), json_data.get("user_id"), json_data.get("session_id"))
         
         # CV check endpoint
         elif endpoint == "/api/cv-check" and method == "POST":
@@ -71,8 +75,11 @@ def api_call(endpoint: str, method: str = "GET", json_data: dict = None, files:
             return {"error": "No file provided"}
         
         elif endpoint == "/api/teacher/list-pdfs" and method == "GET":
-            pdf_type = params.get("pdf_type", "") if params else ""
-            return backend_teacher_list_pdfs(pdf_type)
+            params = params or {}
+            return backend_teacher_list_pdfs(
+                params.get("pdf_type", ""),
+                **{key: value for key, value in params.items() if key in CATALOG_LIST_PARAMS}
+            )
         
         elif endpoint == "/api/teacher/delete-pdf" and method == "DELETE":
             filename = params.get("filename", "") if params else ""
@@ -84,7 +91,16 @@ def api_call(endpoint: str, method: str = "GET", json_data: dict = None, files:
             return backend_teacher_rebuild_faiss_index(pdf_type)
         
         elif endpoint == "/api/teacher/list-student-submissions" and method == "GET":
-            return backend_teacher_list_student_submissions()
+            params = params or {}
+            return backend_teacher_list_student_submissions(
+                **{key: value for key, value in params.items() if key in CATALOG_LIST_PARAMS}
+            )
+        
+        elif endpoint == "/api/teacher/pdf-preview" and method == "GET":
+            params = params or {}
+            return backend_teacher_pdf_preview(
+                params.get("filename", ""), params.get("pdf_type", ""), params.get("page", 1), params.get("width", 200)
+            )
         
         # Teacher notification endpoints
         elif endpoint == "/api/teacher/upload-emails" and method == "POST":